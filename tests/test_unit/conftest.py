@@ -1,5 +1,6 @@
 """Mock heavy optional dependencies so unit tests run without a display."""
 
+import importlib.util
 import sys
 from unittest.mock import MagicMock
 
@@ -8,8 +9,12 @@ for mod in [
     "PyQt5.QtCore",
     "PyQt5.QtGui",
     "PyQt5.QtWidgets",
-    "cv2",
     "scipy",
     "scipy.interpolate",
 ]:
     sys.modules.setdefault(mod, MagicMock())
+
+# OpenCV is only mocked when it is not installed, so the detection tests can
+# run against the real library
+if importlib.util.find_spec("cv2") is None:
+    sys.modules.setdefault("cv2", MagicMock())
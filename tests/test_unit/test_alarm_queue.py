@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from urllib import parse
+
+import pytest
+
+from village.classes.alarm_queue import AlarmQueue
+
+
+class _TelegramStandIn(BaseHTTPRequestHandler):
+    failures_left = 0
+    delay = 0.0
+    received: list[str] = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(_TelegramStandIn.delay)
+        if _TelegramStandIn.failures_left > 0:
+            _TelegramStandIn.failures_left -= 1
+            self.send_response(500)
+        else:
+            _TelegramStandIn.received.append(parse.parse_qs(body.decode())["text"][0])
+            self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    _TelegramStandIn.failures_left = 0
+    _TelegramStandIn.delay = 0.0
+    _TelegramStandIn.received = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _TelegramStandIn)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    # the bot module connects to the hardware and the corridor when imported
+    stub = MagicMock()
+    stub.manager.use_of_corridor = False
+    for name in (
+        "village.manager",
+        "village.devices.camera",
+        "village.plots.corridor_plot",
+    ):
+        monkeypatch.setitem(sys.modules, name, stub)
+    monkeypatch.delitem(sys.modules, "village.devices.telegram_bot", raising=False)
+    telegram_bot = importlib.import_module("village.devices.telegram_bot")
+    monkeypatch.setitem(sys.modules, "village.devices.telegram_bot", telegram_bot)
+
+    bot = telegram_bot.TelegramBot.__new__(telegram_bot.TelegramBot)
+    bot.api_url = "http://127.0.0.1:%d" % httpd.server_address[1]
+    bot.token = "token"
+    bot.chat = "1"
+    yield bot
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _drain(queue, send, failures=None, expected=1):
+    async def main():
+        on_failure = failures.append if failures is not None else None
+        task = asyncio.create_task(queue.run(send, on_failure))
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if queue.sent + queue.failed >= expected:
+                break
+        task.cancel()
+
+    asyncio.run(main())
+
+
+def test_alarms_are_sent(bot):
+    queue = AlarmQueue()
+    queue.put("door blocked")
+    queue.put("scale error")
+    _drain(queue, bot.send_message, expected=2)
+    assert _TelegramStandIn.received == ["door blocked", "scale error"]
+    assert queue.stats()["sent"] == 2
+    assert queue.stats()["max_latency"] > 0
+
+
+def test_duplicates_are_coalesced(bot):
+    queue = AlarmQueue()
+    for _ in range(3):
+        queue.put("door blocked")
+    assert len(queue) == 1
+    _drain(queue, bot.send_message)
+    assert _TelegramStandIn.received == ["door blocked (x3)"]
+    assert queue.coalesced == 2
+
+
+def test_queue_is_bounded():
+    queue = AlarmQueue(maxsize=2)
+    queue.put("a")
+    queue.put("b")
+    queue.put("c")
+    assert len(queue) == 2
+    assert queue.dropped == 1
+
+
+def test_failed_sends_are_retried(bot):
+    _TelegramStandIn.failures_left = 2
+    queue = AlarmQueue(backoff=0.01)
+    queue.put("door blocked")
+    _drain(queue, bot.send_message)
+    assert _TelegramStandIn.received == ["door blocked"]
+    assert queue.sent == 1
+
+
+def test_alarm_is_given_up_after_max_attempts(bot):
+    _TelegramStandIn.failures_left = 10
+    failures: list[str] = []
+    queue = AlarmQueue(max_attempts=3, backoff=0.01)
+    queue.put("door blocked")
+    _drain(queue, bot.send_message, failures)
+    assert queue.failed == 1
+    assert failures == ["door blocked"]
+
+
+def test_slow_sends_time_out(bot):
+    _TelegramStandIn.delay = 0.5
+    bot.send_timeout = 0.05
+    queue = AlarmQueue(max_attempts=2, backoff=0.01)
+    queue.put("door blocked")
+    _drain(queue, bot.send_message)
+    assert queue.failed == 1
+    assert queue.sent == 0
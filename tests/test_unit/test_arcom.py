@@ -0,0 +1,68 @@
+import struct
+
+import numpy as np
+import pytest
+import serial
+
+from village.pybpodapi.com.arcom import ArCOM
+
+
+class FakeSerial:
+    """Serial port that returns the bytes of a buffer and counts the reads."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.reads = 0
+
+    def read(self, n: int) -> bytes:
+        self.reads += 1
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+
+def make_arcom(data: bytes) -> ArCOM:
+    arcom = ArCOM()
+    arcom.serial_object = FakeSerial(data)
+    return arcom
+
+
+class TestArrayReads:
+    def test_uint32_array_single_read(self):
+        values = [0, 1, 70000, 2**32 - 1]
+        arcom = make_arcom(struct.pack("<4L", *values))
+        assert arcom.read_uint32_array(4) == values
+        assert arcom.serial_object.reads == 1
+
+    def test_uint16_array(self):
+        arcom = make_arcom(struct.pack("<3H", 1, 256, 65535))
+        assert arcom.read_uint16_array(3) == [1, 256, 65535]
+
+    def test_uint8_array(self):
+        arcom = make_arcom(bytes([1, 255, 0]))
+        assert arcom.read_uint8_array(3) == [1, 255, 0]
+        assert arcom.serial_object.reads == 1
+
+    def test_float32_array(self):
+        arcom = make_arcom(struct.pack("<2f", 1.5, -2.25))
+        assert arcom.read_float32_array(2) == [1.5, -2.25]
+
+    def test_char_array(self):
+        arcom = make_arcom(b"Port1")
+        assert arcom.read_char_array(5) == ["P", "o", "r", "t", "1"]
+
+    def test_read_array_returns_numpy(self):
+        arcom = make_arcom(struct.pack("<2L", 10, 20))
+        array = arcom.read_array(2, "<u4")
+        assert isinstance(array, np.ndarray)
+        assert array.dtype == np.dtype("<u4")
+        assert array.tolist() == [10, 20]
+
+    def test_empty_array(self):
+        arcom = make_arcom(b"")
+        assert arcom.read_uint32_array(0) == []
+
+    def test_short_read_raises(self):
+        arcom = make_arcom(struct.pack("<L", 1))
+        # the trial loop of bpod_base only catches serial errors
+        with pytest.raises(serial.SerialException):
+            arcom.read_uint32_array(2)
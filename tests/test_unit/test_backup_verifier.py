@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+
+import pytest
+
+from village.classes import backup_verifier as backup_verifier_module
+from village.classes.backup_verifier import (
+    VERIFIER_COMMAND,
+    BackupVerifier,
+    fast_hash,
+    size_command,
+)
+from village.scripts.safe_removal_of_data import remove_old_data
+
+
+def _write(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    local = tmp_path / "videos"
+    backup = tmp_path / "backup"
+    _write(local / "A1" / "same.mp4", b"abc")
+    _write(backup / "A1" / "same.mp4", b"abc")
+    _write(local / "A1" / "short.mp4", b"abc")
+    _write(backup / "A1" / "short.mp4", b"ab")
+    _write(local / "A1" / "changed.mp4", b"abc")
+    _write(backup / "A1" / "changed.mp4", b"abd")
+    _write(local / "A1" / "missing.mp4", b"abc")
+    return local, backup
+
+
+FILES = ["A1/same.mp4", "A1/short.mp4", "A1/changed.mp4", "A1/missing.mp4"]
+
+
+def _sh(command):
+    return ["sh", "-c", command.replace("python3", sys.executable)]
+
+
+def test_fast_hash_samples_large_files(tmp_path):
+    data = bytearray(os.urandom(4 << 20))
+    path = _write(tmp_path / "big", bytes(data))
+    digest = fast_hash(str(path))
+    data[-1] ^= 1
+    _write(path, bytes(data))
+    assert fast_hash(str(path)) != digest
+    _write(path, bytes(data[:-1]))
+    assert fast_hash(str(path)) != digest
+
+
+def test_local_backup_needs_same_size_and_hash(dirs):
+    local, backup = dirs
+    verifier = BackupVerifier(str(local), str(backup), chunk_size=2)
+    assert verifier.verify_local(FILES) == [str(local / "A1" / "same.mp4")]
+
+
+def test_remote_backup_is_checked_in_one_stream(dirs):
+    local, backup = dirs
+    files = FILES + ["A1/not_local.mp4"]
+    verifier = BackupVerifier(str(local), str(backup), chunk_size=2)
+    assert verifier.verify_with(files, _sh(VERIFIER_COMMAND)) == [
+        str(local / "A1" / "same.mp4")
+    ]
+
+
+def test_remote_failure_removes_nothing(dirs):
+    local, backup = dirs
+    verifier = BackupVerifier(str(local), str(backup))
+    assert verifier.verify_with(FILES, ["sh", "-c", "exit 255"]) == []
+    assert verifier.verify_with(FILES, ["/nonexistent/ssh"]) == []
+
+
+def test_size_check_without_python3(dirs, tmp_path, monkeypatch):
+    local, backup = dirs
+    # an ssh that runs the command locally, on a server without python3
+    bin_dir = tmp_path / "bin"
+    _write(
+        bin_dir / "ssh",
+        b"#!/bin/sh\nfor last; do :; done\n"
+        b'exec sh -c "$(printf %s "$last" | sed s/python3/no_python3/)"\n',
+    ).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    verifier = BackupVerifier(str(local), str(backup), chunk_size=2)
+    assert verifier.verify_remote(FILES, "user", "server") == [
+        str(local / "A1" / "same.mp4"),
+        str(local / "A1" / "changed.mp4"),
+    ]
+    assert verifier.size_only
+
+    command = ["sh", "-c", size_command(str(backup))]
+    assert verifier.verify_with(FILES, command, size_only=True) == [
+        str(local / "A1" / "same.mp4"),
+        str(local / "A1" / "changed.mp4"),
+    ]
+
+
+def test_slow_check_answers_before_the_timeout(tmp_path, monkeypatch):
+    local = tmp_path / "videos"
+    backup = tmp_path / "backup"
+    files = [f"A1/{n}.mp4" for n in range(8)]
+    for relative in files:
+        _write(local / relative)
+        _write(backup / relative)
+    # every remote hash takes 0.3 s, the whole chunk longer than the timeout
+    program = backup_verifier_module.VERIFIER_PROGRAM.replace(
+        "    import hashlib\n",
+        "    import hashlib\n    import time\n    time.sleep(0.3)\n",
+    )
+    monkeypatch.setattr(backup_verifier_module, "VERIFIER_PROGRAM", program)
+    # python3 on the server buffers its output
+    monkeypatch.delenv("PYTHONUNBUFFERED", raising=False)
+    command = f"python3 -c 'import sys; exec(sys.stdin.read({len(program)}))'"
+    verifier = BackupVerifier(str(local), str(backup), timeout=1.5)
+    assert len(verifier.verify_with(files, _sh(command))) == len(files)
+    assert verifier.returncode == 0
+
+
+def test_local_hashes_are_cached(dirs, monkeypatch):
+    local, backup = dirs
+    index_path = local.parent / "logs" / "backup_index.json"
+    BackupVerifier(str(local), str(backup), index_path).verify_local(FILES)
+    assert sorted(json.loads(index_path.read_text())) == sorted(FILES)
+
+    hashed = []
+
+    def counting_hash(path, *args):
+        hashed.append(path)
+        return fast_hash(path, *args)
+
+    monkeypatch.setattr(backup_verifier_module, "fast_hash", counting_hash)
+    _write(local / "A1" / "changed.mp4", b"abd")
+    verifier = BackupVerifier(str(local), str(backup), index_path)
+    assert verifier.verify_with(FILES, _sh(VERIFIER_COMMAND)) == [
+        str(local / "A1" / "same.mp4"),
+        str(local / "A1" / "changed.mp4"),
+    ]
+    assert hashed == [str(local / "A1" / "changed.mp4")]
+
+
+def test_remove_old_data_keeps_files_not_backed_up(tmp_path):
+    local = tmp_path / "videos"
+    backup = tmp_path / "backup"
+    old = "A1/A1_20200101_120000.mp4"
+    _write(local / old, b"abc")
+    _write(backup / old, b"abc")
+    _write(local / "A1/A1_20200102_120000.mp4", b"abc")
+    _write(backup / "A1/A1_20200102_120000.mp4", b"ab")
+    remove_old_data(str(local), 1, True, str(backup), False)
+    assert not (local / old).exists()
+    assert (local / "A1/A1_20200102_120000.mp4").exists()
@@ -0,0 +1,93 @@
+import pytest
+
+from village.pybpodapi.bpod.bpod_com_protocol_modules import BpodCOMProtocolModules
+from village.pybpodapi.bpod.bpod_emulator import BpodEmulator
+from village.pybpodapi.state_machine.state_machine_runner import StateMachineRunner
+
+
+def pokes(trial):
+    # odd trials poke the correct port, even trials the wrong one
+    return [(0.2, "Port1In" if trial % 2 else "Port2In"), (0.25, "Port1Out")]
+
+
+@pytest.fixture
+def emulator():
+    with BpodEmulator(speed=20, pokes=pokes) as em:
+        yield em
+
+
+@pytest.fixture
+def bpod(emulator):
+    bpod = BpodCOMProtocolModules(
+        serial_port=emulator.port,
+        baudrate=115200,
+        sync_channel=255,
+        sync_mode=1,
+        net_port=None,
+        target_firmware=[23],
+        bnc_ports=["OFF", "OFF"],
+        behavior_ports=["ON"] * 8,
+    )
+    yield bpod
+    bpod.close()
+
+
+def make_sma(bpod):
+    sma = StateMachineRunner(bpod)
+    sma.add_state(
+        state_name="wait",
+        state_timer=1,
+        state_change_conditions={
+            "Port1In": "reward",
+            "Port2In": "punish",
+            "Tup": "exit",
+        },
+    )
+    sma.add_state(
+        state_name="reward",
+        state_timer=0.1,
+        state_change_conditions={"Tup": "exit"},
+        output_actions=[("Valve1", 255), ("SoftCode", 3)],
+    )
+    sma.add_state(
+        state_name="punish",
+        state_timer=0.5,
+        state_change_conditions={"Tup": "exit"},
+    )
+    return sma
+
+
+def test_hardware_description(bpod, emulator):
+    assert bpod.hardware.firmware_version == BpodEmulator.FIRMWARE_VERSION
+    assert bpod.hardware.inputs == list(emulator.hardware.inputs)
+    assert bpod.hardware.channels.event_names == emulator.hardware.channels.event_names
+
+
+def test_trials(bpod, emulator):
+    softcodes = []
+    bpod.softcode_handler_function = softcodes.append
+    for trial in (1, 2):
+        sma = make_sma(bpod)
+        bpod.send_state_machine(sma)
+        assert bpod.run_state_machine(sma)
+        data = bpod.recorder.get_trial_data("date", trial, "subject", "task", "box")
+        start = data["TRIAL_START"]
+        if trial == 1:
+            assert bpod._current_trial.states == [0, 1]
+            assert data["Port1In"][0] - start == pytest.approx(0.2)
+            assert data["STATE_reward_START"][0] - start == pytest.approx(0.2)
+            assert data["STATE_reward_END"][0] - start == pytest.approx(0.3)
+        else:
+            assert bpod._current_trial.states == [0, 2]
+            assert data["STATE_punish_END"][0] - start == pytest.approx(0.7)
+    assert softcodes == [3]
+    assert emulator.trials == 2
+
+
+def test_state_timer_exit(bpod, emulator):
+    emulator.pokes = None
+    sma = make_sma(bpod)
+    bpod.send_state_machine(sma)
+    bpod.run_state_machine(sma)
+    assert bpod._current_trial.states == [0]
+    assert bpod._current_trial.event_timestamps == pytest.approx([1.0])
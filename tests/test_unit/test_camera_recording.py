@@ -0,0 +1,83 @@
+import importlib
+import sys
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from village.classes.detection_engine import DetectionEngine, DetectionWorker
+from village.classes.frame_log import FrameLog
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    # picamera2 and the manager are not available, the module level cameras
+    # are NullCameras
+    stub = MagicMock()
+    stub.manager.use_of_corridor = False
+    stub.Picamera2.global_camera_info.return_value = []
+    for name in (
+        "village.manager",
+        "libcamera",
+        "picamera2",
+        "picamera2.encoders",
+        "picamera2.outputs",
+        "picamera2.previews.qt",
+    ):
+        monkeypatch.setitem(sys.modules, name, stub)
+    monkeypatch.delitem(sys.modules, "village.devices.camera", raising=False)
+    camera_module = importlib.import_module("village.devices.camera")
+    monkeypatch.setitem(sys.modules, "village.devices.camera", camera_module)
+    monkeypatch.setattr(camera_module, "sync_manifest", MagicMock())
+
+    camera = camera_module.Camera.__new__(camera_module.Camera)
+    camera.name = "BOX"
+    camera.cam = MagicMock()
+    camera.encoder = MagicMock()
+    camera.encoder_quality = None
+    camera.tracking = False
+    camera.is_recording = False
+    camera.recording_id = 0
+    camera.frame_log = FrameLog()
+    camera.detection = DetectionEngine()
+    camera.detection.configure([[0, 0, 4, 4]], [100], [True])
+    camera.reset_values()
+    camera.update_area_checks = lambda is_recording: None
+    # the detection of a frame waits until the test lets it go
+    camera.release = threading.Event()
+    camera.detect_and_trigger = lambda: camera.release.wait(5)
+    camera.detection_worker = DetectionWorker(camera.detection, camera.process_frame)
+    yield camera
+    camera.release.set()
+    camera.detection_worker.stop()
+
+
+def _record_frames(camera, frames):
+    for _ in range(frames):
+        camera.frame_number += 1
+        camera.detection_worker.submit(
+            np.zeros((4, 4, 3), np.uint8), camera.frame_metadata()
+        )
+
+
+def test_queued_frames_stay_in_their_recording(camera, tmp_path):
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    camera.start_recording(str(tmp_path / "first.mp4"), str(first))
+    _record_frames(camera, 3)
+    stale = camera.frame_metadata()
+    assert camera.detection_worker.stats()["queued"] > 0
+
+    # stop_recording waits for the queued frames
+    threading.Timer(0.2, camera.release.set).start()
+    camera.stop_recording()
+    camera.start_recording(str(tmp_path / "second.mp4"), str(second))
+    # a frame of the first recording submitted after it was closed
+    camera.detection_worker.submit(np.zeros((4, 4, 3), np.uint8), stale)
+    _record_frames(camera, 2)
+    camera.stop_recording()
+    assert camera.frame_log.wait(5)
+
+    assert pd.read_csv(first, sep=";")["frame"].tolist() == [1, 2, 3]
+    assert pd.read_csv(second, sep=";")["frame"].tolist() == [1, 2]
@@ -1,6 +1,17 @@
 import datetime
 
-from village.classes.collection import convert_active
+import numpy as np
+import pandas as pd
+import pytest
+
+from village.classes import collection as collection_module
+from village.classes.collection import (
+    Collection,
+    close_collections,
+    column_converter,
+    convert_active,
+)
+from village.classes.enums import Active
 from village.scripts.time_utils import time_utils
 
 # ── convert_active ───────────────────────────────────────────────────────────
@@ -110,3 +121,274 @@ class TestRange24Hours:
         start, end = time_utils.range_24_hours(day, datetime.time(8, 0))
         before = datetime.datetime(2025, 1, 7, 7, 59, 0)
         assert not (start <= before <= end)
+
+
+# ── Collection append buffer ─────────────────────────────────────────────────
+
+
+class _FakeSettings:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, key):
+        return str(self.directory)
+
+
+@pytest.fixture
+def events(tmp_path, monkeypatch):
+    monkeypatch.setattr(collection_module, "settings", _FakeSettings(tmp_path))
+    col = Collection()
+    col.create_data_collection(
+        "events", ["date", "type", "value", "weight"], [str, str, int, float]
+    )
+    return col
+
+
+class TestCollectionAppend:
+    def test_entries_are_buffered_until_read(self, events):
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        events.add_entry(["2025-01-07 08:00:01", "INFO", 4, 21.0])
+        assert events._n_pending == 2
+        assert len(events) == 2
+        df = events.df
+        assert events._n_pending == 0
+        assert df["value"].tolist() == [3, 4]
+        assert df["weight"].tolist() == [20.5, 21.0]
+
+    def test_invalid_values_use_defaults(self, events):
+        events.add_entry(["2025-01-07 08:00:00", "INFO", "x", float("nan")])
+        row = events.df.iloc[-1]
+        assert row["value"] == 0
+        assert row["weight"] == 0
+
+    def test_entries_are_written_to_csv(self, events):
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        lines = events.path.read_text().splitlines()
+        assert lines == ["date;type;value;weight", "2025-01-07 08:00:00;INFO;3;20.5"]
+
+    def test_setting_df_discards_buffer(self, events):
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        events.df = events.df.iloc[0:0]
+        events.add_entry(["2025-01-07 08:00:01", "INFO", 4, 21.0])
+        assert events.df["value"].tolist() == [4]
+
+    def test_wrong_length_raises(self, events):
+        with pytest.raises(ValueError):
+            events.add_entry(["2025-01-07 08:00:00", "INFO"])
+
+
+# ── Collection background writer ─────────────────────────────────────────────
+
+
+class _BufferedSettings(_FakeSettings):
+    def get(self, key):
+        if key == "BUFFERED_COLLECTIONS":
+            return Active.ON
+        return super().get(key)
+
+
+def _buffered_events():
+    col = Collection()
+    col.create_data_collection(
+        "events", ["date", "type", "value", "weight"], [str, str, int, float]
+    )
+    return col
+
+
+@pytest.fixture
+def buffered_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(collection_module, "settings", _BufferedSettings(tmp_path))
+    return tmp_path
+
+
+class TestCollectionWriter:
+    def test_entries_reach_the_csv_after_flush(self, buffered_settings):
+        events = _buffered_events()
+        for value in range(20):
+            events.add_entry(["2025-01-07 08:00:00", "INFO", value, 20.5])
+        events.flush()
+        lines = events.path.read_text().splitlines()
+        assert len(lines) == 21
+        assert lines[-1] == "2025-01-07 08:00:00;INFO;19;20.5"
+        assert not events._writer.journal_path.exists()
+        assert events.df["value"].tolist() == list(range(20))
+
+    def test_save_from_df_is_applied_in_order(self, buffered_settings):
+        events = _buffered_events()
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        events.change_last_entry("weight", 22.0)
+        events.add_entry(["2025-01-07 08:00:01", "INFO", 4, 21.0])
+        events.flush()
+        df = pd.read_csv(events.path, sep=";")
+        assert df["weight"].tolist() == [22.0, 21.0]
+
+    def test_journal_of_a_previous_run_is_recovered(self, buffered_settings):
+        events = _buffered_events()
+        writer = events._writer
+        writer._write_journal([["2025-01-07 08:00:00", "INFO", "3", "20.5"]])
+        events = _buffered_events()
+        assert events.df["value"].tolist() == [3]
+        assert not writer.journal_path.exists()
+
+    def test_interrupted_compaction_does_not_duplicate_rows(self, buffered_settings):
+        events = _buffered_events()
+        writer = events._writer
+        row = b"2025-01-07 08:00:00;INFO;3;20.5\n"
+        offset = writer.path.stat().st_size
+        writer.compact_path.write_bytes(str(offset).encode() + b"\n" + row)
+        # the rows were already appended when the system stopped
+        with open(writer.path, "ab") as file:
+            file.write(row)
+        events = _buffered_events()
+        assert events.df["value"].tolist() == [3]
+        assert not writer.compact_path.exists()
+
+    def test_close_writes_everything_and_stops_the_thread(self, buffered_settings):
+        events = _buffered_events()
+        writer = events._writer
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        close_collections(timeout=5)
+        assert not writer._thread.is_alive()
+        assert writer not in collection_module._writers
+        assert not writer.journal_path.exists()
+        events.add_entry(["2025-01-07 08:00:01", "INFO", 4, 21.0])
+        df = pd.read_csv(events.path, sep=";")
+        assert df["value"].tolist() == [3, 4]
+
+
+# ── Vectorised type conversion ───────────────────────────────────────────────
+
+
+def _reference(series, target_type):
+    return series.apply(lambda x: Collection.convert_with_default(x, target_type))
+
+
+_COLUMNS = {
+    "strings": pd.Series(
+        ["3", " +4 ", "-5", "007", "3.5", "1e3", "abc", "", "nan", "1_000", "True"]
+        + [None] * 2,
+        dtype="str",
+    ),
+    "objects": pd.Series(["3", "2.5", "x", None, np.nan, "", "None"], dtype=object),
+    "mixed": pd.Series([1, "2", 3.5, True, None, np.nan, "y"], dtype=object),
+    "ints": pd.Series([0, 1, -7, 2**40]),
+    "floats": pd.Series([0.0, -0.0, 1.5, -2.7, np.nan, 1e20, 0.1, 1e-7]),
+    "bools": pd.Series([True, False, True]),
+    "missing": pd.Series([np.nan, np.nan]),
+    "empty": pd.Series([], dtype="str"),
+}
+
+
+class TestConvertDfToTypes:
+    @pytest.mark.parametrize("target_type", [int, float, bool, str])
+    @pytest.mark.parametrize("name", list(_COLUMNS))
+    def test_same_result_as_convert_with_default(self, name, target_type):
+        series = _COLUMNS[name]
+        if target_type is int and name == "floats":
+            series = series[series.abs() < 2**63]
+        result = column_converter(target_type)(series.copy())
+        pd.testing.assert_series_equal(result, _reference(series, target_type))
+
+    def test_random_numbers_as_strings(self):
+        rng = np.random.default_rng(0)
+        values = rng.random(2000) * 10.0 ** rng.integers(-10, 10, 2000)
+        strings = [repr(float(v)) for v in values] + ["%.25f" % v for v in values[:200]]
+        for extra in (["12", "x"], [" 1.5 ", "nan", None]):
+            series = pd.Series(strings + extra, dtype="str")
+            for target_type in (int, float, bool, str):
+                pd.testing.assert_series_equal(
+                    column_converter(target_type)(series.copy()),
+                    _reference(series, target_type),
+                )
+
+    def test_infinite_floats_to_int_raise_like_before(self):
+        with pytest.raises(OverflowError):
+            column_converter(int)(pd.Series([1.0, np.inf]))
+
+    def test_other_types_are_converted_per_cell(self):
+        series = pd.Series(["2025-01-07", "x"], dtype="str")
+        result = column_converter(list)(series)
+        pd.testing.assert_series_equal(result, _reference(series, list))
+
+    def test_collection_file_round_trip(self, events):
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 3, 20.5])
+        events.add_entry(["2025-01-07 08:00:01", "", "x", float("nan")])
+        df = pd.read_csv(events.path, dtype=str, sep=";")
+        expected = df.copy()
+        for col, target_type in zip(expected.columns, events.types):
+            expected[col] = _reference(expected[col], target_type)
+        pd.testing.assert_frame_equal(events.convert_df_to_types(df), expected)
+
+
+# ── Time index ───────────────────────────────────────────────────────────────
+
+
+def _old_window(df, start):
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    return df[df["date"] >= start]
+
+
+class TestTimeIndex:
+    def test_window_matches_full_scan(self, events):
+        events.index_by_date(["type"])
+        base = datetime.datetime(2025, 1, 7, 8)
+        for i in range(50):
+            date = base + datetime.timedelta(minutes=10 * i)
+            events.add_entry([date.strftime("%Y-%m-%d %H:%M:%S"), f"T{i % 3}", i, 1])
+        start = base + datetime.timedelta(hours=5)
+        window = events.window(start)
+        expected = _old_window(events.df, start)
+        assert window["value"].tolist() == expected["value"].tolist()
+        assert window["type"].dtype == "category"
+        assert window["type"].astype(str).tolist() == expected["type"].tolist()
+        assert (window["date"] >= start).all()
+
+    def test_entries_added_after_a_query_are_indexed(self, events):
+        events.index_by_date()
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 1, 1])
+        assert len(events.window(datetime.datetime(2025, 1, 7))) == 1
+        events.add_entry(["2025-01-07 09:00:00", "INFO", 2, 1])
+        window = events.window(datetime.datetime(2025, 1, 7, 8, 30))
+        assert window["value"].tolist() == [2]
+        assert len(events._time_index) == 2
+
+    def test_index_is_rebuilt_when_df_is_replaced(self, events):
+        events.index_by_date()
+        events.add_entry(["2025-01-07 08:00:00", "INFO", 1, 1])
+        events.add_entry(["2025-01-07 09:00:00", "INFO", 2, 1])
+        events.window(datetime.datetime(2025, 1, 7))
+        events.df = events.df.iloc[1:].reset_index(drop=True)
+        window = events.window(datetime.datetime(2025, 1, 7))
+        assert window["value"].tolist() == [2]
+
+    def test_unsorted_and_invalid_dates(self, events):
+        events.index_by_date(["type"])
+        events.add_entry(["2025-01-07 09:00:00", "B", 1, 1])
+        events.add_entry(["2025-01-07 08:00:00", "A", 2, 1])
+        events.add_entry(["not a date", "", 3, 1])
+        events.add_entry(["2025-01-07 10:00:00", "C", 4, 1])
+        window = events.window(
+            datetime.datetime(2025, 1, 7, 8, 30), datetime.datetime(2025, 1, 7, 10)
+        )
+        assert window["value"].tolist() == [1]
+        window = events.window(datetime.datetime(2025, 1, 7))
+        assert window["value"].tolist() == [2, 1, 4]
+
+    def test_missing_text_values_are_nan(self, events):
+        events.index_by_date(["type"])
+        events.df = pd.DataFrame(
+            {
+                "date": ["2025-01-07 08:00:00"],
+                "type": pd.Series([None], dtype="str"),
+                "value": [1],
+                "weight": [1.0],
+            }
+        )
+        window = events.window(datetime.datetime(2025, 1, 7))
+        assert window["type"].isna().all()
+        assert not window["type"].str.startswith("A").fillna(False).any()
+
+    def test_window_requires_index(self, events):
+        with pytest.raises(RuntimeError):
+            events.window(datetime.datetime(2025, 1, 7))
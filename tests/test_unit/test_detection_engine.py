@@ -0,0 +1,191 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+from village.classes.detection_engine import (
+    DetectionEngine,
+    DetectionWorker,
+    TimingHistogram,
+)
+
+pytestmark = pytest.mark.skipif(
+    isinstance(cv2, MagicMock), reason="OpenCV is not installed"
+)
+
+AREAS = [[100, 300, 200, 350], [200, 300, 300, 350], [300, 290, 400, 360], [0, 0, 5, 5]]
+
+
+def _frame(seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(120, 255, (480, 640, 4), dtype=np.uint8)
+    # a dark mouse crossing areas 1 and 2
+    frame[310:340, 170:240, :3] = 20
+    return frame
+
+
+def _reference(frame, areas, thresholds, active, black, min_area):
+    """Full-frame detection as Camera did before the engine."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    kind = cv2.THRESH_BINARY_INV if black else cv2.THRESH_BINARY
+    mask = np.zeros_like(gray)
+    counts = []
+    for (x1, y1, x2, y2), threshold, on in zip(areas, thresholds, active):
+        if not on:
+            counts.append(-1)
+            continue
+        _, roi_bin = cv2.threshold(gray[y1:y2, x1:x2], threshold, 255, kind)
+        sub = mask[y1:y2, x1:x2]
+        np.maximum(sub, roi_bin, out=sub)
+        counts.append(cv2.countNonZero(roi_bin))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = max(
+        (c for c in contours if cv2.contourArea(c) >= min_area),
+        key=cv2.contourArea,
+        default=None,
+    )
+    if best is None:
+        return counts, (-1, -1)
+    M = cv2.moments(best)
+    return counts, (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
+
+
+@pytest.mark.parametrize(
+    "thresholds, active, black",
+    [
+        ([100, 100, 100, 100], [True, True, True, False], True),
+        ([100, 100, 100, 100], [True, True, True, True], True),
+        ([100, 80, 150, 100], [True, True, True, False], True),
+        ([200, 200, 200, 200], [True, False, True, False], False),
+    ],
+)
+def test_engine_matches_full_frame_detection(thresholds, active, black):
+    engine = DetectionEngine()
+    engine.configure(AREAS, thresholds, active)
+    for seed in range(3):
+        frame = _frame(seed)
+        engine.convert(frame)
+        engine.detect(black)
+        position = engine.position_contours(50)
+        engine.finish()
+        counts, expected_position = _reference(
+            frame, AREAS, thresholds, active, black, 50
+        )
+        assert engine.counts == counts
+        assert position == expected_position
+        for mask, count, on in zip(engine.masks, engine.counts, active):
+            if on:
+                assert cv2.countNonZero(mask) == count
+            else:
+                assert mask == -1
+    assert engine.timing.frames == 3
+
+
+def test_components_position_is_in_frame_coordinates():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [True, True, True, False])
+    engine.convert(_frame())
+    engine.detect(black=True)
+    assert engine.position_components(50) == (204, 324)
+
+
+def test_buffers_are_reused_across_frames():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [True, True, True, False])
+    engine.convert(_frame(0))
+    engine.detect(black=True)
+    mask = engine.masks[0]
+    engine.convert(_frame(1))
+    engine.detect(black=True)
+    assert engine.masks[0] is mask
+    assert engine.bbox == (100, 290, 400, 360)
+
+
+def test_results_of_a_frame_are_not_changed_by_the_next():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [True, True, True, False])
+    engine.convert(_frame(0))
+    engine.detect(black=True)
+    masks, counts = engine.results()
+    first = list(counts)
+    engine.convert(_frame(1))
+    engine.detect(black=True)
+    assert counts == first
+    assert engine.results()[1] is not counts
+    assert engine.results()[0][0] is masks[0]
+
+
+def test_no_active_areas():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [False] * 4)
+    engine.convert(_frame())
+    engine.detect(black=True)
+    assert engine.counts == [-1] * 4
+    assert engine.position_contours(50) == (-1, -1)
+
+
+def test_timing_histogram():
+    histogram = TimingHistogram(bin_width=1.0, max_ms=10.0)
+    for duration in [0.5, 1.5, 1.7, 2.2, 50.0]:
+        histogram.add(duration)
+    assert histogram.counts.tolist() == [1, 2, 1, 0, 0, 0, 0, 0, 0, 1]
+    summary = histogram.summary(framerate=200)
+    assert summary["frames"] == 5
+    assert summary["worst"] == 50.0
+    assert summary["p50"] == 2.0
+    assert summary["over_frame_period"] == 1
+
+
+def _wait_processed(worker, n, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while worker.processed < n and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_worker_detects_in_order():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [True, True, True, False])
+    results = []
+
+    def process(gray, layout, metadata):
+        engine.load(gray, layout)
+        engine.detect(black=True)
+        results.append((metadata["frame_number"], list(engine.counts)))
+
+    worker = DetectionWorker(engine, process, slots=2, frame_period=1.0)
+    for frame_number in range(5):
+        worker.submit(_frame(frame_number), {"frame_number": frame_number})
+        _wait_processed(worker, frame_number + 1)
+    worker.stop()
+    assert [frame_number for frame_number, _ in results] == list(range(5))
+    for frame_number, counts in results:
+        expected, _ = _reference(
+            _frame(frame_number), AREAS, [100] * 4, [True] * 3 + [False], True, 50
+        )
+        assert counts == expected
+    assert worker.stats()["dropped"] == 0
+    assert worker.engine.timing.frames == 5
+
+
+def test_worker_keeps_metadata_of_dropped_frames():
+    engine = DetectionEngine()
+    engine.configure(AREAS, [100] * 4, [True, True, True, False])
+    release = threading.Event()
+    seen = []
+
+    def process(gray, layout, metadata):
+        release.wait(5)
+        seen.append((metadata["frame_number"], metadata["dropped"], gray is None))
+
+    worker = DetectionWorker(engine, process, slots=2, frame_period=0.001)
+    for frame_number in range(6):
+        worker.submit(_frame(), {"frame_number": frame_number})
+    release.set()
+    worker.stop()
+    assert [frame_number for frame_number, _, _ in seen] == list(range(6))
+    assert worker.dropped == sum(dropped for _, dropped, _ in seen) >= 3
+    assert all(no_image == dropped for _, dropped, no_image in seen)
+    assert worker.late >= 1
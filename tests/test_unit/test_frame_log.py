@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from village.classes.frame_log import FrameLog
+
+
+def _record(frame_log, frames, annotation=lambda i: "trial " + str(i // 10)):
+    for i in range(frames):
+        frame_log.append(i + 1, i // 10, annotation(i), 1000.0 + i / 30, i, 2 * i)
+
+
+def test_frames_are_written_in_chunks(tmp_path):
+    path = str(tmp_path / "BOX.csv")
+    frame_log = FrameLog(capacity=16, chunk_rows=8)
+    frame_log.start(path, tracking=True)
+    _record(frame_log, 50)
+    assert len(frame_log) == 50 % 8
+    assert frame_log.capacity == 16
+    frame_log.stop()
+    assert frame_log.wait(5)
+    df = pd.read_csv(path, sep=";")
+    assert list(df.columns) == FrameLog.COLUMNS
+    assert df["frame"].tolist() == list(range(1, 51))
+    assert df["annotation"].tolist() == ["trial " + str(i // 10) for i in range(50)]
+    assert df["y_position"].tolist() == [2 * i for i in range(50)]
+    assert np.allclose(df["timestamp"], 1000.0 + np.arange(50) / 30)
+
+
+def test_positions_are_not_saved_without_tracking(tmp_path):
+    path = str(tmp_path / "CORRIDOR.csv")
+    frame_log = FrameLog()
+    frame_log.start(path, tracking=False)
+    _record(frame_log, 5)
+    frame_log.stop()
+    frame_log.wait(5)
+    df = pd.read_csv(path, sep=";")
+    assert list(df.columns) == ["frame", "trial", "annotation", "timestamp"]
+
+
+def test_buffers_grow_when_chunks_are_larger(tmp_path):
+    frame_log = FrameLog(capacity=4, chunk_rows=100)
+    frame_log.start(str(tmp_path / "BOX.csv"), tracking=True)
+    _record(frame_log, 30)
+    assert frame_log.capacity == 32
+    assert len(frame_log) == 30
+
+
+def test_empty_recording_writes_the_header(tmp_path):
+    path = str(tmp_path / "BOX.csv")
+    frame_log = FrameLog()
+    frame_log.start(path, tracking=False)
+    frame_log.stop()
+    frame_log.wait(5)
+    assert pd.read_csv(path, sep=";").empty
+
+
+def test_new_recording_finishes_the_previous_one(tmp_path):
+    frame_log = FrameLog(chunk_rows=4)
+    frame_log.start(str(tmp_path / "first.csv"), tracking=False)
+    _record(frame_log, 6, annotation=lambda i: "a" if i < 3 else "b")
+    frame_log.start(str(tmp_path / "second.csv"), tracking=False)
+    _record(frame_log, 2, annotation=lambda i: "c")
+    frame_log.stop()
+    frame_log.wait(5)
+    first = pd.read_csv(tmp_path / "first.csv", sep=";")
+    second = pd.read_csv(tmp_path / "second.csv", sep=";")
+    assert first["annotation"].tolist() == ["a"] * 3 + ["b"] * 3
+    assert second["annotation"].tolist() == ["c", "c"]
+
+
+def test_position_override(tmp_path):
+    path = str(tmp_path / "BOX.csv")
+    frame_log = FrameLog(chunk_rows=4)
+    frame_log.start(path, tracking=True)
+    frame_log.position_override = lambda timestamps: (
+        np.full(len(timestamps), 7),
+        np.full(len(timestamps), 8),
+    )
+    _record(frame_log, 10)
+    frame_log.stop()
+    frame_log.wait(5)
+    df = pd.read_csv(path, sep=";")
+    assert df["x_position"].tolist() == [7] * 10
+    assert df["y_position"].tolist() == [8] * 10
+
+
+def test_nothing_is_stored_without_path():
+    frame_log = FrameLog()
+    frame_log.start(None, tracking=True)
+    _record(frame_log, 10)
+    assert len(frame_log) == 0
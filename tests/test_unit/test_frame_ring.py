@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from village.classes.frame_ring import FrameRing
+
+
+def _filled_ring(frames: int, capacity: int = 3, fps: float = 10.0) -> FrameRing:
+    ring = FrameRing(capacity, fps)
+    ring.allocate(2, 2)
+    for n in range(frames):
+        ring.buffer(n)[:] = n
+        ring.publish(n)
+    return ring
+
+
+def test_ring_is_filled_before_play():
+    ring = FrameRing(capacity=3)
+    assert ring.wait_writable(0, timeout=0)
+    ring = _filled_ring(3)
+    assert not ring.wait_writable(3, timeout=0.01)
+    assert ring.select() is None
+
+
+def test_newest_due_frame_is_selected():
+    ring = _filled_ring(3)
+    ring.play(now=100.0)
+    assert ring.select(now=100.0) == 0
+    assert ring.select(now=100.05) == 0
+    assert ring.select(now=100.25) == 2
+    assert ring.buffer(2)[0, 0, 0] == 2
+    stats = ring.stats()
+    assert (stats.decoded, stats.converted, stats.shown, stats.dropped) == (
+        3,
+        3,
+        2,
+        1,
+    )
+    assert stats.margin == 0.0
+
+
+def test_buffer_on_screen_is_not_overwritten():
+    ring = _filled_ring(3)
+    ring.play(now=time.monotonic() - 0.05)
+    assert ring.select() == 0
+    assert not ring.wait_writable(3, timeout=0.01)
+    ring.play(now=time.monotonic() - 0.25)
+    assert ring.select() == 2
+    for n in (3, 4):
+        assert ring.wait_writable(n, timeout=0)
+        assert ring.slot(n) != ring.slot(2)
+        ring.publish(n)
+    assert not ring.wait_writable(5, timeout=0.01)
+    assert ring.buffer(2)[0, 0, 0] == 2
+
+
+def test_skipped_frames_do_not_take_a_buffer():
+    ring = _filled_ring(1)
+    ring.play(now=time.monotonic() - 0.3)
+    assert ring.select() == 0
+    for n in (1, 2):
+        assert ring.late(n)
+        ring.skip(n)
+    assert ring.wait_writable(3, timeout=0)
+
+
+def test_late_frames_are_skipped():
+    ring = _filled_ring(0)
+    ring.play(now=100.0)
+    assert ring.late(1, now=100.25)
+    assert not ring.late(3, now=100.25)
+    ring.skip(1)
+    assert ring.stats().dropped == 1
+    assert ring.stats().converted == 0
+
+
+def test_play_again_resumes_after_the_frame_on_screen():
+    ring = _filled_ring(3)
+    ring.play(now=100.0)
+    assert ring.select(now=100.15) == 1
+    ring.play(now=200.0)
+    assert ring.select(now=200.0) == 2
+    assert ring.due(3) == pytest.approx(200.1)
+
+
+def test_decoder_is_paced_by_the_video_fps():
+    fps = 200.0
+    ring = FrameRing(capacity=3, fps=fps)
+    ring.allocate(2, 2)
+    running = True
+
+    def decode():
+        n = 0
+        while running:
+            if not ring.wait_writable(n, timeout=0.01):
+                continue
+            if ring.late(n):
+                ring.skip(n)
+            else:
+                ring.publish(n)
+            n += 1
+
+    decoder = threading.Thread(target=decode, daemon=True)
+    decoder.start()
+    time.sleep(0.05)
+    assert ring.stats().decoded == 3
+
+    ring.play()
+    start = time.monotonic()
+    while time.monotonic() - start < 0.2:
+        ring.select()
+        time.sleep(0.002)
+    running = False
+    decoder.join()
+
+    stats = ring.stats()
+    assert stats.decoded <= 0.3 * fps + ring.capacity
+    assert stats.shown > 0
+    assert stats.decoded >= stats.shown + stats.dropped - ring.capacity
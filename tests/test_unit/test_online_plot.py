@@ -0,0 +1,88 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+
+from village.classes.session_table import SessionTable  # noqa: E402
+from village.custom_classes.online_plot_base import OnlinePlotBase  # noqa: E402
+
+
+class IncrementalPlot(OnlinePlotBase):
+    def __init__(self):
+        super().__init__()
+        self.received = []
+
+    def create_figure_and_axes(self):
+        self.fig, self.ax = plt.subplots()
+        self.line = self.add_line(self.ax, "o")
+
+    def append_trials(self, df):
+        self.received.append(df["trial"].tolist())
+        self.extend_line(self.line, df["trial"], df["correct"])
+
+
+def _table(trials):
+    table = SessionTable()
+    for trial in range(1, trials + 1):
+        table.append({"trial": trial, "TRIAL_START": trial * 10.0, "correct": 1})
+    return table
+
+
+def test_append_trials_receives_only_new_rows():
+    plot = IncrementalPlot()
+    table = _table(3)
+    plot.update_session(table)
+    table.append({"trial": 4, "correct": 0})
+    plot.update_session(table)
+    plot.update_session(table)
+    assert plot.received == [[1, 2, 3], [4]]
+    assert plot.version == 4
+    assert plot.line.get_xdata() == [1, 2, 3, 4]
+    plot.close()
+
+
+def test_new_session_restarts_the_lines():
+    plot = IncrementalPlot()
+    plot.update_session(_table(3))
+    plot.update_session(_table(2))
+    assert plot.received == [[1, 2, 3], [1, 2]]
+    assert plot.line.get_xdata() == [1, 2]
+    plot.close()
+
+
+def test_axes_are_redrawn_only_when_the_limits_grow(monkeypatch):
+    plot = IncrementalPlot()
+    table = _table(1)
+    plot.update_session(table)
+    canvas = plot.fig.canvas
+    full_draws = []
+    draw = canvas.draw
+    monkeypatch.setattr(canvas, "draw", lambda: full_draws.append(1) or draw())
+    plot.draw_pending()
+    assert len(full_draws) == 1
+    for trial in range(2, 30):
+        table.append({"trial": trial, "TRIAL_START": trial * 10.0, "correct": 1})
+        plot.update_session(table)
+        plot.draw_pending()
+    # the x axis grows with a margin, not after every trial
+    assert 1 < len(full_draws) < 10
+    assert plot.ax.get_xlim()[1] >= 29
+    plot.close()
+
+
+def test_plots_without_append_trials_are_redrawn():
+    plot = OnlinePlotBase()
+    assert not plot.incremental
+    plot.update_session(_table(2))
+    assert len(plot.ax.collections) == 1
+    plot.close()
+
+
+def test_incremental_is_set_by_defining_append_trials():
+    class RedrawnPlot(IncrementalPlot):
+        incremental = False
+
+    assert IncrementalPlot.incremental
+    assert not RedrawnPlot.incremental
+    assert OnlinePlotBase().append_trials(_table(1).df) is None
@@ -0,0 +1,155 @@
+import importlib
+import os
+import sys
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from village.classes import null_classes
+
+
+class _QtClass(type):
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return MagicMock()
+
+
+class _Widget(metaclass=_QtClass):
+    # stands in for QOpenGLWidget, any Qt method or constant is a mock
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = MagicMock()
+        object.__setattr__(self, name, value)
+        return value
+
+
+def _image(path):
+    image = MagicMock()
+    image.convertToFormat.return_value = image
+    image.isNull.return_value = not os.path.exists(path)
+    return image
+
+
+def _texture(*args):
+    texture = MagicMock()
+    texture.width.return_value = 2
+    texture.height.return_value = 2
+    return texture
+
+
+@pytest.fixture
+def screen(monkeypatch, tmp_path):
+    qt_widgets = MagicMock()
+    qt_widgets.QOpenGLWidget = _Widget
+    qt_widgets.QApplication.instance.return_value = None
+    qt_gui = MagicMock()
+    # no secondary screen, so the module level screen is a NullScreen
+    qt_gui.QGuiApplication.screens.return_value = []
+    qt_gui.QImage.side_effect = _image
+    qt_gui.QOpenGLTexture.side_effect = _texture
+    monkeypatch.setitem(sys.modules, "PyQt5.QtWidgets", qt_widgets)
+    monkeypatch.setitem(sys.modules, "PyQt5.QtGui", qt_gui)
+    for name in ("gpiod", "gpiod.line", "village.devices.sound_device"):
+        monkeypatch.setitem(sys.modules, name, MagicMock())
+    # NullScreen subclasses the mocked QWidget of the conftest
+    monkeypatch.setattr(null_classes, "NullScreen", MagicMock())
+    monkeypatch.delitem(sys.modules, "village.devices.screen", raising=False)
+    screen_module = importlib.import_module("village.devices.screen")
+    monkeypatch.setitem(sys.modules, "village.devices.screen", screen_module)
+
+    settings = MagicMock()
+    settings.get.return_value = str(tmp_path)
+    monkeypatch.setattr(screen_module, "settings", settings)
+    geometry = MagicMock()
+    geometry.width.return_value = 2
+    geometry.height.return_value = 2
+    screen = screen_module.Screen(geometry)
+    screen._gpio_request = MagicMock()
+    screen.Value = screen_module.Value
+    screen.time_utils = MagicMock()
+    monkeypatch.setattr(screen_module, "time_utils", screen.time_utils)
+    return screen
+
+
+def _sync_values(screen):
+    values = [c.args[1] for c in screen._gpio_request.set_value.call_args_list]
+    screen._gpio_request.set_value.reset_mock()
+    return values
+
+
+def test_frame_timing_counts_late_swaps(screen):
+    screen.active = True
+    screen._refresh_period = 1 / 60
+    for now in (0.0, 1 / 60, 2 / 60, 5 / 60):
+        screen.time_utils.get_time_monotonic.return_value = now
+        screen._on_frame_swapped()
+    timing = screen.get_frame_timing()
+    assert timing["swaps"] == 4
+    assert timing["mean"] == pytest.approx(5 / 180)
+    assert timing["max"] == pytest.approx(3 / 60)
+    assert timing["late"] == 1
+
+
+def test_sync_is_held_until_the_new_frame_is_swapped(screen):
+    worker = MagicMock()
+    worker.get_latest_frame.return_value = (0, np.zeros((2, 2, 4), np.uint8))
+    screen._video_worker = worker
+    screen._draw_fn = screen.draw_video_texture
+    screen.active = True
+    active, inactive = screen.Value.ACTIVE, screen.Value.INACTIVE
+
+    screen.paintGL()
+    assert _sync_values(screen) == [active]
+    screen._on_frame_swapped()
+    assert _sync_values(screen) == [inactive]
+
+    # the same frame is not uploaded again and does not hold the line
+    screen.paintGL()
+    assert _sync_values(screen) == [active, inactive]
+    assert screen._video_texture.setData.call_count == 1
+
+
+def test_image_textures_follow_the_file(screen, tmp_path):
+    image = tmp_path / "a.png"
+    image.write_bytes(b"a")
+    (tmp_path / "b.png").write_bytes(b"b")
+    screen.draw_image_texture("a.png")
+    texture = screen._textures["a.png"]
+    screen.draw_image_texture("a.png")
+    assert screen._textures["a.png"] is texture
+    screen.draw_image_texture("b.png")
+    assert screen._textures["b.png"] is not texture
+
+    stat = image.stat()
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    screen.draw_image_texture("a.png")
+    assert screen._textures["a.png"] is not texture
+    assert screen._stale_textures == [texture]
+
+    screen.active = True
+    screen._draw_fn = lambda: None
+    screen.paintGL()
+    texture.destroy.assert_called_once()
+    assert screen._stale_textures == []
+
+
+def test_image_cache_is_bounded_and_skips_missing_files(screen, tmp_path):
+    screen.image_cache_size = 2
+    for name in ("a.png", "b.png", "c.png"):
+        (tmp_path / name).write_bytes(b"x")
+        screen.draw_image_texture(name)
+    texture = screen._textures["b.png"]
+    screen.preload_images("b.png", "missing.png")
+    assert list(screen._image_cache) == ["c.png", "b.png"]
+    assert list(screen._textures) == ["b.png", "c.png"]
+    assert screen._textures["b.png"] is texture
+    assert len(screen._stale_textures) == 1
+
+    screen.draw_image_texture("missing.png")
+    assert "missing.png" not in screen._textures
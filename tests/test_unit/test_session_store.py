@@ -0,0 +1,103 @@
+import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from village.classes.session_store import SessionStore
+from village.classes.subject_store import SubjectStore
+
+
+def _session(session, date, task="Habituation", trials=3, **extra):
+    data = {
+        "session": [session] * trials,
+        "date": [date] * trials,
+        "trial": list(range(1, trials + 1)),
+        "subject": ["A1"] * trials,
+        "task": [task] * trials,
+        "water": [10] * trials,
+        "ordered_list_of_events": [["Port1In", "Port1Out"]] * trials,
+    }
+    for key, value in extra.items():
+        data[key] = [value] * trials
+    return pd.DataFrame(data)
+
+
+def _store(tmp_path):
+    store = SessionStore(tmp_path)
+    store.append_session(_session(1, "2025-01-07 08:00:00"))
+    store.append_session(_session(2, "2025-01-08 08:00:00", correct=1))
+    store.append_session(_session(3, "2025-01-09 08:00:00", task="Training"))
+    return store
+
+
+def test_recent_sessions_are_consolidated(tmp_path):
+    store = _store(tmp_path)
+    assert len(store) == 3
+    assert store.last_session == 3
+    assert (tmp_path / "parquet" / "recent" / "session=2.parquet").exists()
+    before = store.query()
+
+    store.consolidate()
+    assert not (tmp_path / "parquet" / "recent").exists()
+    assert pq.ParquetFile(store.data_path).num_row_groups == 3
+    store = SessionStore(tmp_path)
+    assert [entry["row_group"] for entry in store.index] == [0, 1, 2]
+    pd.testing.assert_frame_equal(store.query(), before)
+    store.append_session(_session(4, "2025-01-10 08:00:00"))
+    assert store.query(start="2025-01-08")["session"].unique().tolist() == [2, 3, 4]
+
+
+def test_consolidation_after_every_few_sessions(tmp_path):
+    store = SessionStore(tmp_path)
+    store.consolidate_every = 2
+    written = store.append_session(_session(1, "2025-01-07 08:00:00"))
+    assert store.index[0]["row_group"] is None
+    assert written == [
+        tmp_path / "parquet" / "recent" / "session=1.parquet",
+        store.index_path,
+    ]
+    written = store.append_session(_session(2, "2025-01-08 08:00:00"))
+    assert [entry["row_group"] for entry in store.index] == [0, 1]
+    assert written == [store.data_path, store.index_path]
+
+
+def test_query_all(tmp_path):
+    df = _store(tmp_path).query()
+    assert df["session"].tolist() == [1] * 3 + [2] * 3 + [3] * 3
+    assert df.columns[0] == "session"
+    assert df["correct"].isna().sum() == 6
+    assert df["ordered_list_of_events"].iloc[0] == "['Port1In', 'Port1Out']"
+
+
+def test_query_date_range(tmp_path):
+    df = _store(tmp_path).query(start="2025-01-08", end="2025-01-08 23:59:59")
+    assert df["session"].unique().tolist() == [2]
+
+
+def test_query_date_only_end_includes_the_whole_day(tmp_path):
+    store = _store(tmp_path)
+    df = store.query(start="2025-01-08", end="2025-01-08")
+    assert df["session"].unique().tolist() == [2]
+    df = store.query(end=datetime.date(2025, 1, 8))
+    assert df["session"].unique().tolist() == [1, 2]
+    df = store.query(end="2025-01-08 07:00")
+    assert df["session"].unique().tolist() == [1]
+
+
+def test_query_tasks_and_columns(tmp_path):
+    df = _store(tmp_path).query(tasks=["Training"], columns=["session", "trial"])
+    assert list(df.columns) == ["session", "trial"]
+    assert df["session"].unique().tolist() == [3]
+
+
+def test_update_from_imports_missing_history(tmp_path):
+    subject_store = SubjectStore(tmp_path / "A1.csv")
+    for i in range(3):
+        session_df = _session(0, "2025-01-0%d 08:00:00" % (i + 7)).drop(
+            columns="session"
+        )
+        subject_store.append_session(session_df)
+    columnar = SessionStore(tmp_path)
+    columnar.update_from(subject_store, session_df)
+    assert columnar.last_session == 3
+    assert len(columnar.query()) == 9
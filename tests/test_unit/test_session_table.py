@@ -0,0 +1,69 @@
+import math
+import warnings
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from village.classes.session_table import SessionFrame, SessionTable
+
+ROWS = [
+    {"trial": 1, "TRIAL_START": 1000.0, "side": "left", "STATE_a_START": [1.0]},
+    {"trial": 2, "TRIAL_START": 1010.0, "side": "right", "water": 5},
+    {"trial": 3, "TRIAL_START": 1020.0, "STATE_a_START": [2.0, 3.0], "water": 0},
+]
+
+
+def test_matches_concatenated_rows():
+    table = SessionTable()
+    expected = pd.DataFrame()
+    for row in ROWS:
+        table.append(row)
+        expected = pd.concat([expected, pd.DataFrame([row])], ignore_index=True)
+    pdt.assert_frame_equal(table.df, expected)
+    assert table.columns == list(expected.columns)
+    assert len(table) == table.version == 3
+
+
+def test_rows_since_version():
+    table = SessionTable()
+    assert table.rows_since(0).empty
+    table.append(ROWS[0])
+    version = table.version
+    table.append(ROWS[1])
+    table.append(ROWS[2])
+    new_rows = table.rows_since(version)
+    assert new_rows.index.tolist() == [1, 2]
+    assert new_rows["trial"].tolist() == [2, 3]
+    assert math.isnan(new_rows["side"].iloc[1])
+    assert table.rows_since(table.version).empty
+
+
+def test_df_changes_do_not_modify_the_table():
+    table = SessionTable()
+    table.append(ROWS[0])
+    df = table.df
+    df["run_mode"] = "Auto"
+    df.loc[0, "trial"] = 10
+    assert "run_mode" not in table.df
+    assert table.df["trial"].tolist() == [1]
+
+
+def test_session_frame_warns_on_column_assignment():
+    table = SessionTable()
+    table.append(ROWS[0])
+    session_df = SessionFrame(table.df)
+    with pytest.warns(UserWarning, match="session_df"):
+        session_df["run_mode"] = "Auto"
+    df = session_df.copy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        df["run_mode"] = "Auto"
+
+
+def test_created_from_dataframe():
+    df = pd.DataFrame({"trial": [1, 2], "water": [5, 0]})
+    table = SessionTable(df)
+    table.append({"trial": 3, "water": 5})
+    assert table.df["water"].tolist() == [5, 0, 5]
+    assert table.rows_since(2)["trial"].tolist() == [3]
@@ -0,0 +1,75 @@
+from village.classes.settings_class import Setting, Settings
+
+
+class _FakeQSettings:
+    def __init__(self):
+        self.values = {}
+        self.reads = 0
+
+    def value(self, key):
+        self.reads += 1
+        return self.values.get(key)
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+    def allKeys(self):
+        return list(self.values)
+
+    def sync(self):
+        pass
+
+
+def _make_settings():
+    groups = [[] for _ in range(22)]
+    groups[0] = [
+        Setting("SYSTEM_NAME", "village01", str, "Name."),
+        Setting("SCREEN_RESOLUTION", [1600, 900], list[int], "Resolution."),
+        Setting("TOUCH_INTERVAL", 0.5, float, "Interval."),
+    ]
+    groups[-1] = [Setting("FIRST_LAUNCH", "OFF", str, "First launch.")]
+    settings = Settings(*groups)
+    fake = _FakeQSettings()
+    settings.saved_settings = fake
+    settings.restore_all_settings()
+    settings.populate_cache()
+    return settings, fake
+
+
+def test_get_is_served_from_cache():
+    settings, fake = _make_settings()
+    reads = fake.reads
+    assert settings.get("TOUCH_INTERVAL") == 0.5
+    assert settings.get("TOUCH_INTERVAL") == 0.5
+    assert fake.reads == reads
+    assert settings.cache_hits >= 2
+
+
+def test_set_invalidates_key():
+    settings, fake = _make_settings()
+    misses = settings.cache_misses
+    settings.set("TOUCH_INTERVAL", "0.25")
+    assert settings.get("TOUCH_INTERVAL") == 0.25
+    assert settings.cache_misses == misses + 1
+    assert settings.get("TOUCH_INTERVAL") == 0.25
+    assert settings.cache_misses == misses + 1
+
+
+def test_sync_invalidates_all():
+    settings, fake = _make_settings()
+    fake.values["SYSTEM_NAME"] = "village02"
+    assert settings.get("SYSTEM_NAME") == "village01"
+    settings.sync()
+    assert settings.get("SYSTEM_NAME") == "village02"
+
+
+def test_cached_lists_are_copies():
+    settings, _ = _make_settings()
+    resolution = settings.get("SCREEN_RESOLUTION")
+    resolution.append(0)
+    assert settings.get("SCREEN_RESOLUTION") == [1600, 900]
+
+
+def test_unknown_key_returns_none():
+    settings, _ = _make_settings()
+    assert settings.get("NOT_A_SETTING") is None
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from village.pybpodapi.bpod.bpod_base import BpodBase
+from village.pybpodapi.hardware.hardware import Hardware
+from village.pybpodapi.state_machine.state_machine_builder import StateMachineCache
+from village.pybpodapi.state_machine.state_machine_runner import StateMachineRunner
+
+
+@pytest.fixture
+def hardware():
+    hardware = Hardware()
+    hardware.inputs = "XBBPPP"
+    hardware.outputs = "XVBBPPP"
+    hardware.max_states = 32
+    hardware.max_serial_events = 15
+    hardware.cycle_period = 100
+    hardware.inputs_enabled = [1] * len(hardware.inputs)
+    hardware.n_global_timers = 2
+    hardware.n_global_counters = 1
+    hardware.n_conditions = 1
+    hardware.setup([])
+    return hardware
+
+
+def make_sma(hardware, wait=5.0, target="reward"):
+    sma = StateMachineRunner(SimpleNamespace(hardware=hardware))
+    sma.add_state(
+        state_name="wait",
+        state_timer=wait,
+        state_change_conditions={"Port1In": target, "Tup": "exit"},
+    )
+    sma.add_state(
+        state_name="reward",
+        state_timer=0.1,
+        state_change_conditions={"Tup": "exit"},
+        output_actions=[("Valve1", 255)],
+    )
+    sma.add_state(
+        state_name="punish",
+        state_timer=1,
+        state_change_conditions={"Tup": "exit"},
+    )
+    sma.update_state_numbers()
+    return sma
+
+
+def full_build(sma, run_asap=None):
+    body = (
+        sma.build_message()
+        + sma.build_message_global_timer()
+        + sma.build_message_32_bits()
+    )
+    return sma.build_header(run_asap, len(body)) + body
+
+
+class TestStateMachineCache:
+    def test_same_message_as_full_build(self, hardware):
+        cache = StateMachineCache()
+        for wait in [5.0, 5.0, 2.5]:
+            cached = cache.build(make_sma(hardware, wait))
+            assert cached == full_build(make_sma(hardware, wait))
+        assert cache.misses == 1
+        assert cache.hits == 2
+
+    def test_hit_restores_compiled_state(self, hardware):
+        cache = StateMachineCache()
+        first = make_sma(hardware)
+        cache.build(first)
+        second = make_sma(hardware, wait=1.0)
+        cache.build(second)
+        assert second.transition_table is first.transition_table
+        assert second.event_names == first.event_names
+        assert len(second.state_timers) == second.total_states_added
+
+    def test_structure_change_misses(self, hardware):
+        cache = StateMachineCache()
+        cache.build(make_sma(hardware, target="reward"))
+        message = cache.build(make_sma(hardware, target="punish"))
+        assert cache.misses == 2
+        assert message == full_build(make_sma(hardware, target="punish"))
+
+    def test_max_size(self, hardware):
+        cache = StateMachineCache(max_size=1)
+        cache.build(make_sma(hardware, target="reward"))
+        cache.build(make_sma(hardware, target="punish"))
+        cache.build(make_sma(hardware, target="reward"))
+        assert len(cache) == 1
+        assert cache.misses == 3
+
+
+@pytest.fixture
+def bpod(hardware):
+    bpod = BpodBase(None, None, 255, 1, None, [23], [], [], reuse_state_machine=True)
+    bpod._hardware = hardware
+    bpod.bpod_com_ready = True
+    bpod._bpodcom_send_state_machine = MagicMock()
+    return bpod
+
+
+class TestSendStateMachine:
+    def test_identical_state_machine_is_not_sent(self, bpod, hardware):
+        bpod.send_state_machine(make_sma(hardware))
+        bpod._new_sma_sent = False
+        bpod.send_state_machine(make_sma(hardware))
+        assert bpod._bpodcom_send_state_machine.call_count == 1
+        assert not bpod._new_sma_sent
+
+    def test_timer_change_is_sent(self, bpod, hardware):
+        bpod.send_state_machine(make_sma(hardware, wait=5.0))
+        bpod.send_state_machine(make_sma(hardware, wait=2.0))
+        assert bpod._bpodcom_send_state_machine.call_count == 2
+        assert bpod._sma_cache.hits == 1
+
+    def test_always_sent_when_reuse_is_off(self, bpod, hardware):
+        bpod.reuse_state_machine = False
+        bpod.send_state_machine(make_sma(hardware))
+        bpod.send_state_machine(make_sma(hardware))
+        assert bpod._bpodcom_send_state_machine.call_count == 2
@@ -0,0 +1,112 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from village.pybpodapi.hardware.hardware import Hardware
+from village.pybpodapi.state_machine.state_machine_runner import StateMachineRunner
+
+
+@pytest.fixture
+def hardware():
+    hardware = Hardware()
+    hardware.inputs = "XBBPPP"
+    hardware.outputs = "XVBBPPP"
+    hardware.max_states = 32
+    hardware.max_serial_events = 15
+    hardware.cycle_period = 100
+    hardware.inputs_enabled = [1] * len(hardware.inputs)
+    hardware.n_global_timers = 2
+    hardware.n_global_counters = 1
+    hardware.n_conditions = 1
+    hardware.setup([])
+    return hardware
+
+
+@pytest.fixture
+def sma(hardware):
+    sma = StateMachineRunner(SimpleNamespace(hardware=hardware))
+    sma.set_global_timer(timer_id=1, timer_duration=2)
+    sma.add_state(
+        state_name="wait",
+        state_timer=5,
+        state_change_conditions={
+            "Port1In": "reward",
+            "Port2In": "punish",
+            "Tup": "exit",
+            "GlobalTimer1End": "exit",
+        },
+    )
+    sma.add_state(
+        state_name="reward",
+        state_timer=0.1,
+        state_change_conditions={"Tup": "wait", "Port3In": "back"},
+    )
+    sma.add_state(
+        state_name="punish",
+        state_timer=1,
+        state_change_conditions={"Port1In": "exit"},
+    )
+    sma.update_state_numbers()
+    sma.compile_transitions()
+    return sma
+
+
+def event(sma, name):
+    return sma.hardware.channels.event_names.index(name)
+
+
+def test_input_transitions(sma):
+    table = sma.transition_table
+    assert table[0, event(sma, "Port1In")] == 1
+    assert table[0, event(sma, "Port2In")] == 2
+    assert table[2, event(sma, "Port1In")] == sma.EXIT
+
+
+def test_state_timer_transitions(sma):
+    tup = sma.hardware.channels.events_positions.Tup
+    assert sma.transition_table[0, tup] == sma.EXIT
+    assert sma.transition_table[1, tup] == 0
+    # a state without a Tup transition stays in the state
+    assert sma.transition_table[2, tup] == sma.NO_TRANSITION
+
+
+def test_global_timer_transitions(sma):
+    assert sma.transition_table[0, event(sma, "GlobalTimer1End")] == sma.EXIT
+
+
+def test_back_transition(sma):
+    assert sma.use_255_back_signal
+    assert sma.transition_table[1, event(sma, "Port3In")] == 255
+
+
+def test_events_without_transition(sma):
+    assert sma.transition_table[0, event(sma, "Port3In")] == sma.NO_TRANSITION
+    assert sma.transition_table[1, event(sma, "Port1Out")] == sma.NO_TRANSITION
+
+
+def test_event_names(sma):
+    assert len(sma.event_names) == 256
+    assert sma.event_names[event(sma, "Port1In")] == "Port1In"
+    assert sma.event_names[250] == "unknown event name"
+
+
+def test_table_matches_matrices(sma):
+    """The table gives the same state as walking the matrices in order."""
+    tup = sma.hardware.channels.events_positions.Tup
+    for state in range(sma.total_states_added):
+        for event_id in range(len(sma.hardware.channels.event_names)):
+            candidates = [
+                dest for code, dest in sma.input_matrix[state] if code == event_id
+            ]
+            if event_id == tup and sma.state_timer_matrix[state] != state:
+                candidates.append(sma.state_timer_matrix[state])
+            for matrix in [
+                sma.global_timers.start_matrix,
+                sma.global_timers.end_matrix,
+            ]:
+                candidates += [dest for code, dest in matrix[state] if code == event_id]
+            expected = candidates[0] if candidates else sma.NO_TRANSITION
+            if isinstance(expected, float) and math.isnan(expected):
+                expected = sma.EXIT
+            assert sma.transition_table[state, event_id] == expected
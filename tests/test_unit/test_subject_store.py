@@ -0,0 +1,161 @@
+import os
+
+import pandas as pd
+
+from village.classes.subject_store import SubjectStore
+
+
+def _session(trials, **extra):
+    data = {
+        "date": ["2025-01-07 08:00:00"] * trials,
+        "trial": list(range(1, trials + 1)),
+        "subject": ["A1"] * trials,
+        "task": ["Habituation"] * trials,
+        "system_name": ["village01"] * trials,
+        "run_mode": ["Auto"] * trials,
+        "water": [10] * trials,
+    }
+    for key, value in extra.items():
+        data[key] = [value] * trials
+    return pd.DataFrame(data)
+
+
+def test_first_session_creates_flat_file(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    assert store.append_session(_session(3)) == 1
+    df = pd.read_csv(tmp_path / "A1.csv", sep=";")
+    assert list(df.columns[:7]) == [
+        "session",
+        "date",
+        "trial",
+        "subject",
+        "task",
+        "system_name",
+        "run_mode",
+    ]
+    assert df["session"].tolist() == [1, 1, 1]
+
+
+def test_same_schema_is_appended_in_place(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(3))
+    store.append_session(_session(2))
+    assert len(store.schema["segments"]) == 1
+    df = pd.read_csv(tmp_path / "A1.csv", sep=";")
+    assert df["session"].tolist() == [1, 1, 1, 2, 2]
+
+
+def test_subset_of_columns_is_appended_in_place(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2, correct=1))
+    store.append_session(_session(2))
+    assert len(store.schema["segments"]) == 1
+    df = store.read()
+    assert df["correct"].isna().tolist() == [False, False, True, True]
+
+
+def test_new_columns_go_to_a_new_segment(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    store.append_session(_session(2, correct=1))
+    assert len(store.schema["segments"]) == 2
+    flat = pd.read_csv(tmp_path / "A1.csv", sep=";")
+    assert "correct" not in flat.columns
+    df = store.read()
+    assert df["session"].tolist() == [1, 1, 2, 2]
+    assert df["correct"].isna().tolist() == [True, True, False, False]
+
+
+def test_compact_rebuilds_flat_file(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    store.append_session(_session(2, correct=1))
+    store.compact()
+    assert len(store.schema["segments"]) == 1
+    assert not (tmp_path / "A1.part1.csv").exists()
+    flat = pd.read_csv(tmp_path / "A1.csv", sep=";")
+    assert flat["session"].tolist() == [1, 1, 2, 2]
+    assert "correct" in flat.columns
+
+
+def test_legacy_file_without_sidecar(tmp_path):
+    legacy = _session(2)
+    legacy.insert(0, "session", [4, 4])
+    legacy.to_csv(tmp_path / "A1.csv", sep=";", index=False)
+    store = SubjectStore(tmp_path / "A1.csv")
+    assert store.append_session(_session(1)) == 5
+    assert store.read()["session"].tolist() == [4, 4, 5]
+
+
+def _append_by_hand(store, df):
+    df[store.columns].to_csv(store.path, mode="a", header=False, index=False, sep=";")
+
+
+def test_rows_of_a_crashed_session_are_discarded(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    # the sidecar as saved before the rows of the next session
+    size = store.schema["segments"][0]["size"]
+    store._save_schema(dict(store.schema, pending={"file": "A1.csv", "size": size}))
+    _append_by_hand(store, _session(3).assign(session=2))
+    store = SubjectStore(tmp_path / "A1.csv")
+    assert store.read()["session"].tolist() == [1, 1]
+    assert "pending" not in store.schema
+    assert store.append_session(_session(1)) == 2
+
+
+def test_history_adds_the_appended_rows(tmp_path, monkeypatch):
+    SubjectStore._histories.clear()
+    SubjectStore(tmp_path / "A1.csv").append_session(_session(2))
+    SubjectStore(tmp_path / "A1.csv").history()
+    read_csv = pd.read_csv
+
+    def read_rows(source, *args, **kwargs):
+        assert not isinstance(source, (str, os.PathLike))
+        return read_csv(source, *args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", read_rows)
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    store.append_session(_session(1, correct=1))
+    history = SubjectStore(tmp_path / "A1.csv").history()
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+    pd.testing.assert_frame_equal(history, store.read())
+
+
+def test_history_is_read_again_after_an_edit(tmp_path):
+    SubjectStore._histories.clear()
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    store.history()
+    _append_by_hand(store, _session(1).assign(session=2))
+    history = SubjectStore(tmp_path / "A1.csv").history()
+    assert history["session"].tolist() == [1, 1, 2]
+
+
+def test_missing_segment_is_dropped(tmp_path):
+    SubjectStore._histories.clear()
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    store.append_session(_session(2, correct=1))
+    store.append_session(_session(1, correct=1, side="left"))
+    (tmp_path / "A1.part1.csv").unlink()
+    store = SubjectStore(tmp_path / "A1.csv")
+    assert store.read()["session"].tolist() == [1, 1, 3]
+    assert store.append_session(_session(1, reward=1)) == 4
+    assert [segment["file"] for segment in store.schema["segments"]] == [
+        "A1.csv",
+        "A1.part2.csv",
+        "A1.part3.csv",
+    ]
+    assert store.read()["session"].tolist() == [1, 1, 3, 4]
+    assert store.history()["session"].tolist() == [1, 1, 3, 4]
+
+
+def test_store_starts_again_when_all_files_are_missing(tmp_path):
+    store = SubjectStore(tmp_path / "A1.csv")
+    store.append_session(_session(2))
+    (tmp_path / "A1.csv").unlink()
+    store = SubjectStore(tmp_path / "A1.csv")
+    assert store.read().empty
+    assert store.append_session(_session(1)) == 1
@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from village.classes import sync_manifest as sync_manifest_module
+from village.classes.enums import Active
+from village.classes.sync_manifest import SyncManifest
+from village.scripts import rsync_to_hard_drive
+
+
+class _FakeSettings:
+    def __init__(self, data_directory, active=True):
+        self.values = {
+            "DATA_DIRECTORY": str(data_directory),
+            "SYSTEM_DIRECTORY": str(data_directory / "system"),
+            "INCREMENTAL_SYNC": Active.ON if active else Active.OFF,
+        }
+
+    def get(self, key):
+        return self.values[key]
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.setattr(sync_manifest_module, "settings", _FakeSettings(tmp_path))
+    (tmp_path / "system").mkdir()
+    (tmp_path / "sessions" / "A1").mkdir(parents=True)
+    return tmp_path
+
+
+def _write(path, text="x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def _after_full_sync(manifest):
+    manifest.done(manifest.snapshot())
+    assert not manifest.snapshot().full
+
+
+def test_first_sync_is_full(data):
+    manifest = SyncManifest()
+    manifest.add(_write(data / "sessions" / "A1" / "s1.csv"))
+    snapshot = manifest.snapshot()
+    assert snapshot.full
+    assert snapshot.lines == 1
+    manifest.done(snapshot)
+    assert manifest.path.read_text() == ""
+    assert not manifest.snapshot().full
+
+
+def test_only_recorded_files_are_synced(data):
+    manifest = SyncManifest()
+    _after_full_sync(manifest)
+    _write(data / "sessions" / "A1" / "old.csv")
+    manifest.add(
+        _write(data / "sessions" / "A1" / "s1.csv", "abc"),
+        _write(data / "sessions" / "A1" / "s1.json", "de"),
+        data / "sessions" / "A1" / "missing.csv",
+    )
+    manifest.add(data / "sessions" / "A1" / "s1.csv")
+    snapshot = manifest.snapshot()
+    assert snapshot.files == ["sessions/A1/s1.csv", "sessions/A1/s1.json", "system"]
+    assert snapshot.size == 5
+
+
+def test_excluded_and_outside_files_are_not_synced(data, tmp_path_factory):
+    manifest = SyncManifest()
+    _after_full_sync(manifest)
+    outside = _write(tmp_path_factory.mktemp("other") / "file.csv")
+    manifest.add(
+        outside,
+        _write(data / "videos" / "CORRIDOR_2025.mp4"),
+        _write(data / "videos" / "A1" / "video.mp4.tmp"),
+        _write(data / "videos" / "A1" / "video.mp4"),
+    )
+    assert manifest.snapshot().files == ["videos/A1/video.mp4", "system"]
+
+
+def test_files_added_during_a_sync_are_kept(data):
+    manifest = SyncManifest()
+    _after_full_sync(manifest)
+    manifest.add(_write(data / "sessions" / "A1" / "s1.csv"))
+    snapshot = manifest.snapshot()
+    manifest.add(_write(data / "sessions" / "A1" / "s2.csv"))
+    manifest.done(snapshot)
+    assert manifest.snapshot().files == ["sessions/A1/s2.csv", "system"]
+
+
+def test_full_sync_after_interval(data):
+    manifest = SyncManifest()
+    _after_full_sync(manifest)
+    manifest.full_sync_interval = -1
+    assert manifest.snapshot().full
+
+
+def test_nothing_is_recorded_when_off(data, monkeypatch):
+    monkeypatch.setattr(
+        sync_manifest_module, "settings", _FakeSettings(data, active=False)
+    )
+    manifest = SyncManifest()
+    manifest.add(_write(data / "sessions" / "A1" / "s1.csv"))
+    assert not manifest.path.exists()
+
+
+def test_rsync_gets_the_file_list(tmp_path, monkeypatch):
+    commands = []
+
+    def fake_popen(cmd, **kwargs):
+        commands.append(cmd)
+        files_from = [arg for arg in cmd if arg.startswith("--files-from=")]
+        with open(files_from[0].split("=", 1)[1]) as f:
+            commands.append(f.read())
+        raise OSError("rsync not available")
+
+    monkeypatch.setattr(rsync_to_hard_drive.subprocess, "Popen", fake_popen)
+    ok = rsync_to_hard_drive.run_rsync_local(
+        str(tmp_path), str(tmp_path / "backup" / "data"), 10, files_from=["a/b.csv"]
+    )
+    assert not ok
+    cmd, listed = commands
+    assert "-r" in cmd
+    assert cmd[-2:] == [
+        os.path.join(str(tmp_path), ""),
+        str(tmp_path / "backup" / "data"),
+    ]
+    assert listed == "a/b.csv\n"
+    files_from_path = [arg for arg in cmd if arg.startswith("--files-from=")][0]
+    assert not os.path.exists(files_from_path.split("=", 1)[1])
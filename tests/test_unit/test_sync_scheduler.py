@@ -0,0 +1,129 @@
+import threading
+import time
+
+from village.classes.sync_scheduler import SyncProgress, SyncScheduler
+
+
+class _FakeAfterSession:
+    """Syncs `chunks` chunks, one every few milliseconds, until cancelled."""
+
+    def __init__(self, chunks: int) -> None:
+        self.cancel_event = threading.Event()
+        self.progress = SyncProgress()
+        self.chunks = chunks
+        self.done = 0
+        self.runs = 0
+
+    def run(self) -> None:
+        # like rsync, the transfers are numbered from 1 in every run
+        self.runs += 1
+        transferred = 0
+        while self.done < self.chunks:
+            if self.cancel_event.wait(0.005):
+                return
+            self.done += 1
+            transferred += 1
+            self.progress.update(
+                "1,000 100%  1.00MB/s  0:00:00 (xfr#{}, to-chk={}/{})".format(
+                    transferred, self.chunks - self.done, self.chunks
+                )
+            )
+
+
+def _wait_until(condition, timeout=5.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.002)
+    return False
+
+
+def test_sync_runs_when_idle():
+    scheduler = SyncScheduler()
+    after_session = _FakeAfterSession(chunks=3)
+    scheduler.request(after_session)
+    assert not scheduler.running
+    scheduler.update(idle=True)
+    assert _wait_until(lambda: not scheduler.pending)
+    assert after_session.done == 3
+    assert after_session.runs == 1
+
+
+def test_sync_waits_while_not_idle():
+    scheduler = SyncScheduler()
+    after_session = _FakeAfterSession(chunks=3)
+    scheduler.request(after_session)
+    scheduler.update(idle=False)
+    time.sleep(0.05)
+    assert after_session.runs == 0
+    assert scheduler.pending
+
+
+def test_preempted_sync_resumes_after_delay():
+    scheduler = SyncScheduler(resume_delay=0.05)
+    after_session = _FakeAfterSession(chunks=40)
+    scheduler.request(after_session)
+    scheduler.update(idle=True)
+    assert _wait_until(lambda: after_session.done >= 2)
+
+    start = time.monotonic()
+    scheduler.update(idle=False)
+    assert _wait_until(lambda: not scheduler.running, timeout=1.0)
+    assert time.monotonic() - start < 0.5
+    assert scheduler.pending
+    assert scheduler.preemptions == 1
+    done = after_session.done
+
+    scheduler.update(idle=True)
+    assert not scheduler.running
+    assert _wait_until(lambda: scheduler.update(idle=True) or scheduler.running)
+    assert _wait_until(lambda: not scheduler.pending)
+    assert after_session.done == 40 > done
+    assert after_session.runs == 2
+    assert after_session.progress.files == 40
+    assert after_session.progress.bytes == 40 * 1000
+
+
+def test_cancel_forgets_the_sync():
+    scheduler = SyncScheduler(resume_delay=0.0)
+    after_session = _FakeAfterSession(chunks=1000)
+    scheduler.request(after_session)
+    scheduler.update(idle=True)
+    assert _wait_until(lambda: after_session.done >= 1)
+    scheduler.cancel()
+    assert _wait_until(lambda: not scheduler.running)
+    scheduler.update(idle=True)
+    time.sleep(0.02)
+    assert not scheduler.running
+    assert not scheduler.pending
+    assert after_session.runs == 1
+
+
+def test_request_during_a_run_runs_again():
+    scheduler = SyncScheduler()
+    after_session = _FakeAfterSession(chunks=5)
+    scheduler.request(after_session)
+    scheduler.update(idle=True)
+    scheduler.request(after_session)
+    assert _wait_until(lambda: not scheduler.running)
+    assert scheduler.pending
+    scheduler.update(idle=True)
+    assert _wait_until(lambda: not scheduler.pending)
+    assert after_session.runs == 2
+
+
+def test_progress_is_read_from_rsync_output():
+    progress = SyncProgress()
+    progress.start()
+    progress.update("sending incremental file list\n")
+    progress.update("         32,768   3%    1.00MB/s    0:00:01\n")
+    assert progress.bytes == 32768
+    progress.update("      1,048,576 100%    9.50MB/s    0:00:00 (xfr#1, to-chk=3/4)\n")
+    progress.update("          2,000 100%   10.00kB/s    0:00:00 (xfr#2, ir-chk=0/4)\n")
+    progress.stop()
+    assert progress.files == 2
+    assert progress.bytes == 1048576 + 2000
+    assert progress.fraction == 1.0
+    assert progress.throughput > 0
+    assert "2 files" in progress.text()
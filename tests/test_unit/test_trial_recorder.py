@@ -0,0 +1,134 @@
+import math
+import time
+
+import pandas as pd
+import pytest
+
+from village.controllers.trial_recorder import TrialRecorder
+
+
+def _record_trials(recorder, trials):
+    for trial in range(trials):
+        start = 1000.0 + trial * 10
+        recorder.start_trial(start, 0.0)
+        recorder.enter_state("waiting", 0.0)
+        recorder.add_controller_event("Port1In", 1.23456)
+        recorder.add_value("side", "left;right")
+        recorder.enter_state("reward", 2.0)
+        recorder.add_raspberry_event("screen", start + 2.5)
+        recorder.end_trial(3.0)
+        recorder.get_trial_data("2025-01-07", trial + 1, "A1", "Task", "village01")
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+@pytest.mark.parametrize("trials", [1, 5])
+def test_buffered_csv_matches_unbuffered(tmp_path, trials):
+    direct = TrialRecorder(str(tmp_path / "direct.csv"), buffered=False)
+    buffered = TrialRecorder(str(tmp_path / "buffered.csv"), buffered=True)
+    _record_trials(direct, trials)
+    _record_trials(buffered, trials)
+    direct.close()
+    buffered.close()
+    assert (tmp_path / "buffered.csv").read_text() == (
+        tmp_path / "direct.csv"
+    ).read_text()
+    df = pd.read_csv(tmp_path / "buffered.csv", sep=";")
+    assert df.loc[df["MSG"] == "side", "VALUE"].tolist() == ["left;right"] * trials
+    assert df.loc[df["MSG"] == "Port1In", "START"].tolist() == [1001.2346] + [
+        1000.0 + trial * 10 + 1.2346 for trial in range(1, trials)
+    ]
+
+
+def test_buffered_rows_are_synced_at_trial_end(tmp_path):
+    recorder = TrialRecorder(str(tmp_path / "session.csv"), buffered=True)
+    _record_trials(recorder, 1)
+    recorder.start_trial(2000.0, 0.0)
+    recorder.end_trial(1.0)
+    buffer = recorder._buffer
+    assert _wait_until(lambda: buffer.rows_written == 18)
+    # waits for the background write in progress, if any
+    buffer.flush()
+    assert buffer.syncs >= 1
+    df = pd.read_csv(tmp_path / "session.csv", sep=";")
+    assert df["TRIAL"].iloc[-1] == 2
+    assert df["MSG"].tolist().count("TRIAL_END") == 2
+    recorder.close()
+
+
+def test_buffered_writer_flushes_on_timer(tmp_path):
+    recorder = TrialRecorder(str(tmp_path / "session.csv"), buffered=True)
+    recorder._buffer.interval = 0.01
+    recorder.start_trial(1000.0, 0.0)
+    for _ in range(100):
+        recorder.add_controller_event("Port1In", 0.5)
+    assert _wait_until(lambda: recorder._buffer.rows_written == 101)
+    recorder.close()
+
+
+def test_trial_data_groups_states_and_events(tmp_path):
+    recorder = TrialRecorder(str(tmp_path / "session.csv"), buffered=False)
+    recorder.start_trial(1000.0, 0.0)
+    recorder.declare_states(["waiting", "reward", "punish", "iti"])
+    recorder.enter_state("waiting", 0.0)
+    recorder.add_controller_event("Port1In", 0.5)
+    recorder.enter_state("reward", 1.0)
+    recorder.add_controller_event("Tup", 1.5)
+    recorder.add_controller_event("Port1In", 1.75)
+    recorder.enter_state("waiting", 2.0)
+    recorder.enter_state("iti", 2.5)
+    recorder.end_trial(3.0)
+    trial_data = recorder.get_trial_data("2025-01-07", 1, "A1", "Task", "v01")
+    recorder.close()
+
+    punish = trial_data.pop("STATE_punish_START"), trial_data.pop("STATE_punish_END")
+    assert all(math.isnan(value[0]) for value in punish)
+    assert trial_data == {
+        "date": "2025-01-07",
+        "trial": 1,
+        "subject": "A1",
+        "task": "Task",
+        "system_name": "v01",
+        "TRIAL_START": 1000.0,
+        "TRIAL_END": 1003.0,
+        "STATE_waiting_START": [1000.0, 1002.0],
+        "STATE_waiting_END": [1001.0, 1002.5],
+        "STATE_reward_START": [1001.0],
+        "STATE_reward_END": [1002.0],
+        "STATE_iti_START": [1002.5],
+        "STATE_iti_END": [1003.0],
+        "Port1In": [1000.5, 1001.75],
+        "Tup": [1001.5],
+        "ordered_list_of_events": ["Port1In", "Tup", "Port1In"],
+    }
+    df = pd.read_csv(tmp_path / "session.csv", sep=";")
+    rows = df[df["MSG"].str.startswith("STATE_")]
+    assert rows["MSG"].tolist() == [
+        "STATE_waiting",
+        "STATE_waiting",
+        "STATE_reward",
+        "STATE_iti",
+    ]
+    assert rows["END"].tolist() == [1001.0, 1002.5, 1002.0, 1003.0]
+
+
+def test_declared_states_are_reset_every_trial(tmp_path):
+    recorder = TrialRecorder(str(tmp_path / "session.csv"), buffered=False)
+    recorder.start_trial(1000.0, 0.0)
+    recorder.declare_states(["waiting", "punish"])
+    recorder.enter_state("waiting", 0.0)
+    recorder.end_trial(1.0)
+    recorder.get_trial_data("2025-01-07", 1, "A1", "Task", "v01")
+    recorder.start_trial(2000.0, 0.0)
+    recorder.enter_state("waiting", 0.0)
+    recorder.end_trial(1.0)
+    trial_data = recorder.get_trial_data("2025-01-07", 2, "A1", "Task", "v01")
+    recorder.close()
+    assert "STATE_punish_START" not in trial_data
+    assert trial_data["STATE_waiting_START"] == [2000.0]
+    assert trial_data["ordered_list_of_events"] == []
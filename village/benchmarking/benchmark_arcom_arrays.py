@@ -0,0 +1,50 @@
+import os
+import struct
+import tty
+from time import perf_counter
+
+import numpy as np
+
+from village.pybpodapi.com.arcom import ArCOM
+
+# Compares reading the end-of-trial timestamps from the Bpod one element at a
+# time (one serial read and one int conversion per timestamp) with a single
+# bulk read decoded by numpy. The Bpod is simulated by a pty pair; all the
+# bytes are written before reading so only the host side is measured.
+
+n_timestamps = 1000
+repetitions = 200
+
+
+def read_elementwise(arcom: ArCOM, n: int) -> list[int]:
+    return [arcom.read_uint32() for _ in range(n)]
+
+
+def read_bulk(arcom: ArCOM, n: int) -> list[int]:
+    return arcom.read_uint32_array(n)
+
+
+def run(read) -> np.ndarray:
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    arcom = ArCOM().open(os.ttyname(slave), baudrate=115200, timeout=1)
+    payload = struct.pack("<%dL" % n_timestamps, *range(n_timestamps))
+    times = np.zeros(repetitions)
+    for i in range(repetitions):
+        os.write(master, payload)
+        start = perf_counter()
+        timestamps = read(arcom, n_timestamps)
+        times[i] = (perf_counter() - start) * 1000
+        assert timestamps[-1] == n_timestamps - 1
+    arcom.close()
+    os.close(master)
+    os.close(slave)
+    return times
+
+
+for name, read in (("element-wise", read_elementwise), ("bulk", read_bulk)):
+    times = run(read)
+    print(
+        f"{name}: {times.mean():.3f} ms ± {times.std():.3f} ms "
+        f"per {n_timestamps} timestamps"
+    )
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from village.classes.backup_verifier import VERIFIER_COMMAND, BackupVerifier
+
+# Checks the backup of 100k synthetic video files, as in safe_removal_of_data.
+# The previous local check only tested that every file existed. The previous
+# remote check put all the paths in one ssh command line, whose length is
+# compared with ARG_MAX. The BackupVerifier compares size and fast_hash, with
+# the local hashes computed in the first run (cold) and read from the index
+# afterwards (warm). The remote check runs the verifier program with the local
+# python3 in place of the server, through the same stdin stream.
+
+n_files = 100000
+n_subjects = 100
+iters = 3
+
+
+def exists_only(files: list[str], directory: str, backup_dir: str) -> list[str]:
+    return [
+        os.path.join(directory, f)
+        for f in files
+        if os.path.exists(os.path.join(backup_dir, f))
+    ]
+
+
+with tempfile.TemporaryDirectory() as directory:
+    local = Path(directory, "videos")
+    backup = Path(directory, "backup", "videos")
+    index_path = Path(directory, "data_removal_logs", "backup_index.json")
+    files = []
+    for i in range(n_files):
+        subject = f"A{i % n_subjects}"
+        relative = f"{subject}/{subject}_20250101_{i:06d}.mp4"
+        path = local / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(256))
+        files.append(relative)
+    shutil.copytree(local, backup)
+
+    old_command = (
+        "ssh user@server 'for file in "
+        + " ".join(os.path.join(str(backup), f) for f in files)
+        + "; do if [ -e $file ]; then echo $file; fi; done'"
+    )
+
+    exists_durations = np.zeros(iters)
+    cold_durations = np.zeros(iters)
+    warm_durations = np.zeros(iters)
+    stream_durations = np.zeros(iters)
+    for i in range(iters):
+        start_time = perf_counter()
+        exists_only(files, str(local), str(backup))
+        exists_durations[i] = perf_counter() - start_time
+
+        index_path.unlink(missing_ok=True)
+        start_time = perf_counter()
+        result = BackupVerifier(str(local), str(backup), index_path).verify_local(files)
+        cold_durations[i] = perf_counter() - start_time
+        assert len(result) == n_files
+
+        start_time = perf_counter()
+        BackupVerifier(str(local), str(backup), index_path).verify_local(files)
+        warm_durations[i] = perf_counter() - start_time
+
+        start_time = perf_counter()
+        result = BackupVerifier(str(local), str(backup), index_path).verify_with(
+            files, ["sh", "-c", VERIFIER_COMMAND]
+        )
+        stream_durations[i] = perf_counter() - start_time
+        assert len(result) == n_files
+
+print(f"Backup verification of {n_files} files:")
+print(
+    f"  Previous remote command line: {len(old_command) / 1e6:.1f} MB, "
+    f"ARG_MAX {os.sysconf('SC_ARG_MAX') / 1e6:.1f} MB"
+)
+print(f"  Verifier command line: {len(VERIFIER_COMMAND)} bytes")
+for name, durations in (
+    ("Previous local check, existence only", exists_durations),
+    ("Size and hash, local, cold index", cold_durations),
+    ("Size and hash, local, warm index", warm_durations),
+    ("Size and hash, stream to python3, warm index", stream_durations),
+):
+    print(f"  {name}: {durations.mean():.2f} s ± {durations.std():.2f} s")
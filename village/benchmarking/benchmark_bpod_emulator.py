@@ -0,0 +1,85 @@
+import random
+from time import perf_counter
+
+import numpy as np
+
+from village.pybpodapi.bpod.bpod_com_protocol_modules import BpodCOMProtocolModules
+from village.pybpodapi.bpod.bpod_emulator import BpodEmulator
+from village.pybpodapi.state_machine.state_machine_runner import StateMachineRunner
+
+# Load test of the Bpod trial loop without hardware. A software Bpod runs a
+# two-choice task 1000 times faster than real time, with a random poke stream
+# of licks per trial. It measures the trials per minute and the host time
+# spent between trials building and sending the next state machine, with and
+# without reusing the installed state machine.
+
+n_trials = 1000
+speed = 1000.0
+
+
+def pokes(trial: int) -> list[tuple[float, str]]:
+    t = random.uniform(0.5, 2.0)
+    port = random.choice(["Port1", "Port2"])
+    events = [(t, port + "In"), (t + 0.05, port + "Out")]
+    for lick in range(random.randint(0, 10)):
+        t += random.uniform(0.08, 0.15)
+        events += [(t, port + "In"), (t + 0.03, port + "Out")]
+    return events
+
+
+def run(reuse_state_machine: bool) -> tuple[float, np.ndarray]:
+    random.seed(0)
+    with BpodEmulator(speed=speed, pokes=pokes) as emulator:
+        bpod = BpodCOMProtocolModules(
+            serial_port=emulator.port,
+            baudrate=115200,
+            sync_channel=255,
+            sync_mode=1,
+            net_port=None,
+            target_firmware=[23],
+            bnc_ports=["OFF", "OFF"],
+            behavior_ports=["ON"] * 8,
+            event_driven=True,
+            reuse_state_machine=reuse_state_machine,
+        )
+        send_times = np.zeros(n_trials)
+        start = perf_counter()
+        for trial in range(n_trials):
+            send_start = perf_counter()
+            sma = StateMachineRunner(bpod)
+            sma.add_state(
+                state_name="wait",
+                state_timer=3,
+                state_change_conditions={
+                    "Port1In": "reward",
+                    "Port2In": "punish",
+                    "Tup": "exit",
+                },
+            )
+            sma.add_state(
+                state_name="reward",
+                state_timer=1,
+                state_change_conditions={"Tup": "exit"},
+                output_actions=[("Valve1", 255)],
+            )
+            sma.add_state(
+                state_name="punish",
+                state_timer=1,
+                state_change_conditions={"Tup": "exit"},
+            )
+            bpod.send_state_machine(sma)
+            send_times[trial] = (perf_counter() - send_start) * 1000
+            bpod.run_state_machine(sma)
+        elapsed = perf_counter() - start
+        bpod.close()
+    return n_trials / elapsed * 60, send_times
+
+
+for reuse in (False, True):
+    rate, send_times = run(reuse)
+    print(f"reuse state machine {'ON' if reuse else 'OFF'}:")
+    print(f"  {rate:.0f} trials/min")
+    print(
+        f"  build and send: {send_times.mean():.3f} ms "
+        f"± {send_times.std():.3f} ms per trial"
+    )
@@ -0,0 +1,81 @@
+import os
+import random
+import threading
+import time
+import tty
+
+import numpy as np
+
+from village.pybpodapi.bpod.bpod_com_protocol import BpodCOMProtocol
+from village.pybpodapi.com.arcom import ArCOM
+
+# Compares the sleep-polling trial loop with the event-driven (select) loop.
+# The Bpod is simulated by a pty pair: a writer thread sends opcode 1 messages
+# (one event each) at random intervals and the reader measures the host latency
+# from write to dispatch, and the CPU time spent by the loop.
+
+n_events = 500
+min_interval = 0.002  # s
+max_interval = 0.020  # s
+
+
+def run(event_driven: bool) -> tuple[np.ndarray, float, float]:
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    bpod = BpodCOMProtocol(
+        serial_port=None,
+        baudrate=None,
+        sync_channel=255,
+        sync_mode=1,
+        net_port=None,
+        target_firmware=[23],
+        bnc_ports=[],
+        behavior_ports=[],
+        event_driven=event_driven,
+    )
+    bpod._arcom = ArCOM().open(os.ttyname(slave), baudrate=115200, timeout=1)
+    bpod.socketin = None
+
+    sent = np.zeros(n_events)
+    received = np.zeros(n_events)
+
+    def writer() -> None:
+        for i in range(n_events):
+            time.sleep(random.uniform(min_interval, max_interval))
+            sent[i] = time.perf_counter()
+            os.write(master, bytes([1, 1, 0]))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+
+    count = 0
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    while count < n_events:
+        if event_driven:
+            bpod._wait_for_input(bpod.EVENT_WAIT_TIMEOUT)
+        else:
+            time.sleep(0.001)
+        if bpod.data_available():
+            opcode, data = bpod._bpodcom_read_opcode_message()
+            bpod._bpodcom_read_current_events(data)
+            received[count] = time.perf_counter()
+            count += 1
+    cpu = time.thread_time() - start_cpu
+    wall = time.perf_counter() - start_wall
+
+    thread.join()
+    bpod._arcom.close()
+    os.close(master)
+    os.close(slave)
+    return (received - sent) * 1000, cpu, wall
+
+
+for mode, event_driven in (("sleep-polling", False), ("event-driven", True)):
+    latencies, cpu, wall = run(event_driven)
+    print(f"{mode}:")
+    print(
+        f"  latency: {latencies.mean():.3f} ms "
+        f"± {latencies.std():.3f} ms (max {latencies.max():.3f} ms)"
+    )
+    print(f"  cpu: {cpu:.3f} s over {wall:.3f} s ({100 * cpu / wall:.1f}% of a core)")
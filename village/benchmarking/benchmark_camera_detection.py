@@ -0,0 +1,82 @@
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from village.classes.detection_engine import DetectionEngine, TimingHistogram
+
+# Compares the full-frame detection that Camera used to run in pre_process
+# (cvtColor of the whole frame, a full-frame mask and findContours over it)
+# with the DetectionEngine, which only converts and thresholds the bounding box
+# of the active areas. Synthetic 640x480 XBGR frames with a dark blob crossing
+# the corridor areas are used. Prints the per-frame timing histogram summary.
+
+n_frames = 600
+framerate = 30
+areas = [[100, 300, 200, 350], [200, 300, 300, 350], [300, 300, 400, 350]]
+areas.append([400, 300, 500, 350])
+thresholds = [100, 100, 100, 100]
+active = [True, True, True, True]
+
+rng = np.random.default_rng(0)
+frames = []
+for i in range(20):
+    frame = rng.integers(120, 255, (480, 640, 4), dtype=np.uint8)
+    x = 100 + i * 20
+    frame[310:340, x : x + 60, :3] = 20
+    frames.append(frame)
+
+
+def full_frame(frame: np.ndarray) -> tuple[list[int], tuple[int, int]]:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    mask = np.zeros_like(gray, dtype=np.uint8)
+    counts = []
+    for (x1, y1, x2, y2), threshold in zip(areas, thresholds):
+        _, roi_bin = cv2.threshold(
+            gray[y1:y2, x1:x2], threshold, 255, cv2.THRESH_BINARY_INV
+        )
+        sub = mask[y1:y2, x1:x2]
+        np.maximum(sub, roi_bin, out=sub)
+        counts.append(cv2.countNonZero(roi_bin))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = max(contours, key=cv2.contourArea, default=None)
+    if best is None:
+        return counts, (-1, -1)
+    M = cv2.moments(best)
+    return counts, (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
+
+
+def print_summary(name: str, histogram: TimingHistogram) -> None:
+    summary = histogram.summary(framerate)
+    print(name + ":")
+    print(
+        f"  mean {summary['mean']:.3f} ms, p50 {summary['p50']:.2f} ms, "
+        f"p99 {summary['p99']:.2f} ms, worst {summary['worst']:.3f} ms, "
+        f"frames over {1000 / framerate:.1f} ms: {summary['over_frame_period']}"
+    )
+
+
+histogram = TimingHistogram()
+for i in range(n_frames):
+    start = perf_counter()
+    full_frame(frames[i % len(frames)])
+    histogram.add((perf_counter() - start) * 1000)
+print_summary("Full frame", histogram)
+
+engine = DetectionEngine()
+engine.configure(areas, thresholds, active)
+for i in range(n_frames):
+    engine.convert(frames[i % len(frames)])
+    engine.detect(black=True)
+    engine.position_contours(50)
+    engine.finish()
+print_summary("Detection engine, shared threshold", engine.timing)
+
+engine = DetectionEngine()
+engine.configure(areas, [100, 90, 110, 100], active)
+for i in range(n_frames):
+    engine.convert(frames[i % len(frames)])
+    engine.detect(black=True)
+    engine.position_contours(50)
+    engine.finish()
+print_summary("Detection engine, per-area thresholds", engine.timing)
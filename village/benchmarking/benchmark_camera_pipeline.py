@@ -0,0 +1,83 @@
+import time
+from time import perf_counter
+
+import numpy as np
+
+from village.classes.detection_engine import (
+    DetectionEngine,
+    DetectionWorker,
+    TimingHistogram,
+)
+
+# Measures how long the camera callback blocks the encoder when the detection
+# runs inline and when it runs in the DetectionWorker. Frames arrive at 30 fps;
+# every 60th frame the detection stage is slowed down by 50 ms, like a slow
+# trigger or alarm would do. Prints the callback time histogram summary and the
+# worker counters.
+
+n_frames = 300
+framerate = 30
+slow_every = 60
+slow_duration = 0.05
+areas = [[100, 300, 200, 350], [200, 300, 300, 350], [300, 300, 400, 350]]
+areas.append([400, 300, 500, 350])
+
+rng = np.random.default_rng(0)
+frame = rng.integers(120, 255, (480, 640, 4), dtype=np.uint8)
+frame[310:340, 170:230, :3] = 20
+
+
+def detection_stage(engine: DetectionEngine, frame_number: int) -> None:
+    engine.detect(black=True)
+    engine.position_contours(50)
+    if frame_number % slow_every == 0:
+        time.sleep(slow_duration)
+
+
+def print_summary(name: str, histogram: TimingHistogram) -> None:
+    summary = histogram.summary(framerate)
+    print(name + ":")
+    print(
+        f"  callback mean {summary['mean']:.3f} ms, p99 {summary['p99']:.2f} ms, "
+        f"worst {summary['worst']:.2f} ms, "
+        f"callbacks over {1000 / framerate:.1f} ms: {summary['over_frame_period']}"
+    )
+
+
+# inline
+engine = DetectionEngine()
+engine.configure(areas, [100] * 4, [True] * 4)
+callback = TimingHistogram()
+next_frame = perf_counter()
+for frame_number in range(1, n_frames + 1):
+    start = perf_counter()
+    engine.convert(frame)
+    detection_stage(engine, frame_number)
+    engine.finish()
+    callback.add((perf_counter() - start) * 1000)
+    next_frame += 1 / framerate
+    time.sleep(max(0.0, next_frame - perf_counter()))
+print_summary("Inline", callback)
+
+# worker
+engine = DetectionEngine()
+engine.configure(areas, [100] * 4, [True] * 4)
+
+
+def process(gray, layout, metadata):
+    engine.load(gray, layout)
+    detection_stage(engine, metadata["frame_number"])
+
+
+worker = DetectionWorker(engine, process, frame_period=1 / framerate)
+callback = TimingHistogram()
+next_frame = perf_counter()
+for frame_number in range(1, n_frames + 1):
+    start = perf_counter()
+    worker.submit(frame, {"frame_number": frame_number})
+    callback.add((perf_counter() - start) * 1000)
+    next_frame += 1 / framerate
+    time.sleep(max(0.0, next_frame - perf_counter()))
+worker.stop()
+print_summary("Detection worker", callback)
+print("  worker:", worker.stats())
@@ -0,0 +1,63 @@
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from village.classes import collection as collection_module
+from village.classes.collection import Collection
+from village.classes.enums import Active
+
+# Compares the time the caller waits in Collection.add_entry and
+# Collection.save_from_df when the csv is written synchronously and when it is
+# written by the background CollectionWriter (BUFFERED_COLLECTIONS).
+
+n_entries = 2000
+n_saves = 50
+
+
+class BenchmarkSettings:
+    def __init__(self, directory: str, buffered: bool) -> None:
+        self.directory = directory
+        self.buffered = buffered
+
+    def get(self, key: str):
+        if key == "BUFFERED_COLLECTIONS":
+            return Active.ON if self.buffered else Active.OFF
+        return self.directory
+
+
+def run(buffered: bool) -> tuple[np.ndarray, np.ndarray, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        collection_module.settings = BenchmarkSettings(directory, buffered)
+        events = Collection()
+        events.create_data_collection(
+            "events", ["date", "type", "subject", "description"], [str, str, str, str]
+        )
+        add_durations = np.zeros(n_entries)
+        for i in range(n_entries):
+            start = perf_counter()
+            events.add_entry(["2025-01-07 08:00:00", "INFO", "A1", "event " + str(i)])
+            add_durations[i] = perf_counter() - start
+        save_durations = np.zeros(n_saves)
+        for i in range(n_saves):
+            start = perf_counter()
+            events.change_last_entry("description", "changed " + str(i))
+            save_durations[i] = perf_counter() - start
+        start = perf_counter()
+        events.flush()
+        flush_duration = perf_counter() - start
+    return add_durations, save_durations, flush_duration
+
+
+for buffered in (False, True):
+    add_durations, save_durations, flush_duration = run(buffered)
+    print("Background writer:" if buffered else "Synchronous writes:")
+    print(
+        f"  add_entry: {add_durations.mean() * 1e6:.1f} us "
+        f"± {add_durations.std() * 1e6:.1f} us"
+    )
+    print(
+        f"  change_last_entry ({n_entries} rows): "
+        f"{save_durations.mean() * 1000:.2f} ms ± {save_durations.std() * 1000:.2f} ms"
+    )
+    print(f"  final flush: {flush_duration * 1000:.1f} ms")
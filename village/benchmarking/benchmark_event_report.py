@@ -0,0 +1,120 @@
+import datetime
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from village.classes import collection as collection_module
+from village.classes.collection import Collection
+
+# Compares the event filters of Manager.create_report on a synthetic 50k-row
+# events.csv: copying the collection, parsing all the dates and filtering every
+# row (the previous implementation) against Collection.window, which slices the
+# last 24 hours with the time index. The window is also timed while new entries
+# are being added, which is what happens between two reports.
+
+n_rows = 50000
+iters = 20
+prefixes = ("Subject not", "Detection in", "Large", "Multiple")
+
+rng = np.random.default_rng(0)
+
+
+class BenchmarkSettings:
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def get(self, key: str) -> str:
+        return self.directory
+
+
+def full_scan(events: Collection, start: datetime.datetime) -> tuple[dict, int]:
+    df = events.df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    detections = df[
+        (df["description"].str.startswith(prefixes) | (df["type"] == "START"))
+        & (df["date"] >= start)
+    ]
+    syncs = df[
+        (df["description"] == "Sync completed successfully") & (df["date"] >= start)
+    ]
+    return detections.groupby("subject").size().to_dict(), len(syncs)
+
+
+def windowed(events: Collection, start: datetime.datetime) -> tuple[dict, int]:
+    df = events.window(start)
+    detections = df[
+        df["description"].str.startswith(prefixes).fillna(False).astype(bool)
+        | (df["type"] == "START")
+    ]
+    syncs = df[df["description"] == "Sync completed successfully"]
+    return detections.groupby("subject").size().to_dict(), len(syncs)
+
+
+descriptions = [
+    "Subject not detected",
+    "Detection in corridor",
+    "Large weight",
+    "Multiple tags detected in the last seconds",
+    "Sync completed successfully",
+] + [f"event at port {i}" for i in range(8)]
+
+with tempfile.TemporaryDirectory() as directory:
+    collection_module.settings = BenchmarkSettings(directory)
+    dates = pd.date_range("2025-01-01", periods=n_rows, freq="37s")
+    pd.DataFrame(
+        {
+            "date": dates.strftime("%Y-%m-%d %H:%M:%S"),
+            "type": rng.choice(["INFO", "START", "END", "ALARM"], n_rows),
+            "subject": rng.choice(["A1", "A2", "B1", "B2", "None"], n_rows),
+            "description": rng.choice(descriptions, n_rows),
+        }
+    ).to_csv(Path(directory, "events.csv"), index=False, sep=";")
+
+    events = Collection()
+    events.create_data_collection(
+        "events.csv",
+        ["date", "type", "subject", "description"],
+        [str, str, str, str],
+    )
+    events.index_by_date(["type", "description"])
+    start = dates[-1].to_pydatetime() - datetime.timedelta(hours=24)
+
+    start_time = perf_counter()
+    events.window(start)
+    build_duration = perf_counter() - start_time
+
+    full_durations = np.zeros(iters)
+    window_durations = np.zeros(iters)
+    append_durations = np.zeros(iters)
+    for i in range(iters):
+        date = dates[-1] + datetime.timedelta(seconds=i + 1)
+        events.add_entry([date.strftime("%Y-%m-%d %H:%M:%S"), "START", "A1", "x"])
+
+        start_time = perf_counter()
+        expected = full_scan(events, start)
+        full_durations[i] = perf_counter() - start_time
+
+        start_time = perf_counter()
+        result = windowed(events, start)
+        window_durations[i] = perf_counter() - start_time
+        assert result == expected
+
+        events.add_entry([date.strftime("%Y-%m-%d %H:%M:%S"), "INFO", "A1", "x"])
+        start_time = perf_counter()
+        events.window(start)
+        append_durations[i] = perf_counter() - start_time
+
+print(f"create_report event filters, events.csv with {n_rows} rows, last 24h:")
+print(f"  Building the time index: {build_duration * 1000:.1f} ms")
+for name, durations in (
+    ("Copy, parse and scan", full_durations),
+    ("Time index window", window_durations),
+    ("Window after one new entry", append_durations),
+):
+    print(
+        f"  {name}: {durations.mean() * 1000:.2f} ms "
+        f"± {durations.std() * 1000:.2f} ms"
+    )
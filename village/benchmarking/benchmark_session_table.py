@@ -0,0 +1,78 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from village.classes.session_table import SessionTable
+
+# Compares appending the trial_data of every trial to the session with
+# pd.concat (one DataFrame per trial) and with the columnar SessionTable, and
+# the cost of reading the new rows for the online plot at the end of a long
+# session.
+
+n_trials = 3000
+n_states = 10
+
+rng = np.random.default_rng(0)
+
+
+def trial_data(trial: int) -> dict:
+    row = {
+        "date": "2025-01-07 08:00:00",
+        "trial": trial,
+        "subject": "A1",
+        "task": "Training",
+        "system_name": "village01",
+        "TRIAL_START": 1000.0 + trial * 10,
+        "TRIAL_END": 1005.0 + trial * 10,
+    }
+    for state in range(n_states):
+        row[f"STATE_s{state}_START"] = [float(rng.random())]
+        row[f"STATE_s{state}_END"] = [float(rng.random())]
+    row["Port1In"] = [float(rng.random())]
+    row["ordered_list_of_events"] = ["Port1In"]
+    row["correct"] = int(rng.integers(0, 2))
+    row["water"] = 5
+    return row
+
+
+rows = [trial_data(trial + 1) for trial in range(n_trials)]
+
+concat_durations = np.zeros(n_trials)
+session_df = pd.DataFrame()
+for i, row in enumerate(rows):
+    start = perf_counter()
+    session_df = pd.concat([session_df, pd.DataFrame([row])], ignore_index=True)
+    concat_durations[i] = perf_counter() - start
+
+table_durations = np.zeros(n_trials)
+table = SessionTable()
+for i, row in enumerate(rows):
+    start = perf_counter()
+    table.append(row)
+    table_durations[i] = perf_counter() - start
+
+start = perf_counter()
+full_df = table.df
+full_duration = perf_counter() - start
+
+since_durations = np.zeros(100)
+for i in range(100):
+    start = perf_counter()
+    table.rows_since(table.version - 1)
+    since_durations[i] = perf_counter() - start
+
+print(f"Append trial_data ({n_trials} trials, {len(full_df.columns)} columns):")
+for name, durations in (
+    ("pd.concat", concat_durations),
+    ("SessionTable", table_durations),
+):
+    print(
+        f"  {name}: {durations.mean() * 1e6:.1f} us ± {durations.std() * 1e6:.1f} us"
+        f" per trial, last 100 trials {durations[-100:].mean() * 1e6:.1f} us"
+    )
+print(f"  SessionTable.df after {n_trials} trials: {full_duration * 1000:.1f} ms")
+print(
+    f"  SessionTable.rows_since (1 new row): {since_durations.mean() * 1e6:.1f} us"
+    f" ± {since_durations.std() * 1e6:.1f} us"
+)
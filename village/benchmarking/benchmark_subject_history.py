@@ -0,0 +1,72 @@
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from village.classes.session_store import SessionStore
+from village.classes.subject_store import SubjectStore
+
+# Compares loading the full history of a subject from the CSV store and from
+# the columnar (Parquet) store, for a synthetic subject with months of sessions.
+# The sessions are appended one by one, so the columnar store has consolidated
+# them into a single file with one row group per session.
+
+n_sessions = 300
+trials_per_session = 400
+iters = 5
+
+rng = np.random.default_rng(0)
+
+with tempfile.TemporaryDirectory() as directory:
+    csv_store = SubjectStore(Path(directory, "A1.csv"))
+    columnar_store = SessionStore(directory)
+
+    for i in range(n_sessions):
+        date = pd.Timestamp("2025-01-01 08:00:00") + pd.Timedelta(days=i // 2)
+        session_df = pd.DataFrame(
+            {
+                "date": [str(date)] * trials_per_session,
+                "trial": np.arange(1, trials_per_session + 1),
+                "subject": ["A1"] * trials_per_session,
+                "task": ["Training"] * trials_per_session,
+                "system_name": ["village01"] * trials_per_session,
+                "run_mode": ["Auto"] * trials_per_session,
+                "TRIAL_START": rng.random(trials_per_session),
+                "TRIAL_END": rng.random(trials_per_session),
+                "correct": rng.integers(0, 2, trials_per_session),
+                "water": rng.integers(0, 10, trials_per_session),
+                "side": rng.choice(["left", "right"], trials_per_session),
+            }
+        )
+        csv_store.append_session(session_df)
+        columnar_store.append_session(session_df)
+
+    csv_durations = np.zeros(iters)
+    columnar_durations = np.zeros(iters)
+    last_week_durations = np.zeros(iters)
+    for i in range(iters):
+        start = perf_counter()
+        csv_store.read()
+        csv_durations[i] = perf_counter() - start
+
+        start = perf_counter()
+        columnar_store.query()
+        columnar_durations[i] = perf_counter() - start
+
+        start = perf_counter()
+        columnar_store.query(start="2025-05-23", columns=["session", "correct"])
+        last_week_durations[i] = perf_counter() - start
+
+rows = n_sessions * trials_per_session
+print(f"Full history ({n_sessions} sessions, {rows} trials):")
+for name, durations in (
+    ("CSV store", csv_durations),
+    ("Columnar store", columnar_durations),
+    ("Columnar, last week, 2 columns", last_week_durations),
+):
+    print(
+        f"  {name}: {durations.mean() * 1000:.1f} ms "
+        f"± {durations.std() * 1000:.1f} ms"
+    )
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from village.controllers.trial_recorder import TrialRecorder
+
+# Compares the TrialRecorder writing and flushing every row with the buffered
+# recorder. A session of trials with many pokes is recorded as fast as possible
+# and the throughput (events/s) and the latency of every recorder call are
+# measured. The file is kept on the same disk as the sessions directory
+# would be, set TMPDIR to test a specific card or drive.
+
+n_trials = 200
+events_per_trial = 250
+
+
+def run(buffered: bool) -> tuple[float, np.ndarray]:
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = TrialRecorder(
+            os.path.join(directory, "session.csv"), buffered=buffered
+        )
+        latencies = np.zeros(n_trials * events_per_trial)
+        i = 0
+        start = perf_counter()
+        for trial in range(n_trials):
+            recorder.start_trial(1000.0 + trial * 10, 0.0)
+            recorder.enter_state("waiting", 0.0)
+            for event in range(events_per_trial):
+                t0 = perf_counter()
+                recorder.add_controller_event("Port1In", event * 0.001)
+                latencies[i] = perf_counter() - t0
+                i += 1
+            recorder.enter_state("reward", 1.0)
+            recorder.add_value("side", "left")
+            recorder.end_trial(2.0)
+            recorder.get_trial_data("2025-01-07", trial + 1, "A1", "Task", "v01")
+        recorder.close()
+        duration = perf_counter() - start
+    return len(latencies) / duration, latencies
+
+
+for buffered in (False, True):
+    events_per_second, latencies = run(buffered)
+    name = "Buffered" if buffered else "Flush per row"
+    print(name + ":")
+    print(f"  throughput: {events_per_second:,.0f} events/s")
+    print(
+        f"  latency per event: {np.mean(latencies) * 1e6:.1f} us "
+        f"± {np.std(latencies) * 1e6:.1f} us, "
+        f"p99 {np.percentile(latencies, 99) * 1e6:.1f} us, "
+        f"worst {np.max(latencies) * 1e6:.1f} us"
+    )
@@ -0,0 +1,184 @@
+import os
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from village.classes.frame_ring import FrameRing
+
+# Plays synthetic 640x480 videos on a simulated 60 Hz screen that asks for the
+# current frame in every paint, as Screen.paintGL does, while a camera-like
+# thread processes a 1280x720 frame at 30 fps. The previous VideoWorker decoded
+# and converted every frame as fast as it could and kept only the latest one
+# (the QImage copy is replaced by a NumPy copy here). The paced decoder
+# converts into the buffers of a FrameRing at the video's FPS and skips the
+# conversion of the frames that will not be shown. Reported: the CPU time of
+# the decoder thread, its frame counters, and the p95 delay of the camera
+# frames. A 30 fps video and a 120 fps one (half of its frames cannot be shown)
+# are played.
+
+width, height = 640, 480
+seconds = 4.0
+refresh = 60.0
+camera_fps = 30.0
+iters = 3
+
+rng = np.random.default_rng(0)
+camera_frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+
+def write_video(path: str, fps: float) -> None:
+    writer = cv2.VideoWriter(
+        path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height)
+    )
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(int(fps * seconds)):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+def camera(delays: list[float], stop: threading.Event) -> None:
+    start = time.monotonic()
+    frame = 0
+    while not stop.is_set():
+        due = start + frame / camera_fps
+        cv2.GaussianBlur(cv2.cvtColor(camera_frame, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        delays.append(time.monotonic() - due)
+        frame += 1
+        delay = start + frame / camera_fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def display(get_frame) -> None:
+    start = time.monotonic()
+    frame = 0
+    while time.monotonic() - start < seconds:
+        get_frame()
+        frame += 1
+        delay = start + frame / refresh - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def play(run, get_frame, on_stop=None) -> float:
+    delays: list[float] = []
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=run),
+        threading.Thread(target=camera, args=(delays, stop)),
+    ]
+    for thread in threads:
+        thread.start()
+    display(get_frame)
+    if on_stop is not None:
+        on_stop()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return float(np.percentile(delays, 95))
+
+
+def previous_decoder(path: str, fps: float) -> tuple[float, float, dict]:
+    latest: list = [None, -1]
+    counters = {"decoded": 0, "converted": 0, "shown": 0}
+    cpu = [0.0]
+    served = [-1]
+    play_start = time.monotonic()
+
+    def run() -> None:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ok, bgr = cap.read()
+            if not ok:
+                break
+            rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
+            latest[:] = [rgba.copy(), latest[1] + 1]
+            counters["decoded"] += 1
+            counters["converted"] += 1
+        cap.release()
+        cpu[0] = time.thread_time()
+
+    def get_frame() -> None:
+        target = int((time.monotonic() - play_start) * fps)
+        if served[0] != target and latest[1] >= target:
+            served[0] = target
+            counters["shown"] += 1
+
+    delay = play(run, get_frame)
+    return cpu[0], delay, counters
+
+
+def paced_decoder(path: str, fps: float) -> tuple[float, float, dict]:
+    ring = FrameRing(3, fps)
+    cpu = [0.0]
+    running = [True]
+
+    def run() -> None:
+        cap = cv2.VideoCapture(path)
+        bgr = None
+        n = 0
+        while running[0]:
+            if not ring.wait_writable(n):
+                continue
+            if ring.buffers is not None and ring.late(n):
+                if not cap.grab():
+                    break
+                ring.skip(n)
+                n += 1
+                continue
+            ok, bgr = cap.read(bgr)
+            if not ok:
+                break
+            if ring.buffers is None:
+                ring.allocate(*bgr.shape[:2])
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA, dst=ring.buffer(n))
+            ring.publish(n)
+            n += 1
+        cap.release()
+        cpu[0] = time.thread_time()
+
+    def on_stop() -> None:
+        running[0] = False
+
+    ring.play()
+    delay = play(run, ring.select, on_stop)
+    return cpu[0], delay, vars(ring.stats())
+
+
+results = {}
+with tempfile.TemporaryDirectory() as directory:
+    for fps in (30.0, 120.0):
+        path = os.path.join(directory, f"video_{fps:.0f}.avi")
+        write_video(path, fps)
+        for name, function in (
+            ("previous decoder, as fast as possible", previous_decoder),
+            ("paced decoder with a 3-frame ring", paced_decoder),
+        ):
+            cpu_times = np.zeros(iters)
+            camera_delays = np.zeros(iters)
+            for i in range(iters):
+                cpu_times[i], camera_delays[i], counters = function(path, fps)
+            results[f"{fps:.0f} fps, {name}"] = (cpu_times, camera_delays, counters)
+
+print(
+    f"{width}x{height} videos, {seconds:.0f} s on a {refresh:.0f} Hz screen, "
+    f"with a {camera_fps:.0f} fps camera thread:"
+)
+for name, (cpu_times, camera_delays, counters) in results.items():
+    print(f"  {name}:")
+    print(
+        f"    decoder CPU {cpu_times.mean() * 1000:.0f} ms "
+        f"± {cpu_times.std() * 1000:.0f} ms, "
+        f"camera p95 delay {camera_delays.mean() * 1000:.1f} ms "
+        f"± {camera_delays.std() * 1000:.1f} ms"
+    )
+    print(
+        "    "
+        + ", ".join(
+            f"{key} {value:.3f}" if isinstance(value, float) else f"{key} {value}"
+            for key, value in counters.items()
+        )
+    )
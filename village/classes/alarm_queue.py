@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+
+class PendingAlarm:
+    """An alarm message waiting to be sent.
+
+    Attributes:
+        message (str): The alarm text.
+        count (int): How many times the same message was raised while pending.
+        enqueued (float): perf_counter time of the first occurrence.
+        attempts (int): Number of failed send attempts so far.
+    """
+
+    def __init__(self, message: str) -> None:
+        self.message: str = message
+        self.count: int = 1
+        self.enqueued: float = time.perf_counter()
+        self.attempts: int = 0
+
+    @property
+    def text(self) -> str:
+        """The text to send, noting how many times the alarm was raised."""
+        if self.count > 1:
+            return self.message + " (x" + str(self.count) + ")"
+        return self.message
+
+
+class AlarmQueue:
+    """Bounded, thread-safe queue of alarm messages drained by an asyncio loop.
+
+    put() can be called from any thread and never blocks. Identical messages
+    that are still pending are coalesced into one. When the queue is full the
+    oldest alarm is dropped. run() sends the alarms one by one from the event
+    loop, retrying failed sends with exponential backoff.
+
+    Attributes:
+        maxsize (int): Maximum number of distinct pending alarms.
+        max_attempts (int): Send attempts before an alarm is given up.
+        backoff (float): Initial retry delay in seconds, doubled on every retry.
+        max_backoff (float): Maximum retry delay in seconds.
+        sent (int): Number of alarms sent.
+        failed (int): Number of alarms given up after max_attempts.
+        dropped (int): Number of alarms dropped because the queue was full.
+        coalesced (int): Number of alarms merged into a pending duplicate.
+        latencies (deque[float]): Seconds from first occurrence to delivery of
+            the most recent alarms.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 50,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.latencies: deque[float] = deque(maxlen=100)
+        self._pending: OrderedDict[str, PendingAlarm] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def put(self, message: str) -> None:
+        """Adds an alarm to the queue. Safe to call from any thread.
+
+        Args:
+            message (str): The alarm text.
+        """
+        with self._lock:
+            pending = self._pending.get(message)
+            if pending is not None:
+                pending.count += 1
+                self.coalesced += 1
+            else:
+                if len(self._pending) >= self.maxsize:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                self._pending[message] = PendingAlarm(message)
+        self._wake()
+
+    def _wake(self) -> None:
+        loop = self._loop
+        wakeup = self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # the loop has been closed
+                pass
+
+    def _pop(self) -> PendingAlarm | None:
+        with self._lock:
+            if not self._pending:
+                return None
+            _, alarm = self._pending.popitem(last=False)
+            return alarm
+
+    async def run(
+        self,
+        send: Callable[[str], None],
+        on_failure: Callable[[str], None] | None = None,
+    ) -> None:
+        """Sends alarms forever from the running event loop.
+
+        The blocking send function is called in a worker thread so the loop
+        keeps serving other tasks while the network is slow.
+
+        Args:
+            send (Callable[[str], None]): Sends one message, raising on failure.
+            on_failure (Callable[[str], None] | None): Called with the message
+                when it is given up after max_attempts.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            alarm = self._pop()
+            if alarm is None:
+                self._wakeup.clear()
+                if len(self) == 0:
+                    await self._wakeup.wait()
+                continue
+            await self._deliver(alarm, send, on_failure)
+
+    async def _deliver(
+        self,
+        alarm: PendingAlarm,
+        send: Callable[[str], None],
+        on_failure: Callable[[str], None] | None,
+    ) -> None:
+        delay = self.backoff
+        while True:
+            try:
+                await asyncio.to_thread(send, alarm.text)
+            except Exception:
+                alarm.attempts += 1
+                if alarm.attempts >= self.max_attempts:
+                    self.failed += 1
+                    if on_failure is not None:
+                        on_failure(alarm.text)
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+            else:
+                self.sent += 1
+                self.latencies.append(time.perf_counter() - alarm.enqueued)
+                return
+
+    def stats(self) -> dict:
+        """Returns the queue counters and latency summary in seconds."""
+        latencies = list(self.latencies)
+        return {
+            "pending": len(self),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max_latency": max(latencies) if latencies else 0.0,
+        }
@@ -0,0 +1,371 @@
+import inspect
+import json
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+
+def fast_hash(path: str, block_size: int = 1 << 16, blocks: int = 16) -> str:
+    """Hash of the contents of a file that reads at most 1 MB of it.
+
+    Files up to blocks * block_size bytes are hashed whole. For larger files
+    (videos) only `blocks` blocks spread evenly over the file are hashed, with
+    the size, which detects truncated and partially written copies without
+    reading the whole file.
+
+    This function is also run on the backup server, so it only uses the
+    standard library and imports inside.
+
+    Args:
+        path (str): The file.
+        block_size (int): Bytes per block.
+        blocks (int): Number of blocks of large files.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    import hashlib
+    import os
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+        if size <= block_size * blocks:
+            digest.update(f.read())
+        else:
+            for i in range(blocks):
+                f.seek((size - block_size) * i // (blocks - 1))
+                digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+# Reads the backup directory and then one path per line, and answers with the
+# size and fast_hash of every file. The answers are flushed at least once per
+# second while it works, and when an empty line asks for the answers so far.
+_VERIFIER_MAIN = """
+import json
+import os
+import sys
+import time
+
+backup_dir = json.loads(sys.stdin.readline())
+last_flush = time.monotonic()
+for line in sys.stdin:
+    if line == "\\n":
+        sys.stdout.flush()
+        last_flush = time.monotonic()
+        continue
+    relative = json.loads(line)
+    path = os.path.join(backup_dir, relative)
+    try:
+        answer = [relative, os.path.getsize(path), fast_hash(path)]
+    except OSError:
+        answer = [relative, -1, ""]
+    sys.stdout.write(json.dumps(answer) + "\\n")
+    if time.monotonic() - last_flush > 1:
+        sys.stdout.flush()
+        last_flush = time.monotonic()
+sys.stdout.flush()
+"""
+
+VERIFIER_PROGRAM = inspect.getsource(fast_hash) + _VERIFIER_MAIN
+
+# the program is sent first through stdin, so the command line has a fixed length
+VERIFIER_COMMAND = "python3 -c 'import sys; exec(sys.stdin.read({}))'".format(
+    len(VERIFIER_PROGRAM)
+)
+
+# exit status of a shell when the command is not found
+COMMAND_NOT_FOUND = 127
+
+
+def size_command(backup_dir: str) -> str:
+    """Shell command that answers "size<TAB>path" for every path read from
+    stdin, -1 if the file is missing. Only needs a POSIX shell, it is used when
+    the backup server has no python3.
+
+    Args:
+        backup_dir (str): The backup directory.
+
+    Returns:
+        str: The command.
+    """
+    return (
+        "cd " + shlex.quote(backup_dir) + " && while IFS= read -r f; do "
+        's=$(wc -c < "$f" 2>/dev/null) || s=-1; '
+        'printf "%s\\t%s\\n" $s "$f"; done'
+    )
+
+
+class BackupVerifier:
+    """Checks which files of a directory have an identical copy in a backup.
+
+    A file is backed up when the backup has a file with the same relative path,
+    the same size and the same fast_hash. The local hashes are kept in a JSON
+    index next to the logs, keyed by path, size and modification time, so
+    every file is read locally only once. The candidate files are processed in
+    chunks: for a remote backup they are streamed through a single SSH
+    connection to a small Python program that hashes the remote copies, so
+    there is no limit on the number of files. If the server has no python3 the
+    check falls back to comparing the sizes with a shell loop, and size_only is
+    set so the caller can warn about it.
+
+    Attributes:
+        directory (str): The local directory.
+        backup_dir (str): The backup directory, local or on the server.
+        index_path (Path | None): The JSON index with the local hashes, None
+            to not keep them.
+        chunk_size (int): Files per chunk.
+        timeout (float): Seconds without answers from the server before giving
+            up.
+        size_only (bool): Whether the last remote check only compared sizes.
+        returncode (int | None): Exit status of the last remote check.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        backup_dir: str,
+        index_path: str | Path | None = None,
+        chunk_size: int = 1000,
+        timeout: float = 120,
+    ) -> None:
+        self.directory = directory
+        self.backup_dir = backup_dir
+        self.index_path = Path(index_path) if index_path is not None else None
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.size_only = False
+        self.returncode: int | None = None
+        self._index: dict[str, list] = {}
+        self._signatures: dict[str, tuple[int, str]] = {}
+
+    def verify_local(self, files: list[str]) -> list[str]:
+        """Checks the files against a backup directory of this computer.
+
+        Args:
+            files (list[str]): Paths relative to directory.
+
+        Returns:
+            list[str]: Full paths of the files that are backed up.
+        """
+        backed_up = []
+        self._load_index()
+        try:
+            for chunk in self._chunks(files):
+                for relative in chunk:
+                    path = os.path.join(self.backup_dir, relative)
+                    try:
+                        backup = (os.path.getsize(path), fast_hash(path))
+                    except OSError:
+                        continue
+                    if self._matches(relative, backup):
+                        backed_up.append(os.path.join(self.directory, relative))
+        finally:
+            self._save_index()
+        return backed_up
+
+    def verify_remote(
+        self,
+        files: list[str],
+        remote_user: str,
+        remote_host: str,
+        port: int | None = None,
+    ) -> list[str]:
+        """Checks the files against a backup directory on a server over SSH.
+
+        Args:
+            files (list[str]): Paths relative to directory.
+            remote_user (str): Username on the server.
+            remote_host (str): Hostname or IP of the server.
+            port (int | None): SSH port.
+
+        Returns:
+            list[str]: Full paths of the files that are backed up.
+        """
+        command = ["ssh"]
+        if port is not None:
+            command += ["-p", str(port)]
+        command += ["-o", "ConnectTimeout=10", f"{remote_user}@{remote_host}"]
+        self.size_only = False
+        backed_up = self.verify_with(files, command + [VERIFIER_COMMAND])
+        if self.returncode == COMMAND_NOT_FOUND:
+            logging.error(
+                "python3 not found on the backup server, comparing sizes only"
+            )
+            self.size_only = True
+            backed_up = self.verify_with(
+                files, command + [size_command(self.backup_dir)], size_only=True
+            )
+        return backed_up
+
+    def verify_with(
+        self, files: list[str], command: list[str], size_only: bool = False
+    ) -> list[str]:
+        """Checks the files with a process that runs VERIFIER_COMMAND in the
+        backup machine, or size_command if size_only.
+
+        Args:
+            files (list[str]): Paths relative to directory.
+            command (list[str]): The command, usually ssh to the server.
+            size_only (bool): Whether the command is a size_command, whose
+                answers are compared by size only.
+
+        Returns:
+            list[str]: Full paths of the files that are backed up.
+        """
+        backed_up: list[str] = []
+        self.returncode = None
+        if not files:
+            return backed_up
+        self._load_index()
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+            )
+        except OSError as e:
+            logging.error(f"Could not start the backup check: {e}")
+            return backed_up
+        last_answer = [time.monotonic()]
+        done = threading.Event()
+        writer = threading.Thread(
+            target=self._send, args=(process, files, size_only), daemon=True
+        )
+        watchdog = threading.Thread(
+            target=self._watchdog, args=(process, last_answer, done), daemon=True
+        )
+        writer.start()
+        watchdog.start()
+        try:
+            assert process.stdout is not None
+            for line in process.stdout:
+                last_answer[0] = time.monotonic()
+                try:
+                    if size_only:
+                        size_text, relative = line.rstrip("\n").split("\t", 1)
+                        size = int(size_text)
+                        matches = self._matches_size(relative, size)
+                    else:
+                        relative, size, digest = json.loads(line)
+                        matches = self._matches(relative, (size, digest))
+                except ValueError:
+                    continue
+                if size >= 0 and matches:
+                    backed_up.append(os.path.join(self.directory, relative))
+        finally:
+            done.set()
+            process.wait()
+            writer.join()
+            assert process.stdout is not None and process.stderr is not None
+            self.returncode = process.returncode
+            if process.returncode != 0:
+                logging.error("Backup check failed: " + process.stderr.read().strip())
+            process.stdout.close()
+            process.stderr.close()
+            self._save_index()
+        return backed_up
+
+    def _send(
+        self, process: subprocess.Popen, files: list[str], size_only: bool
+    ) -> None:
+        # hashes the local files of a chunk and sends them, while the server
+        # works on the previous one
+        assert process.stdin is not None
+        try:
+            if not size_only:
+                process.stdin.write(VERIFIER_PROGRAM)
+                process.stdin.write(json.dumps(self.backup_dir) + "\n")
+            for chunk in self._chunks(files):
+                if size_only:
+                    # the shell reads raw lines
+                    lines = [f + "\n" for f in chunk if "\n" not in f]
+                else:
+                    lines = [json.dumps(f) + "\n" for f in chunk] + ["\n"]
+                process.stdin.write("".join(lines))
+                process.stdin.flush()
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def _watchdog(
+        self, process: subprocess.Popen, last_answer: list[float], done: threading.Event
+    ) -> None:
+        while not done.wait(1):
+            if time.monotonic() - last_answer[0] > self.timeout:
+                logging.error("Backup check timed out")
+                process.kill()
+                return
+
+    def _chunks(self, files: list[str]) -> Iterator[list[str]]:
+        """Yields the files that exist locally, chunk by chunk, with their
+        local signatures computed."""
+        for first in range(0, len(files), self.chunk_size):
+            chunk = []
+            for relative in files[first : first + self.chunk_size]:
+                if self._local_signature(relative) is not None:
+                    chunk.append(relative)
+            yield chunk
+
+    def _local_signature(self, relative: str) -> tuple[int, str] | None:
+        path = os.path.join(self.directory, relative)
+        try:
+            stat = os.stat(path)
+            entry = self._index.get(relative)
+            if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+                entry = [stat.st_size, stat.st_mtime_ns, fast_hash(path)]
+                self._index[relative] = entry
+        except OSError:
+            return None
+        signature = (entry[0], entry[2])
+        self._signatures[relative] = signature
+        return signature
+
+    def _matches(self, relative: str, backup: tuple[int, str]) -> bool:
+        return self._signatures.get(relative) == tuple(backup)
+
+    def _matches_size(self, relative: str, size: int) -> bool:
+        signature = self._signatures.get(relative)
+        return signature is not None and signature[0] == size
+
+    def _load_index(self) -> None:
+        self._signatures = {}
+        self._index = {}
+        if self.index_path is None:
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _save_index(self) -> None:
+        if self.index_path is None:
+            return
+        # only the files checked in this run, so the removed ones are dropped
+        index = {
+            relative: self._index[relative]
+            for relative in self._signatures
+            if relative in self._index
+        }
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(index))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logging.error(f"Could not save the backup index: {e}")
@@ -1,13 +1,19 @@
 import csv
+import datetime
 import os
+import queue
 import sys
+import threading
+import time
 import traceback
 from pathlib import Path
-from typing import Any, Type, Union
+from typing import Any, Callable, Type, Union
 
 import numpy as np
 import pandas as pd
 
+from village.classes.enums import Active
+from village.classes.time_index import TimeIndex
 from village.custom_classes.training_protocol_base import TrainingProtocolBase
 from village.scripts.log import log
 from village.scripts.time_utils import time_utils
@@ -37,6 +43,387 @@ def convert_active(value: str) -> str:
     return "OFF"
 
 
+# strings that int() accepts and are converted without calling it
+_INTEGER_STRING = r"\s*[+-]?[0-9]+\s*"
+
+
+def _is_strings(series: pd.Series) -> bool:
+    return pd.api.types.is_string_dtype(series) and (
+        pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty")
+    )
+
+
+def _convert_each(series: pd.Series, target_type: Any) -> list:
+    """Converts the values of a column of strings with
+    Collection.convert_with_default, calling it once per distinct string."""
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    nones = np.equal(values, None)
+    codes, uniques = pd.factorize(values[~missing])
+    converted = np.empty(len(uniques) + 2, dtype=object)
+    converted[:-2] = [
+        Collection.convert_with_default(value, target_type) for value in uniques
+    ]
+    converted[-2] = Collection.convert_with_default(np.nan, target_type)
+    converted[-1] = Collection.convert_with_default(None, target_type)
+    indices = np.full(len(values), len(converted) - 2)
+    indices[~missing] = codes
+    indices[nones] = len(converted) - 1
+    return converted[indices].tolist()
+
+
+def _to_int(series: pd.Series) -> pd.Series | None:
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return series.astype(np.int64)
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        values = values[~np.isnan(values)]
+        # int() raises for infinite values and returns Python ints above int64
+        if values.size and not (np.abs(values) < 2**63).all():
+            return None
+        return series.fillna(0).astype(np.int64)
+    if not _is_strings(series):
+        return None
+    integer = series.str.fullmatch(_INTEGER_STRING).to_numpy(dtype=bool, na_value=False)
+    result = np.zeros(len(series), dtype=np.int64)
+    try:
+        result[integer] = series[integer].astype(np.int64).to_numpy()
+    except (ValueError, OverflowError):
+        return None
+    other = ~integer & series.notna().to_numpy()
+    if other.any():
+        result[other] = _convert_each(series[other], int)
+    return pd.Series(result, index=series.index)
+
+
+def _to_float(series: pd.Series) -> pd.Series | None:
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.astype(np.float64)
+    if not _is_strings(series):
+        return None
+    if series.dtype != object:
+        try:
+            # parsed like float(), missing values stay NaN
+            return series.astype(np.float64)
+        except (ValueError, TypeError):
+            pass
+    # to_numeric only finds the numbers, their values are parsed like float()
+    # does because to_numeric can differ in the last digit
+    number = pd.to_numeric(series, errors="coerce").notna().to_numpy()
+    result = np.full(len(series), np.nan)
+    try:
+        result[number] = series[number].astype(np.float64).to_numpy()
+    except (ValueError, TypeError):
+        return None
+    other = ~number & series.notna().to_numpy()
+    if other.any():
+        result[other] = _convert_each(series[other], float)
+    if series.dtype == object:
+        result[np.equal(series.to_numpy(), None)] = 0
+    return pd.Series(result, index=series.index)
+
+
+def _to_bool(series: pd.Series) -> pd.Series | None:
+    if pd.api.types.is_bool_dtype(series):
+        return series.copy()
+    if pd.api.types.is_numeric_dtype(series):
+        # NaN is truthy
+        return series != 0
+    if not _is_strings(series):
+        return None
+    result = series.isna().to_numpy() | (series.str.len() > 0).to_numpy(
+        dtype=bool, na_value=False
+    )
+    if series.dtype == object:
+        result[np.equal(series.to_numpy(), None)] = False
+    return pd.Series(result, index=series.index)
+
+
+def _to_str(series: pd.Series) -> pd.Series | None:
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        # str(nan) is "nan", astype keeps it missing
+        return series.astype(str).fillna("nan")
+    if not _is_strings(series):
+        return None
+    if series.dtype == object:
+        return pd.Series(_convert_each(series, str), index=series.index)
+    return series.fillna("nan")
+
+
+_VECTORISED_CONVERTERS: dict[Any, Callable[[pd.Series], pd.Series | None]] = {
+    int: _to_int,
+    float: _to_float,
+    bool: _to_bool,
+    str: _to_str,
+}
+
+
+def column_converter(target_type: Any) -> Callable[[pd.Series], pd.Series]:
+    """Returns a function that converts a column to target_type with the same
+    result as applying Collection.convert_with_default to every cell.
+
+    int, float, bool and str columns are converted with vectorised pandas
+    operations, calling convert_with_default only once per distinct value that
+    they cannot handle. Other types, and columns with mixed types, are
+    converted cell by cell.
+
+    Args:
+        target_type (Any): The type of the column.
+
+    Returns:
+        Callable[[pd.Series], pd.Series]: The converter.
+    """
+    vectorised = _VECTORISED_CONVERTERS.get(target_type)
+
+    def convert(series: pd.Series) -> pd.Series:
+        if vectorised is not None and len(series):
+            result = vectorised(series)
+            if result is not None:
+                return result
+        return series.apply(lambda x: Collection.convert_with_default(x, target_type))
+
+    return convert
+
+
+class CollectionWriter:
+    """Writes the CSV file of a Collection from a background thread.
+
+    The writes are queued and applied in order by a single thread, so callers
+    return immediately. Appended rows are written in batches to an append-only
+    journal next to the CSV (``<name>.csv.journal``) that is fsynced once per
+    batch. Every compact_interval seconds, before a full rewrite and on
+    flush(), the journal rows are moved to the CSV. A journal left by a crash
+    is applied when the collection is opened again.
+
+    A compaction first stores the journal rows, with the size the CSV had, in
+    ``<name>.csv.compact``. The CSV is truncated to that size before appending
+    them, so an interrupted compaction can be repeated without duplicating rows.
+
+    close() writes everything and stops the thread. The writes queued after it
+    are done by the caller, like without a writer.
+
+    Attributes:
+        path (Path): The CSV file.
+        journal_path (Path): The journal of rows not yet in the CSV.
+        compact_path (Path): The rows of a compaction in progress.
+        compact_interval (float): Seconds between compactions.
+        batches (int): Number of batches written (and fsynced) to the journal.
+        closed (bool): Whether close() was called.
+    """
+
+    compact_interval = 5.0
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.journal_path = path.with_name(path.name + ".journal")
+        self.compact_path = path.with_name(path.name + ".compact")
+        self.batches = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._last_compaction = time.monotonic()
+        self.closed = False
+        self._closed_lock = threading.Lock()
+        self.recover()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        _writers.append(self)
+
+    def recover(self) -> None:
+        """Moves to the CSV the rows left in the journal by a previous run."""
+        if self.compact_path.exists():
+            self._finish_compaction()
+        self._compact()
+
+    def append(self, row: list[str]) -> None:
+        """Queues one row.
+
+        Args:
+            row (list[str]): The values of the row, already formatted.
+        """
+        self._submit("append", row)
+
+    def rewrite(self, df: pd.DataFrame) -> None:
+        """Queues a rewrite of the whole CSV.
+
+        Args:
+            df (pd.DataFrame): The new content. It must not be modified later.
+        """
+        self._submit("rewrite", df)
+
+    def call(self, function: Callable[[], None]) -> None:
+        """Queues a function, run on the writer thread after the previous writes.
+
+        Args:
+            function (Callable[[], None]): The function.
+        """
+        self._submit("call", function)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until the queued writes are done and the journal is compacted.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait.
+
+        Returns:
+            bool: True if everything was written.
+        """
+        self._submit("compact", None)
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Writes the queued writes, compacts the journal and stops the thread.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait for the thread.
+
+        Returns:
+            bool: True if the thread stopped.
+        """
+        with self._closed_lock:
+            if not self.closed:
+                self.closed = True
+                self._queue.put(None)
+        self._thread.join(timeout)
+        if self in _writers:
+            _writers.remove(self)
+        return not self._thread.is_alive()
+
+    def _submit(self, kind: str, payload: Any) -> None:
+        with self._closed_lock:
+            if not self.closed:
+                with self._condition:
+                    self._pending += 1
+                self._queue.put((kind, payload))
+                return
+            # the job is done here, after the thread has written the rest
+            self._thread.join()
+            self._apply([(kind, payload)])
+            self._compact()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                jobs = [self._queue.get(timeout=self.compact_interval)]
+            except queue.Empty:
+                jobs = []
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            self._apply(jobs)
+            if stop:
+                self._apply([("compact", None)])
+            if jobs:
+                with self._condition:
+                    self._pending -= len(jobs)
+                    self._condition.notify_all()
+            if stop:
+                return
+
+    def _apply(self, jobs: list[tuple[str, Any]]) -> None:
+        rows: list[list[str]] = []
+        for kind, payload in jobs:
+            try:
+                if kind == "append":
+                    rows.append(payload)
+                    continue
+                self._write_journal(rows)
+                rows = []
+                if kind == "rewrite":
+                    self._compact()
+                    self._rewrite(payload)
+                elif kind == "compact":
+                    self._compact()
+                elif kind == "call":
+                    payload()
+            except Exception:
+                rows = []
+                log.error(
+                    "Error writing " + str(self.path),
+                    exception=traceback.format_exc(),
+                )
+        try:
+            self._write_journal(rows)
+            if time.monotonic() - self._last_compaction > self.compact_interval:
+                self._compact()
+        except Exception:
+            log.error(
+                "Error writing " + str(self.path),
+                exception=traceback.format_exc(),
+            )
+
+    def _write_journal(self, rows: list[list[str]]) -> None:
+        if not rows:
+            return
+        with open(self.journal_path, "a", encoding="utf-8", newline="") as file:
+            csv.writer(file, delimiter=";", lineterminator="\n").writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        self.batches += 1
+
+    def _compact(self) -> None:
+        self._last_compaction = time.monotonic()
+        if not self.journal_path.exists():
+            return
+        rows = self.journal_path.read_bytes()
+        if rows:
+            offset = self.path.stat().st_size if self.path.exists() else 0
+            with open(self.compact_path, "wb") as file:
+                file.write(str(offset).encode() + b"\n" + rows)
+                file.flush()
+                os.fsync(file.fileno())
+        self.journal_path.unlink()
+        if rows:
+            self._finish_compaction()
+
+    def _finish_compaction(self) -> None:
+        offset, _, rows = self.compact_path.read_bytes().partition(b"\n")
+        if rows:
+            with open(self.path, "ab") as file:
+                file.truncate(int(offset))
+                file.write(rows)
+                file.flush()
+                os.fsync(file.fileno())
+        self.compact_path.unlink()
+
+    def _rewrite(self, df: pd.DataFrame) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8", newline="") as file:
+            df.to_csv(file, index=False, sep=";")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+_writers: list[CollectionWriter] = []
+
+
+def flush_collections(timeout: float | None = None) -> None:
+    """Waits until the background writes of all the collections are done.
+
+    Args:
+        timeout (float | None): Maximum seconds to wait for each collection.
+    """
+    for writer in _writers:
+        writer.flush(timeout)
+
+
+def close_collections(timeout: float | None = None) -> None:
+    """Writes everything and stops the background writers of all the
+    collections. Called when the application exits or reloads.
+
+    Args:
+        timeout (float | None): Maximum seconds to wait for each collection.
+    """
+    for writer in list(_writers):
+        writer.close(timeout)
+
+
 class Collection:
     """Manages a collection of data entries stored in a CSV file and a pandas DataFrame.
 
@@ -46,13 +433,72 @@ class Collection:
         types (list[Type]): List of column data types.
         dict (dict): Dictionary mapping columns to types.
         path (Path): Path to the CSV file.
-        df (pd.DataFrame): The pandas DataFrame holding the data.
+        df (pd.DataFrame): The pandas DataFrame holding the data. New entries
+            are kept in a per-column append buffer and only merged into the
+            DataFrame the next time it is read.
+
+    When BUFFERED_COLLECTIONS is ON the file writes are done by a
+    CollectionWriter and the methods return without waiting for the disk.
+
+    Collections with a date column can keep a TimeIndex (see index_by_date),
+    so the rows of the last hours are found with a binary search by window.
     """
 
+    _df: pd.DataFrame | None = None
+    _n_pending: int = 0
+    _writer: CollectionWriter | None = None
+    _time_index: TimeIndex | None = None
+    _indexed_df: pd.DataFrame | None = None
+
     def __init__(self) -> None:
         """Initializes the Collection."""
         pass
 
+    @property
+    def df(self) -> pd.DataFrame:
+        """The collection as a DataFrame, including any buffered entries."""
+        if self._n_pending:
+            with self._lock:
+                self._materialize()
+        if self._df is None:
+            self._df = pd.DataFrame()
+        return self._df
+
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        if self._n_pending:
+            with self._lock:
+                self._reset_pending()
+        self._df = value
+
+    def _reset_pending(self) -> None:
+        self._pending: dict[str, list] = {col: [] for col in self.columns}
+        self._n_pending = 0
+
+    def _materialize(self) -> None:
+        """Merges the append buffer into the DataFrame with a single concat."""
+        if not self._n_pending:
+            return
+        new_rows = pd.DataFrame(self._pending, columns=self.columns)
+        indexed = self._time_index is not None and self._index_is_current()
+        if self._df is None or self._df.empty:
+            self._df = new_rows
+        else:
+            self._df = pd.concat([self._df, new_rows], ignore_index=True)
+        self._reset_pending()
+        if indexed:
+            # only the new dates are parsed
+            self._time_index.extend(new_rows)
+            self._indexed_df = self._df
+
+    def _index_is_current(self) -> bool:
+        assert self._time_index is not None
+        df = self._df if self._df is not None else pd.DataFrame()
+        return self._indexed_df is df and len(self._time_index) == len(df)
+
+    def __len__(self) -> int:
+        return (0 if self._df is None else len(self._df)) + self._n_pending
+
     def create_data_collection(
         self, name: str, columns: list[str], types: list[Type]
     ) -> None:
@@ -60,8 +506,11 @@ class Collection:
         self.columns: list[str] = columns
         self.types: list[Type] = types
         self.dict = {col: t for col, t in zip(self.columns, self.types)}
+        self._converters = [column_converter(t) for t in self.types]
         filename = name if name.endswith(".csv") else name + ".csv"
         self.path: Path = Path(settings.get("SYSTEM_DIRECTORY")) / filename
+        self._lock = threading.Lock()
+        self._reset_pending()
         self.df = pd.DataFrame()
 
         if name != "":
@@ -69,6 +518,9 @@ class Collection:
                 with open(self.path, "w", encoding="utf-8") as file:
                     columns_str: str = ";".join(self.columns) + "\n"
                     file.write(columns_str)
+            if settings.get("BUFFERED_COLLECTIONS") == Active.ON:
+                # applies the journal of a previous run before reading the file
+                self._writer = CollectionWriter(self.path)
             try:
                 self.df = pd.read_csv(self.path, dtype=self.dict, sep=";")
             except Exception:
@@ -87,13 +539,85 @@ class Collection:
         entry_str = [
             "" if isinstance(e, float) and np.isnan(e) else str(e) for e in entry
         ]
-        new_row = pd.DataFrame([entry_str], columns=self.columns)
-        new_row = self.convert_df_to_types(new_row)
-        self.df = pd.concat([self.df, new_row], ignore_index=True)
-        with open(self.path, "a", encoding="utf-8", newline="") as file:
-            csv.writer(file, delimiter=";", lineterminator="\n").writerow(entry_str)
+        if len(entry_str) != len(self.columns):
+            raise ValueError(
+                f"{self.name}: expected {len(self.columns)} values, "
+                f"got {len(entry_str)}"
+            )
+        with self._lock:
+            for col, type, value in zip(self.columns, self.types, entry_str):
+                self._pending[col].append(self.convert_with_default(value, type))
+            self._n_pending += 1
+        if self._writer is not None:
+            self._writer.append(entry_str)
+        else:
+            with open(self.path, "a", encoding="utf-8", newline="") as file:
+                writer = csv.writer(file, delimiter=";", lineterminator="\n")
+                writer.writerow(entry_str)
         self.check_split_csv()
 
+    def index_by_date(self, category_columns: list[str] | None = None) -> None:
+        """Keeps a TimeIndex of the date column, used by window. It is updated
+        when entries are added and rebuilt when the DataFrame is replaced.
+
+        Args:
+            category_columns (list[str] | None): Text columns that window
+                returns as categoricals.
+        """
+        with self._lock:
+            self._time_index = TimeIndex("date", category_columns or [])
+            self._indexed_df = None
+
+    def window(
+        self, start: datetime.datetime, end: datetime.datetime | None = None
+    ) -> pd.DataFrame:
+        """Entries with start <= date < end, in time order. The date column is
+        returned parsed as datetimes and the category columns as categoricals.
+
+        It only needs a binary search on the index, and the other columns are
+        a slice of the DataFrame, not a copy, so it can be called often and
+        from any thread. Requires index_by_date.
+
+        Args:
+            start (datetime.datetime): First date of the window.
+            end (datetime.datetime | None): End of the window, None for no end.
+
+        Returns:
+            pd.DataFrame: The entries of the window.
+        """
+        if self._time_index is None:
+            raise RuntimeError(f"{self.name}: index_by_date was not called")
+        with self._lock:
+            self._materialize()
+            df = self._df if self._df is not None else pd.DataFrame()
+            if not self._index_is_current():
+                self._time_index.build(df)
+                self._indexed_df = df
+            rows = self._time_index.window(start, end)
+            columns = {
+                "date": self._time_index.dates(rows),
+                **{
+                    col: self._time_index.categorical(col, rows)
+                    for col in self._time_index.category_columns
+                },
+            }
+        result = df.iloc[rows]
+        return result.assign(
+            **{
+                col: pd.Series(values, index=result.index)
+                for col, values in columns.items()
+            }
+        )
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Waits until the background writes, if any, are on disk.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait.
+        """
+        if self._writer is not None:
+            self._writer.flush(timeout)
+
     @staticmethod
     def convert_with_default(value, target_type: Any) -> Any:
         """Converts a value to a target type, using defaults for failures.
@@ -126,24 +650,30 @@ class Collection:
         Returns:
             pd.DataFrame: The converted DataFrame.
         """
-        for col, type in zip(df.columns, self.types):
-            df[col] = df[col].apply(lambda x: self.convert_with_default(x, type))
+        for col, converter in zip(df.columns, self._converters):
+            df[col] = converter(df[col])
         return df
 
     def check_split_csv(self) -> None:
         """Checks if the CSV file is too large and splits it if necessary."""
         max_size = 50000
         file_size = 40000
-        if len(self.df) > max_size:
+        if len(self) > max_size:
             first_rows: pd.DataFrame = self.df.head(file_size)
             date_str: str = time_utils.now_string_for_filename()
             new_filename: str = self.path.stem + "_" + date_str + ".csv"
             directory = Path(settings.get("SYSTEM_DIRECTORY"), "old_events")
             new_path = Path(directory, new_filename)
             directory.mkdir(parents=True, exist_ok=True)
-            first_rows.to_csv(new_path, index=False, sep=";")
             last: pd.DataFrame = self.df.tail(len(self.df) - file_size)
-            last.to_csv(self.path, index=False, sep=";")
+            if self._writer is not None:
+                self._writer.call(
+                    lambda: first_rows.to_csv(new_path, index=False, sep=";")
+                )
+                self._writer.rewrite(last.copy(deep=False))
+            else:
+                first_rows.to_csv(new_path, index=False, sep=";")
+                last.to_csv(self.path, index=False, sep=";")
             self.df = last
 
     def get_last_entry(self, column: str, value: str) -> Union[pd.Series, None]:
@@ -217,7 +747,10 @@ class Collection:
             training (TrainingProtocolBase): Protocol for formatting specific fields.
         """
         new_df = self.df_from_df(self.df, training)
-        new_df.to_csv(self.path, index=False, sep=";")
+        if self._writer is not None:
+            self._writer.rewrite(new_df.copy(deep=False))
+        else:
+            new_df.to_csv(self.path, index=False, sep=";")
         self.df = new_df
 
     def df_from_df(
@@ -0,0 +1,543 @@
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable
+
+import cv2
+import numpy as np
+
+from village.scripts.log import log
+
+
+class TimingHistogram:
+    """Histogram of per-frame processing times.
+
+    Attributes:
+        bin_width (float): Width of the bins in milliseconds.
+        edges (np.ndarray): Lower edge of every bin in milliseconds. The last
+            bin also counts every frame slower than the histogram range.
+        counts (np.ndarray): Number of frames in every bin.
+        frames (int): Number of frames measured.
+        total (float): Sum of the durations in milliseconds.
+        worst (float): Slowest frame in milliseconds.
+    """
+
+    def __init__(self, bin_width: float = 0.1, max_ms: float = 100.0) -> None:
+        self.bin_width = bin_width
+        self.edges = np.arange(0.0, max_ms, bin_width)
+        self.counts = np.zeros(len(self.edges), dtype=np.int64)
+        self.frames = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, duration: float) -> None:
+        """Adds the duration of one frame in milliseconds."""
+        index = min(int(duration / self.bin_width), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.frames += 1
+        self.total += duration
+        if duration > self.worst:
+            self.worst = duration
+
+    def reset(self) -> None:
+        """Clears the histogram."""
+        self.counts[:] = 0
+        self.frames = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def percentile(self, q: float) -> float:
+        """Returns the upper edge of the bin containing the q-th percentile."""
+        if self.frames == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), self.frames * q / 100))
+        return float(self.edges[index] + self.bin_width)
+
+    def over(self, budget: float) -> int:
+        """Returns the number of frames that took longer than budget ms."""
+        return int(self.counts[self.edges >= budget].sum())
+
+    def summary(self, framerate: int | None = None) -> dict:
+        """Returns the main statistics in milliseconds.
+
+        Args:
+            framerate (int | None): If given, also counts the frames slower
+                than the frame period.
+        """
+        summary = {
+            "frames": self.frames,
+            "mean": self.total / self.frames if self.frames else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "worst": self.worst,
+        }
+        if framerate:
+            summary["over_frame_period"] = self.over(1000 / framerate)
+        return summary
+
+
+class DetectionLayout:
+    """Buffers and coordinates for one configuration of the areas and one
+    frame size. A new layout is built when either changes, so a frame that was
+    cropped with the previous layout can still be processed with it.
+
+    Attributes:
+        bbox (tuple[int, int, int, int]): Union bounding box of the active
+            areas (x1, y1, x2, y2) in frame coordinates.
+        rects (list[tuple[int, int, int, int] | None]): Every area clipped to
+            the frame, in bounding box coordinates, None if inactive or empty.
+        thresholds (list[int]): Threshold of every area.
+        shared_threshold (int | None): The threshold of all the active areas,
+            None if they differ.
+        shape (tuple[int, int]): Shape of the grayscale bounding box.
+    """
+
+    def __init__(
+        self,
+        frame_shape: tuple[int, int],
+        areas: list[list[int]],
+        thresholds: list[int],
+        active: list[bool],
+    ) -> None:
+        height, width = frame_shape
+        clipped: list[tuple[int, int, int, int] | None] = []
+        for area, on in zip(areas, active):
+            x1, y1, x2, y2 = area
+            x1, x2 = max(x1, 0), min(x2, width)
+            y1, y2 = max(y1, 0), min(y2, height)
+            clipped.append((x1, y1, x2, y2) if on and x2 > x1 and y2 > y1 else None)
+        rects = [rect for rect in clipped if rect is not None]
+        if not rects:
+            raise ValueError("No active area inside the frame")
+        bx1 = min(rect[0] for rect in rects)
+        by1 = min(rect[1] for rect in rects)
+        bx2 = max(rect[2] for rect in rects)
+        by2 = max(rect[3] for rect in rects)
+        self.bbox = (bx1, by1, bx2, by2)
+        self.rects = [
+            (
+                None
+                if rect is None
+                else (rect[0] - bx1, rect[1] - by1, rect[2] - bx1, rect[3] - by1)
+            )
+            for rect in clipped
+        ]
+        self.thresholds = list(thresholds)
+        self.shape = (by2 - by1, bx2 - bx1)
+        self.gray = np.empty(self.shape, dtype=np.uint8)
+        self.union = np.zeros(self.shape, dtype=np.uint8)
+        active_thresholds = {
+            threshold
+            for threshold, rect in zip(thresholds, self.rects)
+            if rect is not None
+        }
+        self.shared_threshold = (
+            active_thresholds.pop() if len(active_thresholds) == 1 else None
+        )
+        if self.shared_threshold is not None:
+            self.binary = np.empty(self.shape, dtype=np.uint8)
+            self.integral = np.empty((self.shape[0] + 1, self.shape[1] + 1), np.int32)
+            # the masks are views of the thresholded bounding box
+            self.masks = [
+                (
+                    None
+                    if rect is None
+                    else self.binary[rect[1] : rect[3], rect[0] : rect[2]]
+                )
+                for rect in self.rects
+            ]
+            self.coverage = np.zeros(self.shape, dtype=np.uint8)
+            for rect in self.rects:
+                if rect is not None:
+                    self.coverage[rect[1] : rect[3], rect[0] : rect[2]] = 255
+            self.full_coverage = bool(self.coverage.all())
+        else:
+            self.masks = [
+                (
+                    None
+                    if rect is None
+                    else np.empty((rect[3] - rect[1], rect[2] - rect[0]), np.uint8)
+                )
+                for rect in self.rects
+            ]
+
+
+class DetectionEngine:
+    """Thresholds the detection areas of a camera frame.
+
+    Only the bounding box of the union of the active areas is converted to
+    grayscale and thresholded, using buffers allocated once per configuration
+    (see DetectionLayout). When all the active areas share the same threshold
+    the bounding box is thresholded once and the pixel counts of every area are
+    read from its integral image. Otherwise every area is thresholded
+    separately.
+
+    crop() and detect() can run in different threads: crop() only reads the
+    current layout, and detect() only writes the buffers of the layout it is
+    given. detect() fills new masks and counts lists and swaps them in at the
+    end under a lock, so a reader in another thread never sees a list half
+    updated. Use results() to get both lists of the same frame.
+
+    Attributes:
+        masks (list): Thresholded mask of every area, -1 for inactive areas.
+            The arrays are buffers of the layout, overwritten by the next
+            detect().
+        counts (list[int]): Detected pixel count of every area, -1 for
+            inactive areas.
+        timing (TimingHistogram): Time spent on every frame.
+    """
+
+    def __init__(self, number_of_areas: int = 4) -> None:
+        self.number_of_areas = number_of_areas
+        self.masks: list = [-1] * number_of_areas
+        self.counts: list[int] = [-1] * number_of_areas
+        self.timing = TimingHistogram()
+        self._areas: list[list[int]] = []
+        self._thresholds: list[int] = []
+        self._active: list[bool] = []
+        self._layout: DetectionLayout | None = None
+        self._layout_shape: tuple[int, int] | None = None
+        self._gray: np.ndarray | None = None
+        self._gray_layout: DetectionLayout | None = None
+        self._detected_layout: DetectionLayout | None = None
+        self._start = 0.0
+        self._results_lock = threading.Lock()
+
+    def configure(
+        self, areas: list[list[int]], thresholds: list[int], active: list[bool]
+    ) -> None:
+        """Sets the areas. The buffers are allocated on the next frame.
+
+        Args:
+            areas (list[list[int]]): [x1, y1, x2, y2] of every area.
+            thresholds (list[int]): Threshold of every area.
+            active (list[bool]): Whether every area is detected.
+        """
+        self._areas = [list(area) for area in areas]
+        self._thresholds = list(thresholds)
+        self._active = list(active)
+        self._layout_shape = None
+
+    def layout(self, frame_shape: tuple[int, int]) -> DetectionLayout | None:
+        """Returns the layout for frames of this shape, None if no area is
+        active inside the frame."""
+        if self._layout_shape != frame_shape:
+            try:
+                self._layout = DetectionLayout(
+                    frame_shape, self._areas, self._thresholds, self._active
+                )
+            except ValueError:
+                # no active area inside the frame
+                self._layout = None
+            self._layout_shape = frame_shape
+        return self._layout
+
+    @property
+    def bbox(self) -> tuple[int, int, int, int] | None:
+        """Union bounding box of the active areas of the current layout."""
+        return None if self._layout is None else self._layout.bbox
+
+    def crop(
+        self, frame: np.ndarray, out: np.ndarray | None = None
+    ) -> tuple[np.ndarray | None, DetectionLayout | None]:
+        """Converts the bounding box of the active areas to grayscale.
+
+        Args:
+            frame (np.ndarray): The BGR or BGRA camera frame.
+            out (np.ndarray | None): Array to write to, used if it has the
+                shape of the bounding box.
+
+        Returns:
+            tuple: The grayscale bounding box and its layout, (None, None) if
+            no area is active.
+        """
+        layout = self.layout(frame.shape[:2])
+        if layout is None:
+            return None, None
+        if out is None or out.shape != layout.shape:
+            out = np.empty(layout.shape, dtype=np.uint8)
+        x1, y1, x2, y2 = layout.bbox
+        cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY, dst=out)
+        return out, layout
+
+    def load(self, gray: np.ndarray | None, layout: DetectionLayout | None) -> None:
+        """Sets the grayscale bounding box, returned by crop(), for the next
+        detect()."""
+        self._gray, self._gray_layout = gray, layout
+
+    def convert(self, frame: np.ndarray) -> None:
+        """Crops the frame to grayscale for the next detect(). Starts the
+        timing of the frame.
+
+        Args:
+            frame (np.ndarray): The BGR or BGRA camera frame.
+        """
+        self._start = time.perf_counter()
+        layout = self.layout(frame.shape[:2])
+        out = None if layout is None else layout.gray
+        self._gray, self._gray_layout = self.crop(frame, out)
+
+    def detect(
+        self,
+        black: bool,
+        gray: np.ndarray | None = None,
+        layout: DetectionLayout | None = None,
+    ) -> None:
+        """Thresholds the areas and counts the detected pixels.
+
+        Args:
+            black (bool): Detect dark pixels (below or at the threshold)
+                instead of bright ones.
+            gray (np.ndarray | None): Grayscale bounding box from crop(). The
+                one from the last convert() is used if None.
+            layout (DetectionLayout | None): The layout returned with gray.
+        """
+        if gray is None:
+            gray, layout = self._gray, self._gray_layout
+        masks: list = [-1] * self.number_of_areas
+        counts: list[int] = [-1] * self.number_of_areas
+        if gray is None or layout is None:
+            self._publish(None, masks, counts)
+            return
+        kind = cv2.THRESH_BINARY_INV if black else cv2.THRESH_BINARY
+        if layout.shared_threshold is not None:
+            cv2.threshold(gray, layout.shared_threshold, 255, kind, dst=layout.binary)
+            cv2.integral(layout.binary, sum=layout.integral, sdepth=cv2.CV_32S)
+            integral = layout.integral
+            for index, rect in enumerate(layout.rects):
+                if rect is None:
+                    continue
+                x1, y1, x2, y2 = rect
+                total = (
+                    integral[y2, x2]
+                    - integral[y1, x2]
+                    - integral[y2, x1]
+                    + integral[y1, x1]
+                )
+                masks[index] = layout.masks[index]
+                counts[index] = int(total) // 255
+        else:
+            for index, rect in enumerate(layout.rects):
+                if rect is None:
+                    continue
+                x1, y1, x2, y2 = rect
+                mask = layout.masks[index]
+                cv2.threshold(
+                    gray[y1:y2, x1:x2],
+                    layout.thresholds[index],
+                    255,
+                    kind,
+                    dst=mask,
+                )
+                masks[index] = mask
+                counts[index] = cv2.countNonZero(mask)
+        self._publish(layout, masks, counts)
+
+    def _publish(
+        self, layout: DetectionLayout | None, masks: list, counts: list[int]
+    ) -> None:
+        with self._results_lock:
+            self._detected_layout = layout
+            self.masks = masks
+            self.counts = counts
+
+    def results(self) -> tuple[list, list[int]]:
+        """Returns the masks and counts of the last detect()."""
+        with self._results_lock:
+            return self.masks, self.counts
+
+    def union_mask(self) -> np.ndarray | None:
+        """Returns the union of the area masks of the last detect() over the
+        bounding box."""
+        layout = self._detected_layout
+        if layout is None:
+            return None
+        if layout.shared_threshold is not None:
+            if layout.full_coverage:
+                return layout.binary
+            return cv2.bitwise_and(layout.binary, layout.coverage, dst=layout.union)
+        layout.union.fill(0)
+        for rect, mask in zip(layout.rects, layout.masks):
+            if rect is not None:
+                x1, y1, x2, y2 = rect
+                sub = layout.union[y1:y2, x1:x2]
+                np.maximum(sub, mask, out=sub)
+        return layout.union
+
+    def position_contours(self, min_area: int) -> tuple[int, int]:
+        """Returns the centroid of the largest contour of the union mask, or
+        (-1, -1) if no contour is at least min_area pixels."""
+        union = self.union_mask()
+        if union is None or self._detected_layout is None:
+            return -1, -1
+        bx1, by1, _, _ = self._detected_layout.bbox
+        contours, _ = cv2.findContours(
+            union, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(bx1, by1)
+        )
+        best_c = None
+        best_area = 0.0
+        for c in contours:
+            a = cv2.contourArea(c)
+            if a >= min_area and a > best_area:
+                best_area = a
+                best_c = c
+        if best_c is None:
+            return -1, -1
+        M = cv2.moments(best_c)
+        if M["m00"] > 0:
+            return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+        return -1, -1
+
+    def position_components(self, min_area: int) -> tuple[int, int]:
+        """Returns the centroid of the largest connected component of the union
+        mask, or (-1, -1) if none is at least min_area pixels."""
+        union = self.union_mask()
+        if union is None or self._detected_layout is None:
+            return -1, -1
+        bx1, by1, _, _ = self._detected_layout.bbox
+        num, _, stats, centroids = cv2.connectedComponentsWithStats(
+            union, connectivity=8
+        )
+        if num <= 1:
+            return -1, -1
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        valid = np.where(areas >= min_area)[0]
+        if valid.size == 0:
+            return -1, -1
+        index = 1 + valid[np.argmax(areas[valid])]
+        cx, cy = centroids[index]
+        return int(cx) + bx1, int(cy) + by1
+
+    def finish(self) -> None:
+        """Ends the timing of the frame started by convert()."""
+        self.timing.add((time.perf_counter() - self._start) * 1000)
+
+
+class DetectionWorker:
+    """Runs the detection of camera frames in a background thread.
+
+    submit() is called from the camera callback. It only converts the bounding
+    box of the active areas to grayscale, into a free slot of a ring buffer, and
+    queues it with the metadata of the frame. The worker thread calls
+    process(gray, layout, metadata) for every queued frame, in order. When all
+    the slots are in use the frame is queued without image, so its metadata is
+    not lost, with metadata["dropped"] set to True. flush() waits until the
+    frames queued so far are processed.
+
+    Attributes:
+        engine (DetectionEngine): The engine that crops the frames.
+        frame_period (float): Seconds between frames. Frames processed later
+            than this after being submitted are counted as late.
+        submitted (int): Frames submitted.
+        processed (int): Frames processed.
+        dropped (int): Frames queued without image because the ring was full.
+        late (int): Frames processed more than frame_period after submission.
+        errors (int): Frames whose processing raised an exception.
+    """
+
+    def __init__(
+        self,
+        engine: DetectionEngine,
+        process: Callable[[np.ndarray | None, DetectionLayout | None, dict], None],
+        slots: int = 4,
+        frame_period: float = 1 / 30,
+    ) -> None:
+        self.engine = engine
+        self.frame_period = frame_period
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.late = 0
+        self.errors = 0
+        self._process = process
+        self._buffers: list[np.ndarray | None] = [None] * slots
+        self._free: deque[int] = deque(range(slots))
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: np.ndarray, metadata: dict[str, Any]) -> None:
+        """Queues a frame. Called from the camera callback.
+
+        Args:
+            frame (np.ndarray): The camera frame, only used during the call.
+            metadata (dict[str, Any]): Passed to process with the frame.
+        """
+        self.submitted += 1
+        try:
+            slot = self._free.popleft()
+        except IndexError:
+            slot = -1
+        if slot < 0:
+            self.dropped += 1
+            gray, layout = None, None
+        else:
+            gray, layout = self.engine.crop(frame, self._buffers[slot])
+            self._buffers[slot] = gray
+        metadata["dropped"] = slot < 0
+        self._queue.put((slot, gray, layout, metadata, time.perf_counter()))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until the frames queued before the call are processed.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait, None to wait
+                until they are processed.
+
+        Returns:
+            bool: True if the frames were processed, False after the timeout
+                or if called from the worker thread.
+        """
+        if threading.current_thread() is self._thread:
+            return False
+        processed = threading.Event()
+        self._queue.put(processed)
+        return processed.wait(timeout)
+
+    def stop(self) -> None:
+        """Processes the queued frames and stops the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        """Returns the frame counters and the queue length."""
+        return {
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "late": self.late,
+            "errors": self.errors,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                # flush barrier
+                item.set()
+                continue
+            slot, gray, layout, metadata, submitted = item
+            start = time.perf_counter()
+            try:
+                self._process(gray, layout, metadata)
+            except Exception:
+                self.errors += 1
+                if self.errors == 1:
+                    log.error(
+                        "Error in the camera detection thread",
+                        exception=traceback.format_exc(),
+                    )
+            finally:
+                if slot >= 0:
+                    self._free.append(slot)
+            done = time.perf_counter()
+            if not metadata["dropped"]:
+                self.engine.timing.add((done - start) * 1000)
+            if done - submitted > self.frame_period:
+                self.late += 1
+            self.processed += 1
@@ -0,0 +1,218 @@
+import queue
+import threading
+import traceback
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from village.scripts.log import log
+
+PositionOverride = Callable[[np.ndarray], tuple[np.ndarray, np.ndarray]]
+
+
+class FrameLog:
+    """Per-frame metadata of a camera recording.
+
+    The frame number, trial, annotation, timestamp and x/y position of every
+    frame are stored in a preallocated NumPy structured array (one field per
+    column) that doubles its size when full. Annotations are interned as
+    integer codes with a lookup table. Every chunk_rows frames the filled part
+    of the buffer is handed to a background thread that appends it to the CSV
+    file of the recording, so memory stays flat during long recordings and
+    stop() returns immediately. append(), start() and stop() can be called
+    from different threads.
+
+    Attributes:
+        capacity (int): Current number of rows of the buffer.
+        chunk_rows (int): Rows handed to the writer thread at once.
+        path (str | None): CSV file of the current recording, None if the
+            frames are not saved.
+        tracking (bool): Whether the x/y position columns are saved.
+        position_override (PositionOverride | None): Function that receives the
+            timestamps of a chunk and returns the x and y positions to save
+            instead of the detected ones.
+        rows (int): Frames appended in the current recording.
+        on_closed (Callable[[str], None] | None): Called from the writer thread
+            with the path of every CSV file once it is complete.
+    """
+
+    COLUMNS = [
+        "frame",
+        "trial",
+        "annotation",
+        "timestamp",
+        "x_position",
+        "y_position",
+    ]
+    DTYPE = np.dtype(
+        [
+            ("frame", np.int64),
+            ("trial", np.int32),
+            ("annotation", np.int32),
+            ("timestamp", np.float64),
+            ("x_position", np.int32),
+            ("y_position", np.int32),
+        ]
+    )
+
+    def __init__(self, capacity: int = 4096, chunk_rows: int = 1024) -> None:
+        self.capacity = capacity
+        self.chunk_rows = chunk_rows
+        self.path: str | None = None
+        self.tracking = False
+        self.position_override: PositionOverride | None = None
+        self.rows = 0
+        self.on_closed: Callable[[str], None] | None = None
+        self._size = 0
+        self._buffer = np.empty(capacity, dtype=self.DTYPE)
+        self._annotations: list[str] = []
+        self._annotation_index: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._jobs: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def start(self, path: str | None, tracking: bool) -> None:
+        """Starts a new recording, finishing the previous one if still open.
+
+        Args:
+            path (str | None): CSV file for the frames, None to discard them.
+            tracking (bool): Save the x/y position columns.
+        """
+        with self._lock:
+            self._stop()
+            self.path = path
+            self.tracking = tracking
+            self.rows = 0
+            # new objects so the chunks of the previous recording that are still
+            # queued keep their own annotation table
+            self._annotations = []
+            self._annotation_index = {}
+
+    def append(
+        self,
+        frame: int,
+        trial: int,
+        annotation: str,
+        timestamp: float,
+        x_position: int,
+        y_position: int,
+    ) -> None:
+        """Stores the metadata of one frame."""
+        with self._lock:
+            if self.path is None:
+                return
+            code = self._annotation_index.get(annotation)
+            if code is None:
+                code = len(self._annotations)
+                self._annotations.append(annotation)
+                self._annotation_index[annotation] = code
+            if self._size == self.capacity:
+                self._grow()
+            self._buffer[self._size] = (
+                frame,
+                trial,
+                code,
+                timestamp,
+                x_position,
+                y_position,
+            )
+            self._size += 1
+            self.rows += 1
+            if self._size >= self.chunk_rows:
+                self._hand_off(final=False)
+
+    def stop(self) -> None:
+        """Hands the remaining frames to the writer thread and closes the
+        recording. The file is complete once wait() returns."""
+        with self._lock:
+            self._stop()
+
+    def _stop(self) -> None:
+        if self.path is None:
+            return
+        self._hand_off(final=True)
+        self.path = None
+        self.position_override = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Waits until all the handed off frames are written.
+
+        Args:
+            timeout (float | None): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the writer is idle.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending == 0, timeout)
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        buffer = np.empty(self.capacity, dtype=self.DTYPE)
+        buffer[: self._size] = self._buffer[: self._size]
+        self._buffer = buffer
+
+    def _hand_off(self, final: bool) -> None:
+        n = self._size
+        chunk = self._buffer[:n].copy()
+        self._size = 0
+        with self._condition:
+            self._pending += 1
+        self._jobs.put(
+            (
+                self.path,
+                self.tracking,
+                self.position_override,
+                self._annotations,
+                chunk,
+                self.rows - n == 0,
+                final,
+            )
+        )
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                self._write(*job)
+                final = job[6]
+                if final and self.on_closed is not None:
+                    self.on_closed(job[0])
+            except Exception:
+                log.error(
+                    "Error writing the camera csv " + str(job[0]),
+                    exception=traceback.format_exc(),
+                )
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    def _write(
+        self,
+        path: str,
+        tracking: bool,
+        position_override: PositionOverride | None,
+        annotations: list[str],
+        chunk: np.ndarray,
+        first: bool,
+        final: bool,
+    ) -> None:
+        if len(chunk) == 0 and not (first and final):
+            return
+        columns = self.COLUMNS if tracking else self.COLUMNS[:4]
+        if tracking and position_override is not None and len(chunk):
+            chunk["x_position"], chunk["y_position"] = position_override(
+                chunk["timestamp"]
+            )
+        df = pd.DataFrame({column: chunk[column] for column in columns})
+        df["annotation"] = np.array(annotations, dtype=object)[chunk["annotation"]]
+        df.to_csv(path, mode="w" if first else "a", header=first, index=False, sep=";")
@@ -0,0 +1,249 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class VideoStats:
+    """Counters of a video playback."""
+
+    decoded: int = 0  # frames read from the file
+    converted: int = 0  # frames converted to RGBA
+    shown: int = 0  # frames served to the screen
+    dropped: int = 0  # frames never shown, converted or not
+    margin: float = 0.0  # seconds the newest converted frame is ahead, <0 if late
+
+
+class FrameRing:
+    """Small ring of preallocated RGBA buffers between a video decoder and the
+    screen, with the pacing of the decoder.
+
+    Frame n is due at play() + n / fps. The decoder asks wait_writable(n)
+    before decoding a frame: it returns when there is a buffer that is neither
+    on screen nor holding a frame waiting to be shown, and the frame is at most
+    capacity - 1 frames ahead of the playback time, so the decoder runs at the
+    speed of the video instead of as fast as it can. Before play() it only
+    fills the ring. A frame whose next frame is already due will not be shown,
+    so late() tells the decoder to skip its conversion and it does not take a
+    buffer.
+
+    The screen calls select() in every paint to get the newest frame that is
+    due. Its buffer is not written until a newer frame is selected. All
+    methods are thread safe.
+
+    Attributes:
+        capacity (int): Number of buffers.
+        buffers (np.ndarray | None): (capacity, height, width, 4) uint8 array,
+            None until allocate().
+        fps (float): Frames per second of the video.
+    """
+
+    def __init__(self, capacity: int = 3, fps: float = 30.0) -> None:
+        self.capacity = capacity
+        self.buffers: np.ndarray | None = None
+        self.fps = fps
+        self._frame_dt = 1.0 / fps
+        self._stats = VideoStats()
+        self._ready: list[int] = []  # frames converted and not shown, in order
+        self._slots: dict[int, int] = {}  # buffer of the ready and shown frames
+        self._shown = -1  # frame on screen
+        self._first = 0  # frame due at play()
+        self._play_start: float | None = None
+        self._last_select: float | None = None
+        self._paint_period = 0.0  # average seconds between paints, 0 if unknown
+        self._decode_start = 0.0
+        self._decode_time = 0.0  # average seconds to decode and convert a frame
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def set_fps(self, fps: float) -> None:
+        """Sets the frame rate, read from the video by the decoder."""
+        with self._condition:
+            self.fps = fps
+            self._frame_dt = 1.0 / fps
+
+    def allocate(self, height: int, width: int) -> np.ndarray:
+        """Allocates the buffers for frames of the given size.
+
+        Args:
+            height (int): Frame height in pixels.
+            width (int): Frame width in pixels.
+
+        Returns:
+            np.ndarray: The buffers.
+        """
+        self.buffers = np.zeros((self.capacity, height, width, 4), dtype=np.uint8)
+        return self.buffers
+
+    def slot(self, n: int) -> int:
+        """Index of the buffer of frame n, which takes a free one the first time.
+
+        Args:
+            n (int): Frame number.
+
+        Returns:
+            int: The index in buffers.
+        """
+        with self._condition:
+            if n not in self._slots:
+                free = set(range(self.capacity)) - set(self._slots.values())
+                assert free, "no free buffer, call wait_writable first"
+                self._slots[n] = min(free)
+            return self._slots[n]
+
+    def buffer(self, n: int) -> np.ndarray:
+        """The buffer where frame n is written.
+
+        Args:
+            n (int): Frame number.
+
+        Returns:
+            np.ndarray: (height, width, 4) view of the buffer.
+        """
+        assert self.buffers is not None
+        return self.buffers[self.slot(n)]
+
+    def play(self, now: float | None = None) -> None:
+        """Starts the playback clock. When called again it resumes from the
+        frame after the one on screen.
+
+        Args:
+            now (float | None): Monotonic time, now if None.
+        """
+        with self._condition:
+            self._play_start = time.monotonic() if now is None else now
+            self._first = self._shown + 1
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Wakes up the decoder, which stops waiting."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def due(self, n: int) -> float | None:
+        """Monotonic time when frame n must be shown, None before play()."""
+        if self._play_start is None:
+            return None
+        return self._play_start + (n - self._first) * self._frame_dt
+
+    def wait_writable(self, n: int, timeout: float = 0.05) -> bool:
+        """Waits until frame n can be decoded.
+
+        Args:
+            n (int): Frame number.
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            bool: True if frame n can be decoded now, False after the timeout
+                or if the ring is closed.
+        """
+        end = time.monotonic() + timeout
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                wait = end - now
+                if len(self._slots) < self.capacity:
+                    due = self.due(n)
+                    if due is None:
+                        self._decode_start = now
+                        return True
+                    ahead = due - now - (self.capacity - 1) * self._frame_dt
+                    if ahead <= 0:
+                        self._decode_start = now
+                        return True
+                    wait = min(wait, ahead)
+                if wait <= 0:
+                    return False
+                self._condition.wait(wait)
+            return False
+
+    def late(self, n: int, now: float | None = None) -> bool:
+        """Whether frame n will not be shown, because frame n + 1 will be due
+        and decoded before the next paint.
+
+        The next paint is estimated from the average time between select()
+        calls. Until it is known a frame is late when the next one is due.
+
+        Args:
+            n (int): Frame number.
+            now (float | None): Monotonic time, now if None.
+
+        Returns:
+            bool: True if the frame can be skipped.
+        """
+        with self._condition:
+            due = self.due(n + 1)
+            if due is None:
+                return False
+            now = time.monotonic() if now is None else now
+            if self._last_select is None or self._paint_period <= 0:
+                return now >= due
+            paints = max(1, int((now - self._last_select) / self._paint_period) + 1)
+            next_paint = self._last_select + paints * self._paint_period
+            return due <= next_paint and now + self._decode_time <= next_paint
+
+    def skip(self, n: int) -> None:
+        """Records that frame n was decoded but not converted."""
+        with self._condition:
+            self._stats.decoded += 1
+            self._stats.dropped += 1
+            self._decoded()
+
+    def publish(self, n: int) -> None:
+        """Records that frame n is converted in its buffer."""
+        with self._condition:
+            self._stats.decoded += 1
+            self._stats.converted += 1
+            self.slot(n)
+            self._ready.append(n)
+            self._decoded()
+
+    def _decoded(self) -> None:
+        if self._decode_start > 0:
+            elapsed = time.monotonic() - self._decode_start
+            self._decode_time += 0.2 * (elapsed - self._decode_time)
+            self._decode_start = 0.0
+
+    def select(self, now: float | None = None) -> int | None:
+        """Chooses the frame to show.
+
+        Args:
+            now (float | None): Monotonic time, now if None.
+
+        Returns:
+            int | None: The frame number, whose buffer is buffer(n), or None if
+                no frame has been shown yet.
+        """
+        with self._condition:
+            if self._play_start is None:
+                return None
+            now = time.monotonic() if now is None else now
+            if self._last_select is not None and now - self._last_select < 0.1:
+                period = now - self._last_select
+                if self._paint_period <= 0:
+                    self._paint_period = period
+                self._paint_period += 0.2 * (period - self._paint_period)
+            self._last_select = now
+            target = self._first + int((now - self._play_start) / self._frame_dt)
+            position = 0
+            while position < len(self._ready) and self._ready[position] <= target:
+                position += 1
+            if position > 0:
+                self._stats.shown += 1
+                self._stats.dropped += position - 1
+                for frame in [self._shown] + self._ready[: position - 1]:
+                    self._slots.pop(frame, None)
+                self._shown = self._ready[position - 1]
+                del self._ready[:position]
+                self._condition.notify_all()
+            newest = self._ready[-1] if self._ready else self._shown
+            self._stats.margin = (newest - target) * self._frame_dt
+            return self._shown if self._shown >= 0 else None
+
+    def stats(self) -> VideoStats:
+        """A copy of the counters."""
+        with self._condition:
+            return VideoStats(**vars(self._stats))
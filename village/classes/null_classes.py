@@ -368,6 +368,7 @@ class NullScreen(QWidget):
     width_px: int = 0
     height_px: int = 0
     height_mm: int = 0
+    image_cache_size: int = 16
 
     def start_drawing(self) -> None:
         """Starts the drawing mode."""
@@ -416,6 +417,73 @@ class NullScreen(QWidget):
         """
         return None
 
+    def get_video_stats(self) -> None:
+        """Gets the frame counters of the current video.
+
+        Returns:
+            None: There is no video.
+        """
+        return None
+
+    def preload_images(self, *files: str) -> None:
+        """Preloads images.
+
+        Args:
+            *files (str): The file paths.
+        """
+        return
+
+    def clear_image_cache(self) -> None:
+        """Forgets the preloaded images."""
+        return
+
+    def draw_image_texture(
+        self,
+        file: str,
+        x: int = 0,
+        y: int = 0,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> None:
+        """Draws an image as a texture.
+
+        Args:
+            file (str): The file path.
+            x (int): Left position.
+            y (int): Top position.
+            width (Optional[int]): Width.
+            height (Optional[int]): Height.
+        """
+        return
+
+    def draw_video_texture(
+        self,
+        x: int = 0,
+        y: int = 0,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> bool:
+        """Draws the current video frame as a texture.
+
+        Args:
+            x (int): Left position.
+            y (int): Top position.
+            width (Optional[int]): Width.
+            height (Optional[int]): Height.
+
+        Returns:
+            bool: False, there is no video.
+        """
+        return False
+
+    def get_frame_timing(self) -> dict[str, float]:
+        """Gets the timing of the buffer swaps.
+
+        Returns:
+            dict[str, float]: Empty timing.
+        """
+        return {"swaps": 0, "mean": 0.0, "max": 0.0, "late": 0}
+
 
 class NullTouch:
     error: str = ""
@@ -0,0 +1,335 @@
+import datetime
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from village.classes.enums import Active
+from village.classes.subject_store import SubjectStore, order_columns
+from village.settings import settings
+
+
+class SessionStore:
+    """Columnar (Parquet) store of all the sessions of a subject.
+
+    The sessions live in one Parquet dataset per subject, in the ``parquet``
+    directory of the subject. ``data.parquet`` holds the consolidated
+    sessions, one row group per session, with the columns of all of them.
+    A new session is written to its own small file ``session=<n>.parquet``
+    in ``recent``, and every consolidate_every sessions the recent files are
+    merged into ``data.parquet``. A small ``_index.json`` records, for every
+    session, its date, tasks, columns, file and row group, so queries only
+    read the row groups and columns they need. The full history is read in
+    one pass over a single file, which is faster than parsing the CSV. The
+    CSV files remain the export format.
+
+    Attributes:
+        directory (Path): The ``parquet`` directory of the subject.
+        index_path (Path): Path to the JSON index.
+        data_path (Path): Path to the consolidated file.
+        consolidate_every (int): Number of recent files that triggers a
+            consolidation.
+    """
+
+    consolidate_every = 20
+
+    def __init__(self, subject_directory: str | Path) -> None:
+        self.directory = Path(subject_directory, "parquet")
+        self.index_path = self.directory / "_index.json"
+        self.data_path = self.directory / "data.parquet"
+        self._index: list[dict] | None = None
+
+    @property
+    def index(self) -> list[dict]:
+        """One entry per stored session, ordered by session number."""
+        if self._index is None:
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            else:
+                self._index = []
+        return self._index
+
+    def _save_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def last_session(self) -> int:
+        """The number of the last session stored, 0 if empty."""
+        return int(self.index[-1]["session"]) if self.index else 0
+
+    @staticmethod
+    def _to_table(df: pd.DataFrame) -> pa.Table:
+        """Converts a session to Arrow, storing object columns like the CSV does:
+        numeric if every value is numeric, otherwise as strings."""
+        df = df.copy()
+        for col in df.columns:
+            if not pd.api.types.is_object_dtype(df[col]):
+                continue
+            numeric = pd.to_numeric(df[col], errors="coerce")
+            if numeric.notna().sum() == df[col].notna().sum():
+                df[col] = numeric
+            else:
+                df[col] = df[col].map(lambda x: None if x is None else str(x))
+                df[col] = df[col].where(df[col] != "nan", None)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    @staticmethod
+    def _entry(session_df: pd.DataFrame, table: pa.Table) -> dict:
+        date = str(session_df["date"].iloc[0]) if "date" in session_df else ""
+        tasks = (
+            sorted(session_df["task"].dropna().astype(str).unique().tolist())
+            if "task" in session_df
+            else []
+        )
+        return {
+            "session": int(session_df["session"].iloc[0]),
+            "date": date,
+            "tasks": tasks,
+            "columns": table.column_names,
+        }
+
+    def append_session(self, session_df: pd.DataFrame) -> list[Path]:
+        """Stores one session. session_df must already have a session column.
+
+        Args:
+            session_df (pd.DataFrame): The trials of the session.
+
+        Returns:
+            list[Path]: The files written.
+        """
+        table = self._to_table(session_df)
+        entry = self._entry(session_df, table)
+        entry["file"] = "recent/session=" + str(entry["session"]) + ".parquet"
+        entry["row_group"] = None
+        (self.directory / "recent").mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, self.directory / entry["file"])
+
+        self.index[:] = [e for e in self.index if e["session"] != entry["session"]]
+        self.index.append(entry)
+        self.index.sort(key=lambda e: e["session"])
+        self._save_index()
+        recent = [e for e in self.index if e["row_group"] is None]
+        if len(recent) >= self.consolidate_every:
+            return self.consolidate()
+        return [self.directory / entry["file"], self.index_path]
+
+    def consolidate(self) -> list[Path]:
+        """Merges the recent files into the consolidated file.
+
+        Returns:
+            list[Path]: The files written.
+        """
+        if all(entry["row_group"] is not None for entry in self.index):
+            return []
+        return self._write_sessions(self._read(self.index, None, split=True))
+
+    def _write_sessions(self, sessions: list[tuple[dict, pa.Table]]) -> list[Path]:
+        """Writes the consolidated file with one row group per session and
+        replaces the index and the recent files. Returns the files written."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = []
+        if sessions:
+            # sessions can have different columns or types, arrow fills the
+            # missing columns with nulls and promotes the types
+            schema = pa.unify_schemas(
+                [table.schema for _, table in sessions], promote_options="permissive"
+            )
+            tmp_path = self.data_path.with_suffix(".tmp")
+            with pq.ParquetWriter(tmp_path, schema) as writer:
+                for row_group, (entry, table) in enumerate(sessions):
+                    columns = [
+                        (
+                            table.column(field.name).cast(field.type)
+                            if field.name in table.column_names
+                            else pa.nulls(table.num_rows, field.type)
+                        )
+                        for field in schema
+                    ]
+                    writer.write_table(
+                        pa.Table.from_arrays(columns, schema=schema),
+                        row_group_size=max(table.num_rows, 1),
+                    )
+                    index.append(
+                        dict(entry, file=self.data_path.name, row_group=row_group)
+                    )
+            os.replace(tmp_path, self.data_path)
+        elif self.data_path.exists():
+            self.data_path.unlink()
+        self._index = index
+        self._save_index()
+        if (self.directory / "recent").exists():
+            shutil.rmtree(self.directory / "recent")
+        return [self.data_path, self.index_path] if sessions else [self.index_path]
+
+    def rebuild(self, df: pd.DataFrame) -> list[Path]:
+        """Replaces the whole store with the sessions in df.
+
+        Args:
+            df (pd.DataFrame): The full history of the subject.
+
+        Returns:
+            list[Path]: The files written.
+        """
+        sessions = []
+        if "session" in df and not df.empty:
+            for _, session_df in df.groupby("session", sort=True):
+                session_df = session_df.dropna(axis=1, how="all")
+                session_df = session_df.reset_index(drop=True)
+                table = self._to_table(session_df)
+                sessions.append((self._entry(session_df, table), table))
+        return self._write_sessions(sessions)
+
+    def update_from(self, store: SubjectStore, session_df: pd.DataFrame) -> list[Path]:
+        """Adds the last session appended to the CSV store. If sessions are
+        missing (first use, or the CSV was rebuilt) the whole history is
+        imported again from the CSV store.
+
+        Args:
+            store (SubjectStore): The CSV store of the subject.
+            session_df (pd.DataFrame): The session just appended to it.
+
+        Returns:
+            list[Path]: The files written.
+        """
+        if self.last_session == store.last_session - 1:
+            return self.append_session(session_df)
+        return self.rebuild(store.read())
+
+    def query(
+        self,
+        start: datetime.date | str | None = None,
+        end: datetime.date | str | None = None,
+        tasks: list[str] | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """Reads trials of the subject.
+
+        Args:
+            start (date | str | None): Only sessions on or after this date.
+            end (date | str | None): Only sessions on or before this date. A
+                date without time includes the whole day.
+            tasks (list[str] | None): Only sessions that ran one of these tasks.
+            columns (list[str] | None): Only these columns (all if None).
+
+        Returns:
+            pd.DataFrame: The selected trials, ordered by session.
+        """
+        entries = self.index
+        if start is not None or end is not None:
+            dates = pd.to_datetime(
+                pd.Series([entry["date"] for entry in entries], dtype=object),
+                errors="coerce",
+                format="mixed",
+            )
+            mask = dates.notna()
+            if start is not None:
+                mask &= dates >= pd.Timestamp(start)
+            if end is not None:
+                if _has_time(end):
+                    mask &= dates <= pd.Timestamp(end)
+                else:
+                    mask &= dates < pd.Timestamp(end) + pd.Timedelta(days=1)
+            entries = [entry for entry, keep in zip(entries, mask) if keep]
+        if tasks is not None:
+            entries = [entry for entry in entries if set(tasks) & set(entry["tasks"])]
+        if columns is not None:
+            entries = [
+                entry for entry in entries if set(columns) & set(entry["columns"])
+            ]
+
+        tables = [table for _, table in self._read(entries, columns)]
+        if not tables:
+            return pd.DataFrame(columns=columns or [])
+        df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+        if tasks is not None and "task" in df:
+            df = df[df["task"].isin(tasks)].reset_index(drop=True)
+        if columns is not None:
+            return df.reindex(columns=columns)
+        return df[order_columns(list(df.columns))]
+
+    def _read(
+        self, entries: list[dict], columns: list[str] | None, split: bool = False
+    ) -> list[tuple[dict, pa.Table]]:
+        """Reads the sessions of the entries, in order, with the row groups of
+        the consolidated file read together. Unless split, they are returned
+        as one table, with the entry of the first session."""
+        consolidated = [entry for entry in entries if entry["row_group"] is not None]
+        sessions = []
+        if consolidated:
+            data = pq.ParquetFile(self.data_path)
+            read_columns = (
+                None
+                if columns is None
+                else [col for col in columns if col in data.schema_arrow.names]
+            )
+            groups = [entry["row_group"] for entry in consolidated]
+            if groups == list(range(data.num_row_groups)):
+                table = data.read(read_columns)
+            else:
+                table = data.read_row_groups(groups, read_columns)
+            if not split:
+                sessions.append((consolidated[0], table))
+            else:
+                offset = 0
+                for entry in consolidated:
+                    rows = data.metadata.row_group(entry["row_group"]).num_rows
+                    sessions.append((entry, table.slice(offset, rows)))
+                    offset += rows
+        for entry in entries:
+            if entry["row_group"] is None:
+                path = self.directory / entry["file"]
+                read_columns = (
+                    None
+                    if columns is None
+                    else [col for col in columns if col in entry["columns"]]
+                )
+                sessions.append((entry, pq.read_table(path, columns=read_columns)))
+        sessions.sort(key=lambda session: session[0]["session"])
+        return sessions
+
+    def export_csv(self, path: str | Path) -> None:
+        """Writes the whole store as a flat CSV file.
+
+        Args:
+            path (str | Path): Destination of the CSV.
+        """
+        self.query().to_csv(path, header=True, index=False, sep=";")
+
+
+def _has_time(value: datetime.date | str) -> bool:
+    """Whether a date bound has a time part."""
+    if isinstance(value, str):
+        return ":" in value
+    return isinstance(value, datetime.datetime)
+
+
+def read_subject_history(subject_path: str | Path) -> pd.DataFrame:
+    """Reads the full history of a subject.
+
+    Uses the columnar store when COLUMNAR_STORE is ON and it is up to date with
+    the CSV store, otherwise reads the CSV files.
+
+    Args:
+        subject_path (str | Path): Path to the subject's ``<subject>.csv``.
+
+    Returns:
+        pd.DataFrame: All the trials of the subject.
+    """
+    store = SubjectStore(subject_path)
+    if settings.get("COLUMNAR_STORE") == Active.ON:
+        columnar = SessionStore(Path(subject_path).parent)
+        if len(columnar) and columnar.last_session == store.last_session:
+            return columnar.query()
+    return store.read()
@@ -0,0 +1,123 @@
+import math
+import threading
+import warnings
+from typing import Any
+
+import pandas as pd
+
+
+class SessionTable:
+    """Growable columnar table with the trials of the running session.
+
+    Every column is a Python list, so appending a trial costs the same at
+    trial 10 and at trial 10000. Columns that appear in later trials are
+    padded with NaN for the previous ones, like pd.concat does. The version
+    is the number of rows appended, so readers can ask only for the rows
+    added since the last version they saw. append() and the readers can be
+    called from different threads.
+
+    Attributes:
+        version (int): Number of rows appended so far.
+    """
+
+    def __init__(self, df: pd.DataFrame | None = None) -> None:
+        """Creates the table, empty or with the rows of df.
+
+        Args:
+            df (pd.DataFrame | None): Initial rows.
+        """
+        self._columns: dict[str, list] = {}
+        self.version = 0
+        self._df = pd.DataFrame()
+        self._df_version = 0
+        self._lock = threading.Lock()
+        if df is not None and not df.empty:
+            self._columns = {str(col): df[col].tolist() for col in df.columns}
+            self.version = len(df)
+
+    def __len__(self) -> int:
+        return self.version
+
+    @property
+    def columns(self) -> list[str]:
+        """Names of the columns, in order of appearance."""
+        return list(self._columns)
+
+    def append(self, row: dict[str, Any]) -> None:
+        """Appends one row.
+
+        Args:
+            row (dict[str, Any]): Values of the row by column name.
+        """
+        with self._lock:
+            for name, value in row.items():
+                column = self._columns.get(name)
+                if column is None:
+                    column = self._columns[name] = [math.nan] * self.version
+                column.append(value)
+            for name, column in self._columns.items():
+                if len(column) == self.version:
+                    column.append(math.nan)
+            self.version += 1
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """DataFrame with all the rows. It is rebuilt only when rows were
+        appended since the last call, and changes to it do not modify the
+        table."""
+        with self._lock:
+            version = self.version
+            if self._df_version != version:
+                data = self._slice(0, version)
+        if self._df_version != version:
+            self._df = self._frame(data, 0, version)
+            self._df_version = version
+        return self._df.copy(deep=False)
+
+    def rows_since(self, version: int) -> pd.DataFrame:
+        """Rows appended after the given version, indexed by their row number.
+
+        Args:
+            version (int): A previous value of version, 0 for all the rows.
+
+        Returns:
+            pd.DataFrame: The new rows, empty if there are none.
+        """
+        with self._lock:
+            last = self.version
+            data = self._slice(version, last)
+        return self._frame(data, version, last)
+
+    def _slice(self, first: int, last: int) -> dict[str, list]:
+        # the lists are copied under the lock, the DataFrame is built outside
+        return {name: column[first:last] for name, column in self._columns.items()}
+
+    @staticmethod
+    def _frame(data: dict[str, list], first: int, last: int) -> pd.DataFrame:
+        if last <= first:
+            return pd.DataFrame(columns=list(data))
+        return pd.DataFrame(data, index=pd.RangeIndex(first, last))
+
+
+class SessionFrame(pd.DataFrame):
+    """DataFrame returned by TaskBase.session_df.
+
+    It is a copy of the session table, so assigning a column to it does not
+    change the session. Doing so warns. A DataFrame derived from it, like
+    copy(), is a plain DataFrame that can be modified and assigned back with
+    ``self.session_df = df``.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        warnings.warn(
+            "session_df is a copy of the session, changes to it are lost. "
+            "Modify session_df.copy() and assign it back with "
+            "self.session_df = df.",
+            UserWarning,
+            stacklevel=2,
+        )
+        super().__setitem__(key, value)
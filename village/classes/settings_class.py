@@ -69,7 +69,12 @@ class Settings:
     """Manages system settings, including storage, retrieval, and grouping.
 
     Settings are grouped by category (main, sound, screen, etc.) and backed by
-    QSettings for persistent storage.
+    QSettings for persistent storage. Typed values are cached after the first
+    read, and the cache is invalidated whenever settings are written or synced.
+
+    Attributes:
+        cache_hits (int): Number of get() calls answered from the cache.
+        cache_misses (int): Number of get() calls that read QSettings.
     """
 
     def __init__(
@@ -155,37 +160,59 @@ class Settings:
             + hidden_settings
         )
 
+        self.settings_by_key: dict[str, Setting] = {s.key: s for s in self.all_settings}
+        self._cache: dict[str, Any] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
         self.check_settings()
+        self.populate_cache()
+
+    def populate_cache(self) -> None:
+        """Read every setting once so later lookups are served from the cache."""
+        self._cache.clear()
+        for s in self.all_settings:
+            self._cache[s.key] = self._read(s)
+
+    def invalidate_cache(self) -> None:
+        """Drop all cached values; they are read again from QSettings on demand."""
+        self._cache.clear()
 
     def restore_factory_settings(self) -> None:
         """Reset all restorable settings to their factory default values."""
         for s in self.restorable_settings:
             self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
         for s in self.all_settings:
             old_value = self.get(s.key)
             if old_value is None:
                 self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
 
     def restore_visual_settings(self) -> None:
         """Reset visual settings to their factory default values."""
         for s in self.visual_settings:
             self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
 
     def restore_directory_settings(self) -> None:
         """Reset directory settings to their factory default values."""
         for s in self.directory_settings:
             self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
 
     def restore_all_settings(self) -> None:
         """Initialize all settings with their factory defaults in QSettings."""
         for s in self.all_settings:
             self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
 
     def add_new_settings(self) -> None:
         """Add any missing settings to QSettings with their default values."""
         for s in self.all_settings:
             if s.key not in self.saved_settings.allKeys():
                 self.saved_settings.setValue(s.key, s.value)
+        self.invalidate_cache()
 
     def check_settings(self) -> None:
         """Ensure all required settings exist in storage.
@@ -208,9 +235,22 @@ class Settings:
             Any: The value of the setting converted to its appropriate type,
             or None if the setting or value is invalid.
         """
-        setting = next((s for s in self.all_settings if s.key == key), None)
-        if setting is None:
-            return None
+        try:
+            value = self._cache[key]
+            self.cache_hits += 1
+        except KeyError:
+            setting = self.settings_by_key.get(key)
+            if setting is None:
+                return None
+            self.cache_misses += 1
+            value = self._read(setting)
+            self._cache[key] = value
+        # lists are copied so callers cannot modify the cached value
+        return list(value) if isinstance(value, list) else value
+
+    def _read(self, setting: Setting) -> Any:
+        """Read a setting from QSettings and convert it to its declared type."""
+        key = setting.key
         type = setting.value_type
 
         val = self.saved_settings.value(key)
@@ -281,10 +321,11 @@ class Settings:
 
     def get_values(self, key: str) -> list:
         """Get the possible values of a setting when it is a enum or list of enums"""
-        base_type = next((s.base_type for s in self.all_settings if s.key == key), None)
-        element_type = next(
-            (s.element_type for s in self.all_settings if s.key == key), None
-        )
+        setting = self.settings_by_key.get(key)
+        if setting is None:
+            return []
+        base_type = setting.base_type
+        element_type = setting.element_type
         if base_type is None:
             return []
         elif issubclass(base_type, SuperEnum):
@@ -298,7 +339,8 @@ class Settings:
 
     def get_index(self, key: str) -> int:
         """Get the index of the value of a setting when it is a enum or list of enums"""
-        base_type = next((s.base_type for s in self.all_settings if s.key == key), None)
+        setting = self.settings_by_key.get(key)
+        base_type = setting.base_type if setting is not None else None
         if base_type is None:
             return 0
         elif issubclass(base_type, SuperEnum):
@@ -308,9 +350,8 @@ class Settings:
 
     def get_indices(self, key: str) -> list[int]:
         """Get the index of the value of a setting when it is a enum or list of enums"""
-        element_type = next(
-            (s.element_type for s in self.all_settings if s.key == key), None
-        )
+        setting = self.settings_by_key.get(key)
+        element_type = setting.element_type if setting is not None else None
         if element_type is None:
             return []
         elif issubclass(element_type, SuperEnum):
@@ -321,19 +362,23 @@ class Settings:
 
     def get_description(self, key: str) -> str:
         """Get the description of a setting."""
-        return next((s.description for s in self.all_settings if s.key == key), "")
+        setting = self.settings_by_key.get(key)
+        return setting.description if setting is not None else ""
 
     def get_type(self, key: str) -> type | None:
         """Get the type of a setting."""
-        return next((s.value_type for s in self.all_settings if s.key == key), None)
+        setting = self.settings_by_key.get(key)
+        return setting.value_type if setting is not None else None
 
     def set(self, key: str, value: Any) -> None:
         self.saved_settings.setValue(key, value)
+        self._cache.pop(key, None)
 
     def sync(self) -> None:
         # force to save the settings in disk,
         # only necessary when the application is not closed but reloaded
         self.saved_settings.sync()
+        self.invalidate_cache()
 
     def print(self) -> None:
         for s in self.all_settings:
@@ -0,0 +1,338 @@
+import io
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from village.scripts.log import log
+
+PRIORITY_COLUMNS = [
+    "session",
+    "date",
+    "trial",
+    "subject",
+    "task",
+    "system_name",
+    "run_mode",
+]
+
+
+def order_columns(columns: list[str]) -> list[str]:
+    """Returns the columns with the priority columns first."""
+    priority = [col for col in PRIORITY_COLUMNS if col in columns]
+    return priority + [col for col in columns if col not in PRIORITY_COLUMNS]
+
+
+class SubjectStore:
+    """Append-only store of all the trials of a subject.
+
+    The data lives in the flat ``<subject>.csv`` file. New sessions are
+    appended to it without rewriting the file as long as their columns are
+    already in its header. When a session brings new columns, its rows are
+    appended to a new segment file (``<subject>.part<N>.csv``) with the
+    extended header instead. The list of segments with their columns and the
+    last session number are kept in a ``<subject>.schema.json`` sidecar.
+    read() joins all the segments, and compact() rebuilds the flat file
+    from them.
+
+    The sidecar also records the size in bytes of every segment. Before the
+    rows of a session are written, the sidecar marks the segment as pending
+    with its size, and it is saved again with the new size and session
+    number when the rows are on disk. Rows left by a session that crashed in
+    between are cut off the next time the store is opened, so the sidecar
+    always describes the segments exactly. Segments whose file was deleted
+    are dropped from the sidecar, with an error in the log.
+
+    history() keeps the last histories read in memory, shared by all the
+    stores of the process, and adds the rows of every appended session to
+    them, so saving a session does not read the whole history again.
+
+    Attributes:
+        path (Path): Path to the flat ``<subject>.csv`` file.
+        schema_path (Path): Path to the JSON sidecar.
+        history_cache_size (int): Number of subjects whose history is kept in
+            memory.
+    """
+
+    history_cache_size = 4
+    # path -> (sizes of the segments read, history)
+    _histories: OrderedDict[Path, tuple[list[int], pd.DataFrame]] = OrderedDict()
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.schema_path = self.path.with_suffix(".schema.json")
+        self._schema: dict | None = None
+
+    @property
+    def schema(self) -> dict:
+        """The sidecar contents, rebuilt from the flat file if missing."""
+        if self._schema is None:
+            self._schema = self._load_schema()
+        return self._schema
+
+    def _load_schema(self) -> dict:
+        if self.schema_path.exists():
+            with open(self.schema_path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+            self._recover(schema)
+            return schema
+        if not self.path.exists():
+            return {"segments": [], "last_session": 0}
+        # legacy subject file without sidecar: only the header and the
+        # session column are needed
+        columns = list(pd.read_csv(self.path, sep=";", nrows=0).columns)
+        last_session = 0
+        if "session" in columns:
+            sessions = pd.read_csv(self.path, sep=";", usecols=["session"])
+            if not sessions.empty:
+                last_session = int(sessions["session"].max())
+        schema = {
+            "segments": [
+                {
+                    "file": self.path.name,
+                    "columns": columns,
+                    "size": self.path.stat().st_size,
+                }
+            ],
+            "last_session": last_session,
+        }
+        self._save_schema(schema)
+        return schema
+
+    def _recover(self, schema: dict) -> None:
+        changed = False
+        pending = schema.pop("pending", None)
+        if pending is not None:
+            # a session crashed while its rows were being written
+            pending_path = self.path.parent / pending["file"]
+            try:
+                if pending["size"] == 0:
+                    pending_path.unlink(missing_ok=True)
+                elif pending_path.stat().st_size > pending["size"]:
+                    with open(pending_path, "r+b") as f:
+                        f.truncate(pending["size"])
+            except FileNotFoundError:
+                pass
+            changed = True
+        segments = []
+        for segment in schema["segments"]:
+            try:
+                size = (self.path.parent / segment["file"]).stat().st_size
+            except FileNotFoundError:
+                log.error(
+                    "File "
+                    + segment["file"]
+                    + " not found, its sessions are not in the history",
+                    subject=self.path.stem,
+                )
+                changed = True
+                continue
+            # sidecar written before the sizes were recorded, or a file edited
+            # by hand
+            if segment.get("size") != size:
+                segment["size"] = size
+                changed = True
+            segments.append(segment)
+        schema["segments"] = segments
+        if not segments:
+            # all the files were removed, the subject starts again
+            schema["last_session"] = 0
+        if changed:
+            self._save_schema(schema)
+
+    def _save_schema(self, schema: dict) -> None:
+        tmp_path = self.schema_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.schema_path)
+        self._schema = schema
+
+    @property
+    def last_session(self) -> int:
+        """The number of the last session stored."""
+        return int(self.schema["last_session"])
+
+    @property
+    def columns(self) -> list[str]:
+        """All the columns in the store, in order of appearance."""
+        columns: list[str] = []
+        for segment in self.schema["segments"]:
+            columns += [col for col in segment["columns"] if col not in columns]
+        return order_columns(columns)
+
+    @property
+    def files(self) -> list[Path]:
+        """The sidecar and all the segment files."""
+        return [self.schema_path] + [
+            self.path.parent / segment["file"] for segment in self.schema["segments"]
+        ]
+
+    def append_session(self, session_df: pd.DataFrame) -> int:
+        """Appends the trials of a new session.
+
+        Args:
+            session_df (pd.DataFrame): The session trials. A ``session`` column
+                with the new session number is added to it.
+
+        Returns:
+            int: The number assigned to the session.
+        """
+        schema = self.schema
+        session = self.last_session + 1
+        session_df["session"] = [session] * session_df.shape[0]
+        cached = self._cached_history()
+
+        segments = schema["segments"]
+        last = segments[-1] if segments else None
+        if last is not None and set(session_df.columns) <= set(last["columns"]):
+            columns = last["columns"]
+            text = session_df.reindex(columns=columns).to_csv(
+                header=False, index=False, sep=";"
+            )
+            segment = last
+        else:
+            if last is None:
+                filename = self.path.name
+                columns = order_columns(list(session_df.columns))
+            else:
+                filename = self._new_segment_filename()
+                columns = last["columns"] + [
+                    col for col in session_df.columns if col not in last["columns"]
+                ]
+            text = session_df.reindex(columns=columns).to_csv(
+                header=True, index=False, sep=";"
+            )
+            segment = {"file": filename, "columns": columns, "size": 0}
+        new_segment = segment is not last
+
+        schema["pending"] = {"file": segment["file"], "size": segment["size"]}
+        self._save_schema(schema)
+        segment_path = self.path.parent / segment["file"]
+        with open(
+            segment_path, "w" if new_segment else "a", encoding="utf-8", newline=""
+        ) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        segment["size"] = segment_path.stat().st_size
+        if new_segment:
+            segments.append(segment)
+        del schema["pending"]
+        schema["last_session"] = session
+        self._save_schema(schema)
+
+        if cached is not None:
+            # the rows are parsed back from the CSV text, so they have the
+            # same types as when the history is read from the files
+            if not new_segment:
+                text = ";".join(columns) + "\n" + text
+            rows = pd.read_csv(io.StringIO(text), sep=";", low_memory=False)
+            history = pd.concat([cached, rows], ignore_index=True)
+            self._cache_history(history[order_columns(list(history.columns))])
+        return session
+
+    def _new_segment_filename(self) -> str:
+        # a segment dropped from the sidecar leaves a gap in the numbers
+        used = {segment["file"] for segment in self.schema["segments"]}
+        number = len(used)
+        while True:
+            filename = self.path.stem + ".part" + str(number) + ".csv"
+            if filename not in used and not (self.path.parent / filename).exists():
+                return filename
+            number += 1
+
+    def read(self) -> pd.DataFrame:
+        """Reads the whole history of the subject.
+
+        Returns:
+            pd.DataFrame: All the trials, with the priority columns first.
+        """
+        dfs = [
+            pd.read_csv(self.path.parent / segment["file"], sep=";", low_memory=False)
+            for segment in self.schema["segments"]
+        ]
+        if not dfs:
+            return pd.DataFrame()
+        if len(dfs) == 1:
+            df = dfs[0]
+        else:
+            df = pd.concat(dfs, ignore_index=True)
+        return df[order_columns(list(df.columns))]
+
+    def history(self) -> pd.DataFrame:
+        """Like read(), but the history is read from the files only the first
+        time. Later calls, from any store of the same subject, return a copy of
+        the history kept in memory.
+
+        Returns:
+            pd.DataFrame: All the trials, with the priority columns first.
+        """
+        cached = self._cached_history()
+        if cached is None:
+            cached = self.read()
+            self._cache_history(cached)
+        return cached.copy()
+
+    def _segment_sizes(self) -> list[int]:
+        return [segment["size"] for segment in self.schema["segments"]]
+
+    def _cached_history(self) -> pd.DataFrame | None:
+        cached = SubjectStore._histories.get(self.path)
+        if cached is None:
+            return None
+        sizes, history = cached
+        if sizes != self._segment_sizes():
+            # the files were changed by another process
+            del SubjectStore._histories[self.path]
+            return None
+        SubjectStore._histories.move_to_end(self.path)
+        return history
+
+    def _cache_history(self, history: pd.DataFrame) -> None:
+        SubjectStore._histories[self.path] = (self._segment_sizes(), history)
+        SubjectStore._histories.move_to_end(self.path)
+        while len(SubjectStore._histories) > self.history_cache_size:
+            SubjectStore._histories.popitem(last=False)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Replaces the store with a single flat file containing df.
+
+        Args:
+            df (pd.DataFrame): The full history of the subject.
+        """
+        old_segments = [
+            segment
+            for segment in self.schema["segments"]
+            if segment["file"] != self.path.name
+        ]
+        df = df[order_columns(list(df.columns))]
+        tmp_path = self.path.with_suffix(".csv.tmp")
+        df.to_csv(tmp_path, header=True, index=False, sep=";")
+        os.replace(tmp_path, self.path)
+        last_session = int(df["session"].max()) if "session" in df and len(df) else 0
+        SubjectStore._histories.pop(self.path, None)
+        self._save_schema(
+            {
+                "segments": [
+                    {
+                        "file": self.path.name,
+                        "columns": list(df.columns),
+                        "size": self.path.stat().st_size,
+                    }
+                ],
+                "last_session": last_session,
+            }
+        )
+        for segment in old_segments:
+            segment_path = self.path.parent / segment["file"]
+            if segment_path.exists():
+                segment_path.unlink()
+
+    def compact(self) -> None:
+        """Rebuilds the flat CSV from all the segments."""
+        if len(self.schema["segments"]) > 1:
+            self.write(self.read())
@@ -0,0 +1,173 @@
+import fnmatch
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from village.classes.enums import Active
+from village.scripts.time_utils import time_utils
+from village.settings import settings
+
+# the same files that the rsync commands exclude
+EXCLUDED = ["*.tmp", "CORRIDOR*", ".git", "rsync_logs", "data_removal_logs"]
+
+
+@dataclass
+class SyncSnapshot:
+    """Files to sync, read from the manifest when a sync starts."""
+
+    files: list[str] | None  # paths relative to DATA_DIRECTORY, None for all
+    lines: int  # lines of the manifest covered by this sync
+    size: int  # bytes of the files when they were recorded
+
+    @property
+    def full(self) -> bool:
+        return self.files is None
+
+
+class SyncManifest:
+    """List of the data files closed since the last successful sync.
+
+    The files are recorded when they are finished (the session files in
+    TaskBase.save_csv, the videos and their csv in Camera.stop_recording), one
+    line "path;size;mtime_ns" per file with the path relative to
+    DATA_DIRECTORY. A sync can then pass only these files to rsync with
+    --files-from, instead of making rsync scan the whole data tree on both
+    ends. The system directory (events, subjects, summaries) is always
+    included. The lines synced successfully are removed from the manifest.
+
+    Files written in other ways are not in the manifest, so a full sync is
+    still done when there is no record of one or the last one is older than
+    full_sync_interval seconds.
+
+    Attributes:
+        full_sync_interval (float): Maximum seconds between full syncs.
+    """
+
+    full_sync_interval = 24 * 3600
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        """The manifest file. It is in rsync_logs, which is not synced."""
+        return Path(settings.get("SYSTEM_DIRECTORY"), "rsync_logs", "manifest.csv")
+
+    @property
+    def full_sync_path(self) -> Path:
+        """File with the timestamp of the last successful full sync."""
+        return self.path.with_name("last_full_sync.txt")
+
+    def add(self, *paths: str | Path) -> None:
+        """Records files that are finished and must be synced.
+
+        Args:
+            *paths (str | Path): The files. Files outside DATA_DIRECTORY or
+                that do not exist are ignored.
+        """
+        if settings.get("INCREMENTAL_SYNC") != Active.ON:
+            return
+        data_directory = Path(settings.get("DATA_DIRECTORY")).resolve()
+        lines = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                relative = Path(path).resolve().relative_to(data_directory)
+            except (OSError, ValueError):
+                continue
+            lines.append(
+                relative.as_posix()
+                + ";"
+                + str(stat.st_size)
+                + ";"
+                + str(stat.st_mtime_ns)
+                + "\n"
+            )
+        if not lines:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def snapshot(self) -> SyncSnapshot:
+        """Reads the files to sync now.
+
+        Returns:
+            SyncSnapshot: The files, or files=None if a full sync is needed.
+        """
+        with self._lock:
+            lines = self._read_lines()
+        data_directory = Path(settings.get("DATA_DIRECTORY"))
+        sizes: dict[str, int] = {}
+        for line in lines:
+            try:
+                relative, size, _ = line.rsplit(";", 2)
+                sizes[relative] = int(size)
+            except ValueError:
+                continue
+        if self._needs_full_sync():
+            return SyncSnapshot(None, len(lines), sum(sizes.values()))
+        files = [
+            relative
+            for relative in sizes
+            if not self.is_excluded(relative)
+            and Path(data_directory, relative).exists()
+        ]
+        size = sum(sizes[relative] for relative in files)
+        try:
+            system = Path(settings.get("SYSTEM_DIRECTORY")).resolve()
+            files.append(system.relative_to(data_directory.resolve()).as_posix())
+        except ValueError:
+            pass
+        return SyncSnapshot(files, len(lines), size)
+
+    def done(self, snapshot: SyncSnapshot) -> None:
+        """Removes the synced files from the manifest, after a successful sync.
+
+        Args:
+            snapshot (SyncSnapshot): The snapshot the sync was made from.
+        """
+        with self._lock:
+            lines = self._read_lines()[snapshot.lines :]
+            tmp_path = self.path.with_suffix(".tmp")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in lines)
+            os.replace(tmp_path, self.path)
+            if snapshot.full:
+                self.full_sync_path.write_text(str(time_utils.now_timestamp()))
+
+    @staticmethod
+    def is_excluded(relative: str) -> bool:
+        """Whether a path matches the rsync exclude patterns.
+
+        Args:
+            relative (str): Path relative to DATA_DIRECTORY.
+
+        Returns:
+            bool: True if rsync would not sync it.
+        """
+        return any(
+            fnmatch.fnmatch(part, pattern)
+            for part in Path(relative).parts
+            for pattern in EXCLUDED
+        )
+
+    def _read_lines(self) -> list[str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def _needs_full_sync(self) -> bool:
+        try:
+            last = float(self.full_sync_path.read_text())
+        except (OSError, ValueError):
+            return True
+        return time_utils.now_timestamp() - last > self.full_sync_interval
+
+
+sync_manifest = SyncManifest()
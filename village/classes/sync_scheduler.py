@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+import traceback
+from typing import Any
+
+from village.scripts.log import log
+
+# rsync --progress line: "  1,234,567  45%  10.52MB/s  0:00:01 (xfr#3, to-chk=12/40)"
+_PROGRESS = re.compile(
+    r"^\s*([\d,]+)\s+(\d+)%\s+\S+\s+\S+"
+    r"(?:\s+\(xfr#(\d+),\s*(?:to|ir)-chk=(\d+)/(\d+)\))?"
+)
+
+
+class SyncProgress:
+    """Progress of a data sync, read from the --progress output of rsync.
+
+    The counters add up over all the runs of the same sync, so they are not
+    reset when a sync is preempted and resumed.
+
+    Attributes:
+        files (int): Files transferred.
+        bytes (int): Bytes transferred, including the current file.
+        fraction (float): Fraction of the files checked by rsync in the current
+            run, 0 if unknown.
+        seconds (float): Time spent syncing.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Sets the counters to zero for a new sync."""
+        self.files = 0
+        self.bytes = 0
+        self.fraction = 0.0
+        self.seconds = 0.0
+        self._done_bytes = 0
+        self._run_files = 0
+        self._started: float | None = None
+
+    def start(self) -> None:
+        """Starts timing a run."""
+        self._run_files = 0
+        self._started = time.monotonic()
+
+    def stop(self) -> None:
+        """Stops timing a run."""
+        if self._started is not None:
+            self.seconds += time.monotonic() - self._started
+            self._started = None
+        self.bytes = self._done_bytes
+
+    def update(self, line: str) -> None:
+        """Reads one line of the rsync output.
+
+        Args:
+            line (str): The line.
+        """
+        match = _PROGRESS.match(line)
+        if match is None:
+            return
+        current = int(match.group(1).replace(",", ""))
+        self.bytes = self._done_bytes + current
+        if match.group(3) is not None:
+            self._done_bytes += current
+            self.bytes = self._done_bytes
+            xfr = int(match.group(3))
+            self.files += xfr - self._run_files
+            self._run_files = xfr
+            remaining, total = int(match.group(4)), int(match.group(5))
+            if total > 0:
+                self.fraction = (total - remaining) / total
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent syncing, including the current run."""
+        if self._started is None:
+            return self.seconds
+        return self.seconds + time.monotonic() - self._started
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second."""
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+    def text(self) -> str:
+        """Short description of the progress."""
+        text = "{} files, {:.1f} MB, {:.2f} MB/s".format(
+            self.files, self.bytes / 1e6, self.throughput / 1e6
+        )
+        if self.fraction:
+            text = "{:.0f}%, ".format(self.fraction * 100) + text
+        return text
+
+
+class SyncScheduler:
+    """Runs the after session work (the data sync) in a background thread.
+
+    The work is requested after every session and starts when the box is idle.
+    When it is not idle anymore (for example when a tag is detected) the sync is
+    preempted by setting the cancel_event of the AfterSessionBase, and it is
+    run again when the box has been idle for resume_delay seconds. rsync only
+    transfers what is still missing, so a preempted sync resumes where it
+    stopped. The state machine calls update() in every iteration and never
+    waits for the sync.
+
+    Attributes:
+        resume_delay (float): Seconds the box has to be idle before resuming a
+            preempted sync.
+        preemptions (int): Times the current sync has been preempted.
+    """
+
+    def __init__(self, resume_delay: float = 10.0) -> None:
+        self.resume_delay = resume_delay
+        self.preemptions = 0
+        self._after_session: Any = None
+        self._pending = False
+        self._requests = 0
+        self._preempting = False
+        self._delay = 0.0
+        self._idle_since: float | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """True while the sync thread is running."""
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    @property
+    def pending(self) -> bool:
+        """True if there is a sync requested or preempted that has not finished."""
+        return self._pending
+
+    @property
+    def progress(self) -> SyncProgress | None:
+        """Progress of the current sync, if the AfterSessionBase reports it."""
+        return getattr(self._after_session, "progress", None)
+
+    def request(self, after_session: Any) -> None:
+        """Asks for the work of after_session to be run when the box is idle.
+
+        Args:
+            after_session (AfterSessionBase): The work to run.
+        """
+        with self._lock:
+            if not self._pending or after_session is not self._after_session:
+                self.preemptions = 0
+                progress = getattr(after_session, "progress", None)
+                if progress is not None and not self.running:
+                    progress.reset()
+            self._after_session = after_session
+            self._pending = True
+            self._requests += 1
+            self._delay = 0.0
+
+    def update(self, idle: bool) -> None:
+        """Starts, preempts or resumes the sync. Called by the state machine.
+
+        Args:
+            idle (bool): Whether the box is idle and the sync can run.
+        """
+        now = time.monotonic()
+        if not idle:
+            self._idle_since = None
+            self.preempt()
+            return
+        if self._idle_since is None:
+            self._idle_since = now
+        with self._lock:
+            if (
+                self._pending
+                and not self.running
+                and now - self._idle_since >= self._delay
+            ):
+                # cleared here and not in the thread, so a preempt() that comes
+                # before the thread starts is not lost
+                self._after_session.cancel_event.clear()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._after_session, self._requests),
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def preempt(self) -> None:
+        """Stops the running sync, which is resumed when the box is idle."""
+        with self._lock:
+            if not self.running or self._preempting:
+                return
+            self._preempting = True
+            self.preemptions += 1
+            self._after_session.cancel_event.set()
+        log.info("Sync paused, it will resume when the box is idle")
+
+    def cancel(self) -> None:
+        """Stops the running sync and forgets the pending one."""
+        with self._lock:
+            self._pending = False
+            if self.running:
+                self._after_session.cancel_event.set()
+
+    def _run(self, after_session: Any, requests: int) -> None:
+        progress = getattr(after_session, "progress", None)
+        if progress is not None:
+            progress.start()
+        try:
+            after_session.run()
+        except Exception:
+            log.error("Error in the data sync", exception=traceback.format_exc())
+        finally:
+            if progress is not None:
+                progress.stop()
+            with self._lock:
+                if self._preempting:
+                    self._preempting = False
+                    self._delay = self.resume_delay
+                elif self._requests == requests:
+                    self._pending = False
+                    if progress is not None:
+                        log.info("Sync finished: " + progress.text())
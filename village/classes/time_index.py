@@ -0,0 +1,192 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+_NAT = np.iinfo(np.int64).min
+_FEW_ROWS = 32
+
+
+def _parse_ns(value: object) -> int:
+    try:
+        date = datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return _NAT
+    if date.tzinfo is not None:
+        return int(pd.Timestamp(date).tz_convert(None).value)
+    return int(np.datetime64(date, "ns").view(np.int64))
+
+
+def _to_ns(values: pd.Series) -> np.ndarray:
+    """Parses a column of date strings into int64 nanoseconds, NaT for the
+    values that are not dates."""
+    if len(values) <= _FEW_ROWS:
+        # pd.to_datetime has a fixed cost that is much higher than parsing the
+        # few rows added between two queries one by one
+        return np.array([_parse_ns(value) for value in values], dtype=np.int64)
+    try:
+        dates = pd.to_datetime(values, format="ISO8601")
+    except (ValueError, TypeError):
+        dates = pd.to_datetime(values, format="mixed", errors="coerce")
+    return dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+class TimeIndex:
+    """Parsed dates of a collection, kept in time order, with some text columns
+    stored as categorical codes.
+
+    The dates are parsed once, when the index is built or when rows are added,
+    so selecting the rows of a time window is a binary search plus a slice.
+    The text columns are stored as integer codes of a table of distinct values,
+    so filters like str.startswith are evaluated once per distinct value and not
+    once per row. The rows are usually added in time order; if not, the time
+    order is computed with a stable sort the next time it is needed.
+
+    Attributes:
+        date_column (str): Name of the column with the dates.
+        category_columns (list[str]): Columns stored as categorical codes.
+    """
+
+    def __init__(self, date_column: str, category_columns: list[str]) -> None:
+        self.date_column = date_column
+        self.category_columns = category_columns
+        self.reset()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def reset(self) -> None:
+        """Empties the index."""
+        self._size = 0
+        self._times = np.empty(0, dtype=np.int64)
+        self._codes = {
+            col: np.empty(0, dtype=np.int32) for col in self.category_columns
+        }
+        self._values: dict[str, list[str]] = {col: [] for col in self.category_columns}
+        self._value_codes: dict[str, dict[str, int]] = {
+            col: {} for col in self.category_columns
+        }
+        self._categories: dict[str, pd.Index] = {}
+        self._sorted = True
+        self._order: np.ndarray | None = None
+
+    def build(self, df: pd.DataFrame) -> None:
+        """Indexes all the rows of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The rows of the collection.
+        """
+        self.reset()
+        self.extend(df)
+
+    def extend(self, df: pd.DataFrame) -> None:
+        """Indexes rows added after the ones already indexed.
+
+        Args:
+            df (pd.DataFrame): The new rows.
+        """
+        n = len(df)
+        if n == 0:
+            return
+        times = _to_ns(df[self.date_column])
+        last = self._times[self._size - 1] if self._size else _NAT
+        if self._sorted and (times[0] < last or np.any(times[1:] < times[:-1])):
+            self._sorted = False
+        self._order = None
+        self._times = self._grow(self._times, times)
+        for col in self.category_columns:
+            self._codes[col] = self._grow(self._codes[col], self._encode(col, df[col]))
+        self._size += n
+
+    def _grow(self, array: np.ndarray, new: np.ndarray) -> np.ndarray:
+        # doubles the capacity when full, so adding rows one by one is amortised
+        size = self._size + len(new)
+        if size > len(array):
+            grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+            grown[: self._size] = array[: self._size]
+            array = grown
+        array[self._size : size] = new
+        return array
+
+    def _encode(self, col: str, values: pd.Series) -> np.ndarray:
+        # missing values get the code -1, which is NaN in pd.Categorical
+        if len(values) <= _FEW_ROWS:
+            codes, uniques = self._factorize_few(values)
+        else:
+            codes, uniques = pd.factorize(values)
+        if len(uniques) == 0:
+            return np.full(len(codes), -1, dtype=np.int32)
+        table = self._value_codes[col]
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(map(str, uniques)):
+            code = table.get(value)
+            if code is None:
+                code = table[value] = len(self._values[col])
+                self._values[col].append(value)
+                self._categories.pop(col, None)
+            mapping[i] = code
+        return np.where(codes < 0, -1, mapping[codes]).astype(np.int32)
+
+    @staticmethod
+    def _factorize_few(values: pd.Series) -> tuple[np.ndarray, list]:
+        uniques: dict[object, int] = {}
+        codes = [
+            -1 if pd.isna(value) else uniques.setdefault(value, len(uniques))
+            for value in values
+        ]
+        return np.array(codes, dtype=np.int64), list(uniques)
+
+    def window(
+        self, start: datetime.datetime, end: datetime.datetime | None = None
+    ) -> slice | np.ndarray:
+        """Positions of the rows with start <= date < end, in time order.
+
+        Args:
+            start (datetime.datetime): First date of the window.
+            end (datetime.datetime | None): End of the window, None for no end.
+
+        Returns:
+            slice | np.ndarray: A slice of the rows if they are in time order,
+                otherwise an array with their positions.
+        """
+        times = self._times[: self._size]
+        if not self._sorted:
+            if self._order is None:
+                self._order = np.argsort(times, kind="stable")
+            times = times[self._order]
+        first = int(np.searchsorted(times, np.datetime64(start, "ns").view(np.int64)))
+        last = self._size
+        if end is not None:
+            last = int(np.searchsorted(times, np.datetime64(end, "ns").view(np.int64)))
+        last = max(first, last)
+        if self._sorted:
+            return slice(first, last)
+        return self._order[first:last]
+
+    def dates(self, rows: slice | np.ndarray) -> np.ndarray:
+        """Parsed dates of some rows.
+
+        Args:
+            rows (slice | np.ndarray): Positions returned by window.
+
+        Returns:
+            np.ndarray: The dates as datetime64[ns].
+        """
+        return self._times[: self._size][rows].view("datetime64[ns]")
+
+    def categorical(self, col: str, rows: slice | np.ndarray) -> pd.Categorical:
+        """Values of a categorical column for some rows.
+
+        Args:
+            col (str): One of the category_columns.
+            rows (slice | np.ndarray): Positions returned by window.
+
+        Returns:
+            pd.Categorical: The values of the rows.
+        """
+        categories = self._categories.get(col)
+        if categories is None:
+            categories = self._categories[col] = pd.Index(self._values[col])
+        return pd.Categorical.from_codes(
+            self._codes[col][: self._size][rows], categories=categories
+        )
@@ -21,7 +21,7 @@ from village.scripts.parse_bpod_messages import (
     parse_input_to_tuple_override,
     parse_output_to_tuple_override,
 )
-from village.settings import settings
+from village.settings import Active, settings
 
 
 class BpodController:
@@ -47,6 +47,8 @@ class BpodController:
             target_firmware=settings.get("BPOD_TARGET_FIRMWARE"),
             bnc_ports=settings.get("BPOD_BNC_PORTS"),
             behavior_ports=settings.get("BPOD_BEHAVIOR_PORTS"),
+            event_driven=settings.get("BPOD_EVENT_DRIVEN") == Active.ON,
+            reuse_state_machine=settings.get("BPOD_REUSE_STATE_MACHINE") == Active.ON,
         )
 
     def check_connection(self) -> None:
@@ -1,36 +1,222 @@
 import csv
+import math
 import os
+import threading
+import time
+import traceback
+from array import array
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
+from village.classes.enums import Active
+from village.scripts.log import log
 from village.settings import settings
 
 
+class BufferedRowWriter:
+    """Writes the rows of the raw CSV from a background thread.
+
+    add() only appends to compact typed arrays: trial numbers, start and end
+    timestamps (NaN when empty) and indices into interned messages and values.
+    The writer thread formats the pending rows and writes them every interval
+    seconds. request_sync() asks it to also flush and fsync the file, which
+    the recorder does at every trial boundary.
+
+    Attributes:
+        interval (float): Seconds between background writes.
+        chunk_size (int): Rows formatted at once before yielding the GIL.
+        rows_written (int): Number of rows written to the file.
+        syncs (int): Number of times the file was synced to disk.
+    """
+
+    chunk_size = 256
+
+    def __init__(self, file: IO[str], interval: float = 0.5) -> None:
+        self.interval = interval
+        self.rows_written = 0
+        self.syncs = 0
+        self._file = file
+        self._writer = csv.writer(file, delimiter=";", lineterminator="\n")
+        self._messages: list[str] = []
+        self._message_ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reset_buffers()
+        self._sync_requested = False
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _reset_buffers(self) -> None:
+        self._trials = array("l")
+        self._starts = array("d")
+        self._ends = array("d")
+        self._message_indices = array("l")
+        self._value_indices = array("l")
+        self._values: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._trials)
+
+    def add(
+        self,
+        trial: int,
+        start: float | None,
+        end: float | None,
+        msg: str,
+        value: str,
+    ) -> None:
+        """Buffers one row. Safe to call from any thread."""
+        message_id = self._message_ids.get(msg)
+        if message_id is None:
+            message_id = len(self._messages)
+            self._messages.append(msg)
+            self._message_ids[msg] = message_id
+        with self._lock:
+            self._trials.append(trial)
+            self._starts.append(math.nan if start is None else start)
+            self._ends.append(math.nan if end is None else end)
+            self._message_indices.append(message_id)
+            if value:
+                self._value_indices.append(len(self._values))
+                self._values.append(value)
+            else:
+                self._value_indices.append(-1)
+
+    def request_sync(self) -> None:
+        """Asks the writer thread to write the pending rows and fsync the file."""
+        self._sync_requested = True
+        self._wakeup.set()
+
+    def flush(self, sync: bool = False) -> None:
+        """Writes the pending rows from the calling thread.
+
+        Args:
+            sync (bool): Also fsync the file.
+        """
+        with self._write_lock:
+            self._write_pending(sync)
+
+    def close(self) -> None:
+        """Stops the writer thread and writes and syncs the pending rows."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush(sync=True)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            sync = self._sync_requested
+            self._sync_requested = False
+            try:
+                self.flush(sync)
+            except Exception:
+                log.error(
+                    "Error writing the session csv",
+                    exception=traceback.format_exc(),
+                )
+
+    def _write_pending(self, sync: bool) -> None:
+        with self._lock:
+            trials = self._trials
+            starts = self._starts
+            ends = self._ends
+            message_indices = self._message_indices
+            value_indices = self._value_indices
+            values = self._values
+            self._reset_buffers()
+        messages = self._messages
+        for first in range(0, len(trials), self.chunk_size):
+            last = first + self.chunk_size
+            self._writer.writerows(
+                [
+                    trial,
+                    "" if start != start else f"{start:.4f}",
+                    "" if end != end else f"{end:.4f}",
+                    messages[message_index],
+                    "" if value_index < 0 else values[value_index],
+                ]
+                for trial, start, end, message_index, value_index in zip(
+                    trials[first:last],
+                    starts[first:last],
+                    ends[first:last],
+                    message_indices[first:last],
+                    value_indices[first:last],
+                )
+            )
+            self.rows_written += min(last, len(trials)) - first
+            # lets the recording thread take the GIL between chunks
+            time.sleep(0)
+        if sync:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.syncs += 1
+        elif trials:
+            self._file.flush()
+
+
 class TrialRecorder:
     """Universal trial data recorder for all controller types.
 
     Records states, events, and values during a trial.
-    Generates both a raw CSV (line per event) and a per-trial data dictionary
+    Generates both a raw CSV (line per event) and a per-trial data dictionary.
+    By default every row is written and flushed immediately. In buffered mode
+    (BUFFERED_RECORDER setting) the rows are written by a BufferedRowWriter and
+    the file is synced to disk at every trial boundary.
+
+    State and event names are interned as integer ids that are kept between
+    trials, together with their trial_data keys. A trial is stored as parallel
+    typed arrays (state id, start and end of every visit; event id and
+    timestamp of every event) that are grouped in one pass when the trial
+    ends, without building or rewriting key strings.
     """
 
     CSV_COLUMNS = ["TRIAL", "START", "END", "MSG", "VALUE"]
 
-    def __init__(self) -> None:
-        self._csv_path = str(Path(settings.get("SESSIONS_DIRECTORY"), "session.csv"))
-        self._csv_file = None
+    def __init__(self, path: str | None = None, buffered: bool | None = None) -> None:
+        """Opens the raw CSV file.
+
+        Args:
+            path (str | None): Path of the raw CSV, session.csv in the
+                sessions directory by default.
+            buffered (bool | None): Use the buffered writer, taken from the
+                BUFFERED_RECORDER setting by default.
+        """
+        if path is None:
+            path = str(Path(settings.get("SESSIONS_DIRECTORY"), "session.csv"))
+        if buffered is None:
+            buffered = settings.get("BUFFERED_RECORDER") == Active.ON
+        self._csv_path = path
+        self._csv_file: IO[str] | None = None
         self._csv_writer = None
+        self._buffer: BufferedRowWriter | None = None
         self._trial_number: int = 0
         self._time_offset: float = 0.0
 
+        # Interned names, kept between trials. Every state has its row name in
+        # the CSV and its start and end keys in trial_data
+        self._state_ids: dict[str, int] = {}
+        self._state_keys: list[tuple[str, str, str]] = []
+        self._event_ids: dict[str, int] = {}
+        self._event_names: list[str] = []
+
         # Current trial state
         self._trial_start: float | None = None
         self._trial_end: float | None = None
-        self._current_state: str | None = None
+        self._current_state: int | None = None
         self._current_state_start: float | None = None
-        self._states_start: dict[str, list[float]] = {}
-        self._states_end: dict[str, list[float]] = {}
-        self._events: dict[str, list[float]] = {}
-        self._ordered_events: list[str] = []
+        self._visit_states = array("i")
+        self._visit_starts = array("d")
+        self._visit_ends = array("d")
+        self._visits_by_state: dict[int, tuple[list, list]] | None = None
+        self._event_sequence = array("i")
+        self._event_times = array("d")
+        self._declared_states: list[int] = []
         self._values: dict[str, Any] = {}
 
         os.makedirs(os.path.dirname(self._csv_path), exist_ok=True)
@@ -40,6 +226,8 @@ class TrialRecorder:
         )
         self._csv_writer.writerow(self.CSV_COLUMNS)
         self._csv_file.flush()
+        if buffered:
+            self._buffer = BufferedRowWriter(self._csv_file)
 
     def _to_absolute(self, controller_timestamp: float) -> float:
         """Convert a controller timestamp to absolute raspberry time.
@@ -67,13 +255,47 @@ class TrialRecorder:
         self._trial_start = round(raspberry_timestamp, 4)
         self._current_state = None
         self._current_state_start = None
-        self._states_start = {}
-        self._states_end = {}
-        self._events = {}
-        self._ordered_events = []
+        self._visit_states = array("i")
+        self._visit_starts = array("d")
+        self._visit_ends = array("d")
+        self._visits_by_state = None
+        self._event_sequence = array("i")
+        self._event_times = array("d")
+        self._declared_states = []
         self._values = {}
-        timestamp_str = f"{raspberry_timestamp:.4f}"
-        self._write_csv_row(timestamp_str, "", "TRIAL_START", "")
+        if self._buffer is not None:
+            # rows written after the end of the previous trial
+            self._buffer.request_sync()
+        self._write_csv_row(raspberry_timestamp, None, "TRIAL_START")
+
+    def declare_states(self, state_names: list[str]) -> None:
+        """Declares all the states of the state machine of the current trial.
+        The declared states that are not visited appear in trial_data with a
+        NaN start and end.
+
+        Args:
+            state_names: Names of the states, in order.
+        """
+        self._declared_states = [self._state_id(name) for name in state_names]
+
+    @property
+    def n_events(self) -> int:
+        """Number of events recorded in the current trial."""
+        return len(self._event_sequence)
+
+    def _state_id(self, state_name: str) -> int:
+        state_id = self._state_ids.get(state_name)
+        if state_id is None:
+            state_id = len(self._state_keys)
+            self._state_ids[state_name] = state_id
+            self._state_keys.append(
+                (
+                    f"STATE_{state_name}",
+                    f"STATE_{state_name}_START",
+                    f"STATE_{state_name}_END",
+                )
+            )
+        return state_id
 
     def enter_state(self, state_name: str, controller_timestamp: float) -> None:
         """Record entering a new state. Closes the previous state.
@@ -84,10 +306,9 @@ class TrialRecorder:
         """
         abs_ts = self._to_absolute(controller_timestamp)
         self._close_current_state(abs_ts)
-        self._current_state = state_name
+        self._current_state = self._state_id(state_name)
         self._current_state_start = abs_ts
-        timestamp_str = f"{abs_ts:.4f}"
-        self._write_csv_row(timestamp_str, "", f"_Transition_to_{state_name}", "")
+        self._write_csv_row(abs_ts, None, f"_Transition_to_{state_name}")
 
     def add_controller_event(
         self, event_name: str, controller_timestamp: float
@@ -112,12 +333,14 @@ class TrialRecorder:
         self._add_event(event_name, round(raspberry_timestamp, 4))
 
     def _add_event(self, event_name: str, abs_ts: float) -> None:
-        if event_name not in self._events:
-            self._events[event_name] = []
-        self._events[event_name].append(abs_ts)
-        self._ordered_events.append(event_name)
-        timestamp_str = f"{abs_ts:.4f}"
-        self._write_csv_row(timestamp_str, "", event_name, "")
+        event_id = self._event_ids.get(event_name)
+        if event_id is None:
+            event_id = len(self._event_names)
+            self._event_ids[event_name] = event_id
+            self._event_names.append(event_name)
+        self._event_sequence.append(event_id)
+        self._event_times.append(abs_ts)
+        self._write_csv_row(abs_ts, None, event_name)
 
     def add_value(self, name: str, value: Any) -> None:
         """Record a key-value pair for the current trial.
@@ -127,7 +350,7 @@ class TrialRecorder:
             value: The value to record.
         """
         self._values[name] = value
-        self._write_csv_row("", "", name, str(value))
+        self._write_csv_row(None, None, name, str(value))
 
     def end_trial(self, controller_timestamp: float) -> None:
         """Mark the end of the current trial. Closes the last open state.
@@ -138,25 +361,17 @@ class TrialRecorder:
         abs_ts = self._to_absolute(controller_timestamp)
         self._close_current_state(abs_ts)
         self._trial_end = abs_ts
-        timestamp_str = f"{abs_ts:.4f}"
-        self._write_csv_row(timestamp_str, "", "TRIAL_END", "")
-
-        self._write_csv_row(
-            f"{self._trial_start:.4f}",
-            timestamp_str,
-            "TRIAL",
-            "",
-        )
+        self._write_csv_row(abs_ts, None, "TRIAL_END")
 
-        for state, start_times in self._states_start.items():
-            end_times = self._states_end.get(state.replace("START", "END"), [])
-            for start, end in zip(start_times, end_times):
-                self._write_csv_row(
-                    f"{start:.4f}",
-                    f"{end:.4f}",
-                    state.replace("_START", ""),
-                    "",
-                )
+        self._write_csv_row(self._trial_start, abs_ts, "TRIAL")
+
+        for state_id, (starts, ends) in self._group_visits().items():
+            row_name = self._state_keys[state_id][0]
+            for start, end in zip(starts, ends):
+                self._write_csv_row(start, end, row_name)
+
+        if self._buffer is not None:
+            self._buffer.request_sync()
 
     def get_trial_data(
         self, date: str, trial: int, subject: str, name: str, system_name: str
@@ -179,59 +394,94 @@ class TrialRecorder:
         trial_data["TRIAL_START"] = self._trial_start
         trial_data["TRIAL_END"] = self._trial_end
 
-        # States
-        interleaved = {}
-        for state, start_times in self._states_start.items():
-            interleaved[state] = start_times
-            end_key = state.replace("START", "END")
-            if end_key in self._states_end:
-                interleaved[end_key] = self._states_end[end_key]
-
-        trial_data.update(interleaved)
+        # States, in order of first visit, then the unvisited ones with NaN
+        for state_id, (starts, ends) in self._group_visits().items():
+            _, start_key, end_key = self._state_keys[state_id]
+            trial_data[start_key] = starts
+            trial_data[end_key] = ends
+        for state_id in self._declared_states:
+            _, start_key, end_key = self._state_keys[state_id]
+            if start_key not in trial_data:
+                trial_data[start_key] = [math.nan]
+                trial_data[end_key] = [math.nan]
 
         # Events
-        trial_data.update(self._events)
+        events: dict[int, list[float]] = {}
+        for event_id, timestamp in zip(self._event_sequence, self._event_times):
+            times = events.get(event_id)
+            if times is None:
+                events[event_id] = [timestamp]
+            else:
+                times.append(timestamp)
+        for event_id, times in events.items():
+            trial_data[self._event_names[event_id]] = times
 
-        trial_data["ordered_list_of_events"] = self._ordered_events
+        trial_data["ordered_list_of_events"] = [
+            self._event_names[event_id] for event_id in self._event_sequence
+        ]
 
-        self._write_csv_row("", "", "date", date)
-        self._write_csv_row("", "", "trial", str(trial))
-        self._write_csv_row("", "", "subject", subject)
-        self._write_csv_row("", "", "task", name)
-        self._write_csv_row("", "", "system_name", system_name)
+        self._write_csv_row(None, None, "date", date)
+        self._write_csv_row(None, None, "trial", str(trial))
+        self._write_csv_row(None, None, "subject", subject)
+        self._write_csv_row(None, None, "task", name)
+        self._write_csv_row(None, None, "system_name", system_name)
 
         return trial_data
 
     def close(self) -> None:
         """Close the CSV file if open."""
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
         if self._csv_file:
             self._csv_file.flush()
             self._csv_file.close()
             self._csv_file = None
             self._csv_writer = None
 
+    def _group_visits(self) -> dict[int, tuple[list[float], list[float]]]:
+        """Start and end times of the visits of every state, in order of first
+        visit. Computed once per trial, when the last state is closed."""
+        if self._visits_by_state is None:
+            self._visits_by_state = {}
+            for state_id, start, end in zip(
+                self._visit_states, self._visit_starts, self._visit_ends
+            ):
+                visits = self._visits_by_state.get(state_id)
+                if visits is None:
+                    self._visits_by_state[state_id] = ([start], [end])
+                else:
+                    visits[0].append(start)
+                    visits[1].append(end)
+        return self._visits_by_state
+
     def _close_current_state(self, timestamp: float) -> None:
         """Close the currently open state with the given end timestamp."""
         if self._current_state is not None and self._current_state_start is not None:
-            if f"STATE_{self._current_state}_START" not in self._states_start:
-                self._states_start[f"STATE_{self._current_state}_START"] = [
-                    self._current_state_start
-                ]
-            else:
-                self._states_start[f"STATE_{self._current_state}_START"].append(
-                    self._current_state_start
-                )
-            if f"STATE_{self._current_state}_END" not in self._states_end:
-                self._states_end[f"STATE_{self._current_state}_END"] = [timestamp]
-            else:
-                self._states_end[f"STATE_{self._current_state}_END"].append(timestamp)
+            self._visit_states.append(self._current_state)
+            self._visit_starts.append(self._current_state_start)
+            self._visit_ends.append(timestamp)
+            self._visits_by_state = None
             self._current_state = None
             self._current_state_start = None
 
-    def _write_csv_row(self, start: str, end: str, msg: str, value: str) -> None:
-        """Write a row to the raw CSV file."""
-        if self._csv_writer:
-            self._csv_writer.writerow([self._trial_number, start, end, msg, value])
+    def _write_csv_row(
+        self, start: float | None, end: float | None, msg: str, value: str = ""
+    ) -> None:
+        """Write a row to the raw CSV file. Timestamps are written with 4
+        decimals, None is written as an empty field."""
+        if self._buffer is not None:
+            self._buffer.add(self._trial_number, start, end, msg, value)
+        elif self._csv_writer:
+            self._csv_writer.writerow(
+                [
+                    self._trial_number,
+                    "" if start is None else f"{start:.4f}",
+                    "" if end is None else f"{end:.4f}",
+                    msg,
+                    value,
+                ]
+            )
             if self._csv_file:
                 self._csv_file.flush()
 
@@ -8,7 +8,9 @@ This module runs at the end of each session when the animal is back home.
 import threading
 from typing import Optional
 
-from village.classes.enums import SyncType
+from village.classes.enums import Active, SyncType
+from village.classes.sync_manifest import sync_manifest
+from village.classes.sync_scheduler import SyncProgress
 from village.scripts.rsync_to_hard_drive import main as rsync_to_hard_drive
 from village.scripts.rsync_to_server import main as rsync_to_server
 from village.settings import settings
@@ -19,6 +21,11 @@ class AfterSessionBase:
 
     This class handles data synchronization (backup) to either a hard drive
     or a remote server based on current settings.
+
+    When BACKGROUND_SYNC is ON, run() is called from a background thread and
+    can be stopped at any moment by setting cancel_event, to be called again
+    later. Overrides should stop promptly when cancel_event is set and update
+    progress if they can.
     """
 
     def __init__(self) -> None:
@@ -29,26 +36,33 @@ class AfterSessionBase:
         self.server_host = settings.get("SERVER_HOST")
         self.maximum_sync_time = settings.get("MAXIMUM_SYNC_TIME")
         self.sync_type = settings.get("SYNC_TYPE")
+        self.incremental = settings.get("INCREMENTAL_SYNC") == Active.ON
         try:
             self.port: Optional[int] = int(settings.get("SERVER_PORT"))
         except Exception:
             self.port = None
         self.cancel_event = threading.Event()
+        self.progress = SyncProgress()
 
     def run(self) -> None:
         """Executes the post-session logic, primarily data synchronization.
 
         Checks the SYNC_TYPE setting and initiates either a local or remote rsync.
+        With INCREMENTAL_SYNC only the files in the sync manifest are synced.
         """
+        snapshot = sync_manifest.snapshot() if self.incremental else None
+        files_from = snapshot.files if snapshot is not None else None
         if self.sync_type == SyncType.HD:
-            rsync_to_hard_drive(
+            success = rsync_to_hard_drive(
                 source=self.data_directory,
                 destination=self.sync_directory,
                 maximum_sync_time=self.maximum_sync_time,
                 cancel_event=self.cancel_event,
+                progress=self.progress.update,
+                files_from=files_from,
             )
         elif self.sync_type == SyncType.SERVER:
-            rsync_to_server(
+            success = rsync_to_server(
                 source=self.data_directory,
                 destination=self.sync_directory,
                 remote_user=self.server_user,
@@ -56,7 +70,14 @@ class AfterSessionBase:
                 port=self.port,
                 maximum_sync_time=self.maximum_sync_time,
                 cancel_event=self.cancel_event,
+                progress=self.progress.update,
+                files_from=files_from,
+                persistent_connection=self.incremental,
             )
+        else:
+            return
+        if success and snapshot is not None:
+            sync_manifest.done(snapshot)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,10 @@
-import bisect
 from collections import deque
 from dataclasses import dataclass
 from threading import Event as ThEvent
 from threading import Thread
 
+import numpy as np
+
 from village.custom_classes.task_base import TaskBase
 from village.scripts.time_utils import time_utils
 
@@ -53,6 +54,7 @@ class AutoNoMouseBase:
         self.position = None
         self._position_log.clear()
         self._set_overlay(self)
+        self.inject_positions()
         self._thread = Thread(target=self._run, daemon=True)
         self._thread.start()
 
@@ -63,41 +65,28 @@ class AutoNoMouseBase:
         self._set_overlay(None)
         self.trace.clear()
         self.position = None
-        self.inject_positions()
 
     def inject_positions(self) -> None:
-        """Hacky: (I did not want to modify cam_box code to support this)
-        Replaces cam_box position (x, y) lists with AutoNoMouse positions.
-        Called when AutoNoMouse stops, just before cam_box.stop_recording(),
-        so cam_box.save_csv() picks them up and records them."""
+        """Makes cam_box save the AutoNoMouse positions (x, y) in its CSV file
+        instead of the detected ones. The override stays active until
+        cam_box.stop_recording() writes the last frames."""
         if self.task is None:
             return
-        cam = self.task.cam_box
-        if not self._position_log or not (
-            hasattr(cam, "camera_timestamps")
-            and hasattr(cam, "x_positions")
-            and hasattr(cam, "y_positions")
-        ):
-            return
-
-        ts_log = [t for t, _, _ in self._position_log]
-        xs_log = [x for _, x, _ in self._position_log]
-        ys_log = [y for _, _, y in self._position_log]
-
-        # match each virtual position timestamp to nearest
-        # cam ts, then inject (x, y).
-        new_x, new_y = [], []
-        for ts in cam.camera_timestamps:
-            i = bisect.bisect_right(ts_log, ts) - 1
-            if i >= 0:
-                new_x.append(xs_log[i])
-                new_y.append(ys_log[i])
-            else:
-                new_x.append(-1)
-                new_y.append(-1)
-
-        cam.x_positions = new_x
-        cam.y_positions = new_y
+        frame_log = getattr(self.task.cam_box, "frame_log", None)
+        if frame_log is not None:
+            frame_log.position_override = self.positions_at
+
+    def positions_at(self, timestamps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the virtual position at each camera timestamp, the last one
+        set before it, or -1 if none was set yet."""
+        position_log = np.array(self._position_log, dtype=np.float64).reshape(-1, 3)
+        i = np.searchsorted(position_log[:, 0], timestamps, side="right") - 1
+        found = i >= 0
+        x = np.full(len(timestamps), -1, dtype=np.int32)
+        y = np.full(len(timestamps), -1, dtype=np.int32)
+        x[found] = position_log[i[found], 1]
+        y[found] = position_log[i[found], 2]
+        return x, y
 
     def _set_overlay(self, instance: "AutoNoMouseBase | None") -> None:
         if self.task is None:
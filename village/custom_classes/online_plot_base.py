@@ -1,6 +1,14 @@
+import threading
+from typing import Any
+
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+from matplotlib.axes import Axes
 from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+from village.classes.session_table import SessionTable
 
 
 class OnlinePlotBase:
@@ -12,14 +20,44 @@ class OnlinePlotBase:
 
     Subclasses should override `create_figure_and_axes` (to create axes) and
     `update_plot` (to draw on existing axes).
+
+    Alternatively, to plot incrementally, override `append_trials` instead of
+    `update_plot`. It only receives the trials added since the previous update.
+    Create the lines with `add_line` in `create_figure_and_axes` and extend them
+    with `extend_line` in `append_trials`: only these lines are redrawn (by
+    blitting) after every trial, so the cost of a refresh does not grow with the
+    length of the session. The axes are redrawn only when their limits need to
+    grow.
+
+    Attributes:
+        incremental (bool): Whether the plot is updated with append_trials
+            instead of update_plot. It is set to True in the subclasses that
+            define append_trials, unless they set it themselves.
+        version (int): Number of trials of the session already plotted by
+            append_trials.
     """
 
+    incremental = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "append_trials" in vars(cls) and "incremental" not in vars(cls):
+            cls.incremental = True
+
     def __init__(self) -> None:
         """Initializes the OnlinePlotBase instance."""
         self.name = "Online Plot"
         self.fig: Figure | None = None
         self.active = False
         self.window_geometry: tuple[int, int, int, int] | None = None
+        self.version = 0
+        self._table: SessionTable | None = None
+        self._lines: dict[Line2D, tuple[list, list]] = {}
+        self._background: Any = None
+        self._background_canvas: Any = None
+        self._full_draw = True
+        self._pending = False
+        self._lock = threading.RLock()
 
     def create_figure_and_axes(self) -> None:
         """Creates the figure and axes. Should be overridden by subclasses."""
@@ -45,10 +83,82 @@ class OnlinePlotBase:
 
         df.plot(kind="scatter", x="TRIAL_START", y="trial", ax=self.ax)
 
+    def append_trials(self, df: pd.DataFrame) -> None:
+        """Adds new trials to the plot. Override it instead of update_plot to
+        plot incrementally. Does nothing by default.
+
+        Args:
+            df (pd.DataFrame): Only the trials added since the previous call,
+                indexed by their row number in the session.
+        """
+        return
+
+    def add_line(self, ax: Axes, *args, **kwargs) -> Line2D:
+        """Creates an empty line that is extended with extend_line and redrawn
+        by blitting. Takes the same format and keyword arguments as ax.plot.
+
+        Args:
+            ax (Axes): The axes of the line.
+
+        Returns:
+            Line2D: The new line.
+        """
+        (line,) = ax.plot([], [], *args, animated=True, **kwargs)
+        self._lines[line] = ([], [])
+        return line
+
+    def extend_line(self, line: Line2D, x: Any, y: Any) -> None:
+        """Appends points to a line created with add_line.
+
+        Args:
+            line (Line2D): The line.
+            x: The x values of the new points.
+            y: The y values of the new points.
+        """
+        xs, ys = self._lines[line]
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        xs.extend(x.tolist())
+        ys.extend(y.tolist())
+        line.set_data(xs, ys)
+        ax = line.axes
+        if ax.get_autoscalex_on() and self._grow_limits(ax.get_xlim, ax.set_xlim, x):
+            self._full_draw = True
+        if ax.get_autoscaley_on() and self._grow_limits(ax.get_ylim, ax.set_ylim, y):
+            self._full_draw = True
+
+    @staticmethod
+    def _grow_limits(get_lim, set_lim, values: np.ndarray) -> bool:
+        """Grows the limits of an axis to include the values, with a margin of
+        half the new span on the side that grows, so the axes are redrawn a
+        few times per session and not after every trial."""
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return False
+        low, high = get_lim()
+        vmin, vmax = float(values.min()), float(values.max())
+        if vmin >= low and vmax <= high:
+            return False
+        new_low, new_high = min(low, vmin), max(high, vmax)
+        margin = (new_high - new_low) / 2 or 1.0
+        set_lim(
+            new_low - margin if vmin < low else low,
+            new_high + margin if vmax > high else high,
+            auto=None,
+        )
+        return True
+
     def ensure_figure(self) -> None:
         """Ensures that the matplotlib figure exists, creating it if necessary."""
         if self.fig is None or getattr(self.fig, "canvas", None) is None:
+            self._lines = {}
+            self._table = None
+            self.version = 0
+            self._background = None
+            self._full_draw = True
             self.create_figure_and_axes()
+            if self.fig is not None:
+                self.fig.canvas.mpl_connect("draw_event", self._on_draw)
 
     def update_canvas(self, df: pd.DataFrame) -> None:
         """Updates the plot with new data and redraws the canvas.
@@ -64,6 +174,75 @@ class OnlinePlotBase:
         except Exception:
             pass
 
+    def update_session(self, table: SessionTable) -> None:
+        """Updates the plot with the trials of the running session.
+
+        Incremental plots receive only the new trials in append_trials and
+        are drawn later by draw_pending, from the GUI thread. The other plots
+        are redrawn with update_canvas.
+
+        Args:
+            table (SessionTable): The trials of the session.
+        """
+        if not self.incremental:
+            self.update_canvas(table.df)
+            return
+        try:
+            with self._lock:
+                self.ensure_figure()
+                if table is not self._table or table.version < self.version:
+                    self._clear_lines()
+                    self._table = table
+                    self.version = 0
+                new_rows = table.rows_since(self.version)
+                if not new_rows.empty:
+                    self.version = int(new_rows.index[-1]) + 1
+                    self.append_trials(new_rows)
+                    self._pending = True
+        except Exception:
+            pass
+
+    def draw_pending(self) -> None:
+        """Draws the changes made by append_trials since the last call.
+        Only the lines are redrawn, unless the axes have changed."""
+        with self._lock:
+            if self.fig is None or not self._pending:
+                return
+            self._pending = False
+            canvas = self.fig.canvas
+            if (
+                self._full_draw
+                or self._background is None
+                or self._background_canvas is not canvas
+                or not canvas.supports_blit
+            ):
+                self._full_draw = False
+                canvas.draw()
+                return
+            canvas.restore_region(self._background)
+            for line in self._lines:
+                line.axes.draw_artist(line)
+            canvas.blit(self.fig.bbox)
+
+    def _on_draw(self, event) -> None:
+        """Keeps the background without the lines after every full draw, and
+        draws the lines on top."""
+        with self._lock:
+            canvas = event.canvas
+            if not canvas.supports_blit or self.fig is None:
+                return
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+            self._background_canvas = canvas
+            for line in self._lines:
+                line.axes.draw_artist(line)
+
+    def _clear_lines(self) -> None:
+        for line, (xs, ys) in self._lines.items():
+            xs.clear()
+            ys.clear()
+            line.set_data(xs, ys)
+        self._full_draw = True
+
     def close(self) -> None:
         """Closes the matplotlib figure and resets the state."""
         try:
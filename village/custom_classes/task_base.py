@@ -9,6 +9,10 @@ import pandas as pd
 from village.classes.calibrations import Calibrations
 from village.classes.enums import Active, ControllerEnum, Save
 from village.classes.null_classes import NullCamera
+from village.classes.session_store import SessionStore
+from village.classes.session_table import SessionFrame, SessionTable
+from village.classes.subject_store import SubjectStore
+from village.classes.sync_manifest import sync_manifest
 from village.controllers.arduino_controller import arduino
 from village.controllers.bpod_controller import bpod
 from village.controllers.trial_recorder import TrialRecorder
@@ -294,7 +298,7 @@ class TaskBase:
 
         self.process = Thread()
         self.raw_df: pd.DataFrame = pd.DataFrame()
-        self.session_df: pd.DataFrame = pd.DataFrame()
+        self.session_table: SessionTable = SessionTable()
         self.subject_df: pd.DataFrame = pd.DataFrame()
         self.force_stop: bool = False
         self.stop_button_pressed: bool = False
@@ -490,10 +494,23 @@ class TaskBase:
         self.current_trial += 1
         return
 
+    @property
+    def session_df(self) -> pd.DataFrame:
+        """DataFrame with the trials of the session so far.
+
+        It is a copy: assigning a column to it warns and does not change the
+        session. To modify the session, modify session_df.copy() and assign it
+        back with ``self.session_df = df``.
+        """
+        return SessionFrame(self.session_table.df)
+
+    @session_df.setter
+    def session_df(self, df: pd.DataFrame) -> None:
+        self.session_table = SessionTable(df)
+
     def concatenate_trial_data(self) -> None:
-        """Appends the current trial's data to the session DataFrame."""
-        self.row_df = pd.DataFrame([self.trial_data])
-        self.session_df = pd.concat([self.session_df, self.row_df], ignore_index=True)
+        """Appends the current trial's data to the session table."""
+        self.session_table.append(self.trial_data)
         self.trial_data = {}
 
     def disconnect_and_save(self, run_mode: str) -> Tuple[Save, float, int, int, str]:
@@ -600,8 +617,8 @@ class TaskBase:
     def save_csv(self, run_mode: str) -> Tuple[float, int, int, bool]:
         """Saves the session data to CSV files.
 
-        Processes raw data, saves raw and clean session files, and updates the
-        subject's cumulative data file.
+        Processes raw data, saves raw and clean session files, and appends the
+        session to the subject's cumulative data store.
 
         Args:
             run_mode (str): The execution mode string.
@@ -637,10 +654,11 @@ class TaskBase:
 
             self.raw_df.to_csv(self.raw_session_path, index=False, header=True, sep=";")
 
-            trials = self.session_df.shape[0]
+            session_df = self.session_df.copy()
+            trials = session_df.shape[0]
 
             try:
-                water = int(self.session_df["water"].sum())
+                water = int(session_df["water"].sum())
             except Exception:
                 water = 0
 
@@ -649,39 +667,22 @@ class TaskBase:
                     "No water was drunk in task: " + self.name, subject=self.subject
                 )
 
-            self.session_df["run_mode"] = [run_mode] * self.session_df.shape[0]
-            self.session_df.to_csv(self.session_path, header=True, index=False, sep=";")
-
-            try:
-                self.subject_df = pd.read_csv(
-                    self.subject_path, sep=";", low_memory=False
-                )
-
-                self.session_df["session"] = [
-                    int(self.subject_df["session"].iloc[-1]) + 1
-                ] * self.session_df.shape[0]
-                self.subject_df = pd.concat(
-                    [self.subject_df, self.session_df], sort=True
-                )
-            except FileNotFoundError:
-                self.session_df["session"] = [1] * self.session_df.shape[0]
-                self.subject_df = self.session_df
-
-            priority_columns = [
-                "session",
-                "date",
-                "trial",
-                "subject",
-                "task",
-                "system_name",
-                "run_mode",
-            ]
-            reordered_columns = priority_columns + [
-                col for col in self.subject_df.columns if col not in priority_columns
-            ]
-            self.subject_df = self.subject_df[reordered_columns]
-
-            self.subject_df.to_csv(self.subject_path, header=True, index=False, sep=";")
+            session_df["run_mode"] = [run_mode] * session_df.shape[0]
+            session_df.to_csv(self.session_path, header=True, index=False, sep=";")
+            self.session_df = session_df
+
+            store = SubjectStore(self.subject_path)
+            store.append_session(session_df)
+            if settings.get("COLUMNAR_STORE") == Active.ON:
+                columnar_store = SessionStore(self.sessions_directory)
+                sync_manifest.add(*columnar_store.update_from(store, session_df))
+            self.subject_df = store.history()
+            sync_manifest.add(
+                self.raw_session_path,
+                self.session_path,
+                self.session_settings_path,
+                *store.files,
+            )
 
             def safe_to_numeric(series) -> Any:
                 try:
@@ -689,7 +690,15 @@ class TaskBase:
                 except Exception:
                     return series
 
-            self.subject_df = self.subject_df.apply(safe_to_numeric)
+            text_columns = [
+                col
+                for col in self.subject_df.columns
+                if pd.api.types.is_object_dtype(self.subject_df[col])
+                or pd.api.types.is_string_dtype(self.subject_df[col])
+            ]
+            self.subject_df[text_columns] = self.subject_df[text_columns].apply(
+                safe_to_numeric
+            )
 
             return duration, trials, water, True
         else:
@@ -6,11 +6,16 @@ import traceback
 from pprint import pprint
 from typing import Any
 
-import cv2
 import numpy as np
-import pandas as pd
 
+from village.classes.detection_engine import (
+    DetectionEngine,
+    DetectionLayout,
+    DetectionWorker,
+)
 from village.classes.enums import Active, AreaActive
+from village.classes.frame_log import FrameLog
+from village.classes.sync_manifest import sync_manifest
 
 try:
     from libcamera import controls
@@ -129,12 +134,8 @@ class Camera:
         tracking (bool): Whether position tracking is enabled.
         x_position (int): Centroid X coordinate.
         y_position (int): Centroid Y coordinate.
-        frames (list[int]): List of frame numbers.
-        trials (list[int]): List of trial numbers.
-        annotations (list[str]): List of annotations.
-        x_positions (list[int]): List of X positions.
-        y_positions (list[int]): List of Y positions.
-        camera_timestamps (list[float]): List of camera sensor timestamps.
+        frame_log (FrameLog): Per-frame metadata of the current recording,
+            written to the CSV file in the background.
         origin_rectangle (tuple): Coordinates for status bar background.
         end_rectangle (tuple): Dimensions for status bar background.
         origin_text1 (tuple): Position for first text line.
@@ -145,11 +146,17 @@ class Camera:
         thickness_text (int): Font thickness.
         frame_number (int): Current frame number.
         camera_timestamp_start (float): Start timestamp for recording.
-        masks (list): Detection masks for each area.
+        detection (DetectionEngine): Thresholds the areas of every frame and
+            keeps the per-frame timing histogram.
+        detection_worker (DetectionWorker | None): Runs the detection outside
+            the camera callback when CAMERA_DETECTION_THREAD is ON.
+        masks (list): Detection masks for each area, of the last frame.
         counts (list[int]): Pixel counts for each area.
         error (str): Error message.
         error_frame (int): Frame number where error occurred.
         is_recording (bool): Recording status.
+        recording_id (int): Number of the current or last recording, so the
+            detection worker drops the frames of a closed recording.
         two_mice_detections (int): Counter for multiple mouse detections.
         prohibited_detections (int): Counter for prohibited area detections.
         area4_alarm_timer (time_utils.Timer): Timer for area 4 alarms.
@@ -217,13 +224,11 @@ class Camera:
         self.tracking = False
         self.x_position = -1
         self.y_position = -1
-        self.frames: list[int] = []
-        self.trials: list[int] = []
-        self.annotations: list[str] = []
-        self.x_positions: list[int] = []
-        self.y_positions: list[int] = []
-        self.camera_timestamps: list[float] = []
+        self.frame_log = FrameLog()
+        self.frame_log.on_closed = sync_manifest.add
         self.items_to_draw: dict[str, Any] = {}
+        self.detection = DetectionEngine()
+        self.detection_worker: DetectionWorker | None = None
 
         if self.change:
             self.set_properties()
@@ -232,13 +237,11 @@ class Camera:
         self.frame_number = 0
         self.camera_timestamp_start = 0.0
 
-        self.masks: list[Any] = [-1, -1, -1, -1]
-        self.counts: list[int] = [-1, -1, -1, -1]
-
         self.error = ""
         self.error_frame = 0
 
         self.is_recording = False
+        self.recording_id = 0
 
         self.two_mice_detections = 0
         self.prohibited_detections = 0
@@ -306,6 +309,8 @@ class Camera:
                     self.areas_allowed.append(False)
                     self.areas_trigger.append(False)
 
+        self.detection.configure(self.areas, self.thresholds, self.areas_active)
+
         # detection settings
         self.zero_or_one_mouse = settings.get("DETECTION_OF_MOUSE_" + self.name)[0]
         self.one_or_two_mice = settings.get("DETECTION_OF_MOUSE_" + self.name)[1]
@@ -333,13 +338,45 @@ class Camera:
         self.cam.set_controls({"Sharpness": sharpness})
         self.cam.set_controls({"Contrast": contrast})
 
+        self.update_detection_worker()
+
+    @property
+    def masks(self) -> list[Any]:
+        """Detection masks of the last frame, see DetectionEngine."""
+        return self.detection.results()[0]
+
+    @property
+    def counts(self) -> list[int]:
+        """Detected pixel counts of the last frame, see DetectionEngine."""
+        return self.detection.results()[1]
+
+    def update_detection_worker(self) -> None:
+        """Starts or stops the detection worker following the
+        CAMERA_DETECTION_THREAD setting."""
+        if settings.get("CAMERA_DETECTION_THREAD") == Active.ON:
+            if self.detection_worker is None:
+                self.detection_worker = DetectionWorker(
+                    self.detection, self.process_frame, frame_period=1 / self.framerate
+                )
+        else:
+            self.stop_detection_worker()
+
+    def stop_detection_worker(self) -> None:
+        """Processes the frames queued in the detection worker and stops it."""
+        worker = self.detection_worker
+        if worker is not None:
+            self.detection_worker = None
+            worker.stop()
+
     def start_camera(self) -> None:
         """Starts the camera capture."""
+        self.update_detection_worker()
         self.cam.start()
 
     def stop_camera(self) -> None:
-        """Stops the camera capture."""
+        """Stops the camera capture and the detection worker."""
         self.cam.stop()
+        self.stop_detection_worker()
 
     def stop_preview_window(self) -> None:
         """Stops the preview window and resets preview to NULL."""
@@ -373,6 +410,11 @@ class Camera:
                 self.name + "_" + time_start + ".csv",
             )
         self.output = FfmpegOutput(self.path_video)
+        if self.path_csv == os.path.join(settings.get("VIDEOS_DIRECTORY"), "BOX.csv"):
+            self.frame_log.start(None, self.tracking)
+        else:
+            self.frame_log.start(self.path_csv, self.tracking)
+        self.recording_id += 1
         self.is_recording = True
         self.camera_timestamp = time_utils.now_timestamp()
         try:
@@ -403,6 +445,7 @@ class Camera:
         if self.is_recording:
             self.is_recording = False
             self.cam.stop_encoder()
+            sync_manifest.add(self.path_video)
             self.save_csv()
         self.reset_values()
 
@@ -410,12 +453,6 @@ class Camera:
         """Resets all tracking and recording variables to defaults."""
         self.annotation = ""
         self.trial = 0
-        self.frames = []
-        self.camera_timestamps = []
-        self.x_positions = []
-        self.y_positions = []
-        self.trials = []
-        self.annotations = []
         self.frame_number = 0
         self.camera_timestamp_start = 0.0
         self.error = ""
@@ -429,67 +466,13 @@ class Camera:
         self.camera_timestamp = time_utils.now_timestamp()
 
     def save_csv(self) -> None:
-        """Saves the recorded data frames to a CSV file."""
-        if self.path_csv == os.path.join(settings.get("VIDEOS_DIRECTORY"), "BOX.csv"):
-            return
-
-        if self.tracking:
-            frames = tuple(self.frames)
-            trials = tuple(self.trials)
-            annotations = tuple(self.annotations)
-            x_positions = tuple(self.x_positions)
-            y_positions = tuple(self.y_positions)
-            camera_timestamps = tuple(self.camera_timestamps)
-
-            rows = list(
-                zip(
-                    frames,
-                    trials,
-                    annotations,
-                    camera_timestamps,
-                    x_positions,
-                    y_positions,
-                )
-            )
-
-            df = pd.DataFrame(
-                rows,
-                columns=[
-                    "frame",
-                    "trial",
-                    "annotation",
-                    "timestamp",
-                    "x_position",
-                    "y_position",
-                ],
-            )
-
-        else:
-            frames = tuple(self.frames)
-            trials = tuple(self.trials)
-            annotations = tuple(self.annotations)
-            camera_timestamps = tuple(self.camera_timestamps)
-
-            rows = list(
-                zip(
-                    frames,
-                    trials,
-                    annotations,
-                    camera_timestamps,
-                )
-            )
-
-            df = pd.DataFrame(
-                rows,
-                columns=[
-                    "frame",
-                    "trial",
-                    "annotation",
-                    "timestamp",
-                ],
-            )
-
-        df.to_csv(self.path_csv, index=False, sep=";")
+        """Hands the last frames to the writer thread, which finishes the CSV
+        file of the recording in the background. The frames of the recording
+        still queued in the detection worker are processed first."""
+        worker = self.detection_worker
+        if worker is not None and not worker.flush(timeout=2):
+            log.error("Cam " + self.name + ": last frames of the recording not saved")
+        self.frame_log.stop()
 
     def print_info_about_config(self) -> None:
         """Prints the current camera configuration to console."""
@@ -574,21 +557,87 @@ class Camera:
                     (self.camera_timestamp - self.camera_timestamp_start) * 1000
                 )
                 self.task_is_running = manager.state.task_is_running()
-                self.get_gray_frame()
-                self.detect_and_trigger()
-                manager.camera_draw.draw(self)
-                self.write_csv()
-                if self.name == "BOX" and self.is_recording:
-                    self.areas_box_ok()
-                if self.name == "CORRIDOR" and self.counts[0] != -1:
-                    self._hour_total += 1
-                    for i in range(4):
-                        if self.counts[i] > self.zero_or_one_mouse:
-                            self._hour_occupied[i] += 1
+                # the worker can be stopped from another thread
+                worker = self.detection_worker
+                if worker is not None:
+                    # only the crop is done here, the overlay is drawn with the
+                    # latest completed detection
+                    worker.submit(self.frame, self.frame_metadata())
+                    manager.camera_draw.draw(self)
+                else:
+                    self.get_gray_frame()
+                    self.detect_and_trigger()
+                    self.detection.finish()
+                    manager.camera_draw.draw(self)
+                    self.write_csv()
+                    self.update_area_checks(self.is_recording)
+
+    def frame_metadata(self) -> dict[str, Any]:
+        """Metadata of the current frame for the detection worker.
+
+        Returns:
+            dict[str, Any]: The frame number, trial, annotation, timestamp,
+                whether it is recorded and the recording it belongs to.
+        """
+        return {
+            "frame_number": self.frame_number,
+            "trial": self.trial,
+            "annotation": self.annotation,
+            "timestamp": self.camera_timestamp,
+            "is_recording": self.is_recording,
+            "recording_id": self.recording_id,
+        }
+
+    def process_frame(
+        self,
+        gray: np.ndarray | None,
+        layout: DetectionLayout | None,
+        metadata: dict[str, Any],
+    ) -> None:
+        """Detection stage of the pipeline, runs in the detection worker thread.
+
+        Args:
+            gray (np.ndarray | None): The grayscale bounding box of the active
+                areas.
+            layout (DetectionLayout | None): The layout of gray.
+            metadata (dict[str, Any]): The frame metadata captured in the
+                callback.
+        """
+        if not metadata["dropped"]:
+            self.detection.load(gray, layout)
+            self.detect_and_trigger()
+        # frames of a recording that is already closed are not written in the
+        # log of the next one
+        if metadata["is_recording"] and metadata["recording_id"] == self.recording_id:
+            self.frame_log.append(
+                metadata["frame_number"],
+                metadata["trial"],
+                metadata["annotation"],
+                metadata["timestamp"],
+                self.x_position,
+                self.y_position,
+            )
+        self.update_area_checks(metadata["is_recording"])
+
+    def update_area_checks(self, is_recording: bool) -> None:
+        """Updates the box alarms and the hourly corridor occupation with the
+        last detection.
+
+        Args:
+            is_recording (bool): Whether the frame was recorded.
+        """
+        if self.name == "BOX" and is_recording:
+            self.areas_box_ok()
+        if self.name == "CORRIDOR" and self.counts[0] != -1:
+            self._hour_total += 1
+            for i in range(4):
+                if self.counts[i] > self.zero_or_one_mouse:
+                    self._hour_occupied[i] += 1
 
     def get_gray_frame(self) -> None:
-        """Converts the current frame to grayscale."""
-        self.gray_frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        """Converts the part of the current frame covered by the active areas to
+        grayscale."""
+        self.detection.convert(self.frame)
 
     # @time_utils.measure_time
     def detect_and_trigger(self) -> None:
@@ -642,214 +691,51 @@ class Camera:
 
     def detect_black(self) -> None:
         """Detects black objects in defined areas using thresholding."""
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                threshold = self.thresholds[index]
-                _, thresh = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY_INV)
-                self.masks[index] = thresh
-                self.counts[index] = cv2.countNonZero(thresh)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
+        self.detection.detect(black=True)
 
     def detect_white(self) -> None:
         """Detects white objects in defined areas using thresholding."""
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                threshold = self.thresholds[index]
-                _, thresh = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY)
-                self.masks[index] = thresh
-                self.counts[index] = cv2.countNonZero(thresh)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
+        self.detection.detect(black=False)
 
     def detect_black_position_components(self) -> None:
         """Detects position of black mouse using connected components."""
-        mask = np.zeros_like(self.gray_frame, dtype=np.uint8)
-
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                if roi.size == 0:
-                    self.masks[index] = -1
-                    self.counts[index] = -1
-                    continue
-                threshold = self.thresholds[index]
-                _, roi_bin = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY_INV)
-                roi_bin = np.asarray(roi_bin, dtype=np.uint8)
-                sub = mask[y1:y2, x1:x2]
-                np.maximum(sub, roi_bin, out=sub)
-                self.masks[index] = roi_bin
-                self.counts[index] = cv2.countNonZero(roi_bin)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
-
-        num, _, stats, centroids = cv2.connectedComponentsWithStats(
-            mask, connectivity=8
+        self.detection.detect(black=True)
+        self.x_position, self.y_position = self.detection.position_components(
+            self.zero_or_one_mouse
         )
-        if num > 1:
-            areas = stats[1:, cv2.CC_STAT_AREA]
-            valid = np.where(areas >= self.zero_or_one_mouse)[0]
-
-            if valid.size > 0:
-                index = 1 + valid[np.argmax(areas[valid])]
-                cx, cy = centroids[index]
-                self.x_position = int(cx)
-                self.y_position = int(cy)
-            else:
-                self.x_position = -1
-                self.y_position = -1
-        else:
-            self.x_position = -1
-            self.y_position = -1
 
     def detect_white_position_components(self) -> None:
         """Detects position of white mouse using connected components."""
-        mask = np.zeros_like(self.gray_frame, dtype=np.uint8)
-
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                threshold = self.thresholds[index]
-                _, roi_bin = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY)
-                sub = mask[y1:y2, x1:x2]
-                np.maximum(sub, roi_bin, out=sub)
-                self.masks[index] = roi_bin
-                self.counts[index] = cv2.countNonZero(roi_bin)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
-
-        num, _, stats, centroids = cv2.connectedComponentsWithStats(
-            mask, connectivity=8
+        self.detection.detect(black=False)
+        self.x_position, self.y_position = self.detection.position_components(
+            self.zero_or_one_mouse
         )
-        if num > 1:
-            areas = stats[1:, cv2.CC_STAT_AREA]
-            valid = np.where(areas >= self.zero_or_one_mouse)[0]
-
-            if valid.size > 0:
-                index = 1 + valid[np.argmax(areas[valid])]
-                cx, cy = centroids[index]
-                self.x_position = int(cx)
-                self.y_position = int(cy)
-            else:
-                self.x_position = -1
-                self.y_position = -1
-        else:
-            self.x_position = -1
-            self.y_position = -1
 
     def detect_black_position_contours(self) -> None:
         """Detects position of black mouse using contours."""
-        mask = np.zeros_like(self.gray_frame, dtype=np.uint8)
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                if roi.size == 0:
-                    self.masks[index] = -1
-                    self.counts[index] = -1
-                    continue
-                threshold = self.thresholds[index]
-                _, roi_bin = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY_INV)
-                roi_bin = np.asarray(roi_bin, dtype=np.uint8)
-                sub = mask[y1:y2, x1:x2]
-                np.maximum(sub, roi_bin, out=sub)
-                self.masks[index] = roi_bin
-                self.counts[index] = cv2.countNonZero(roi_bin)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
-
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if not contours:
-            self.x_position = -1
-            self.y_position = -1
-            return
-
-        best_c = None
-        best_area = 0.0
-        for c in contours:
-            a = cv2.contourArea(c)
-            if a >= self.zero_or_one_mouse and a > best_area:
-                best_area = a
-                best_c = c
-
-        if best_c is None:
-            self.x_position = -1
-            self.y_position = -1
-            return
-
-        M = cv2.moments(best_c)
-        if M["m00"] > 0:
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"])
-            self.x_position = cx
-            self.y_position = cy
-        else:
-            self.x_position = -1
-            self.y_position = -1
+        self.detection.detect(black=True)
+        self.x_position, self.y_position = self.detection.position_contours(
+            self.zero_or_one_mouse
+        )
 
     def detect_white_position_contours(self) -> None:
         """Detects position of white mouse using contours."""
-        mask = np.zeros_like(self.gray_frame, dtype=np.uint8)
-        for index, (x1, y1, x2, y2) in enumerate(self.areas):
-            if self.areas_active[index]:
-                roi = self.gray_frame[y1:y2, x1:x2]
-                threshold = self.thresholds[index]
-                _, roi_bin = cv2.threshold(roi, threshold, 255, cv2.THRESH_BINARY)
-                sub = mask[y1:y2, x1:x2]
-                np.maximum(sub, roi_bin, out=sub)
-                self.masks[index] = roi_bin
-                self.counts[index] = cv2.countNonZero(roi_bin)
-            else:
-                self.masks[index] = -1
-                self.counts[index] = -1
-
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if not contours:
-            self.x_position = -1
-            self.y_position = -1
-            return
-
-        best_c = None
-        best_area = 0.0
-        for c in contours:
-            a = cv2.contourArea(c)
-            if a >= self.zero_or_one_mouse and a > best_area:
-                best_area = a
-                best_c = c
-
-        if best_c is None:
-            self.x_position = -1
-            self.y_position = -1
-            return
-
-        M = cv2.moments(best_c)
-        if M["m00"] > 0:
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"])
-            self.x_position = cx
-            self.y_position = cy
-        else:
-            self.x_position = -1
-            self.y_position = -1
+        self.detection.detect(black=False)
+        self.x_position, self.y_position = self.detection.position_contours(
+            self.zero_or_one_mouse
+        )
 
     def write_csv(self) -> None:
-        """Appends current frame data to internal lists for CSV export."""
+        """Appends current frame data to the frame log for CSV export."""
         if self.is_recording:
-            self.frames.append(self.frame_number)
-            self.trials.append(self.trial)
-            self.annotations.append(self.annotation)
-            self.camera_timestamps.append(self.camera_timestamp)
-            if self.tracking:
-                self.x_positions.append(self.x_position)
-                self.y_positions.append(self.y_position)
+            self.frame_log.append(
+                self.frame_number,
+                self.trial,
+                self.annotation,
+                self.camera_timestamp,
+                self.x_position,
+                self.y_position,
+            )
 
     def start_preview_window(self) -> QWidget:
         """Starts a low-frequency preview window for the GUI.
@@ -3,8 +3,8 @@ from __future__ import annotations
 import os
 import queue
 import subprocess
-import time
 import traceback
+from collections import OrderedDict
 from typing import Callable, Optional
 
 import cv2
@@ -13,18 +13,27 @@ import numpy as np
 from gpiod.line import Direction, Value
 from PyQt5.QtCore import (
     QMetaObject,
-    QMutex,
     QObject,
     QRect,
+    QRectF,
     Qt,
     QThread,
     pyqtSignal,
     pyqtSlot,
 )
-from PyQt5.QtGui import QColor, QGuiApplication, QImage, QPainter, QPixmap
+from PyQt5.QtGui import (
+    QColor,
+    QGuiApplication,
+    QImage,
+    QOpenGLTexture,
+    QOpenGLTextureBlitter,
+    QPainter,
+    QPixmap,
+)
 from PyQt5.QtWidgets import QApplication, QOpenGLWidget
 
 from village.classes.enums import ScreenActive
+from village.classes.frame_ring import FrameRing, VideoStats
 from village.classes.null_classes import NullScreen
 from village.devices.sound_device import sound_device
 from village.scripts.error_queue import error_queue
@@ -35,35 +44,29 @@ from village.settings import settings
 class VideoWorker(QObject):
     """Worker class for decoding video frames in a separate thread.
 
-    Uses OpenCV to read frames and serves them as QImages for display.
-    Maintains synchronization with real-time based on the video's FPS.
+    Uses OpenCV to read frames and converts them to RGBA in the preallocated
+    buffers of a FrameRing, each wrapped once in a QImage, so no image is
+    allocated or copied per frame. The decoding is paced at the video's FPS
+    relative to play(), and frames that will not be shown in time are skipped
+    without being converted.
     """
 
     finished = pyqtSignal()
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, capacity: int = 3) -> None:
         """Initializes the VideoWorker.
 
         Args:
             path (str): Path to the video file.
+            capacity (int): Number of frame buffers.
         """
         super().__init__()
         self.path = path
         self.cap: Optional[cv2.VideoCapture] = None
+        self.ring = FrameRing(capacity)
 
         self._running: bool = False
-        self.mtx = QMutex()
-
-        self._latest_img: Optional[QImage] = None
-        self._latest_idx: int = -1
-
-        self._served_img: Optional[QImage] = None
-        self._served_idx: int = -1
-
-        self._fps: float = 0.0
-        self._frame_dt: float = 0.0
-        self._play_start: float = 0.0
-        self._started: bool = False
+        self._images: list[QImage] = []
 
     @pyqtSlot()
     def run(self) -> None:
@@ -82,28 +85,38 @@ class VideoWorker(QObject):
             except Exception:
                 fps = 30.0
 
-            self._fps = fps
-            self._frame_dt = 1.0 / fps if fps > 0 else 0.0
-
-            produced_idx = -1
+            ring = self.ring
+            ring.set_fps(fps)
+            bgr: Optional[np.ndarray] = None
+            n = 0
 
             while self._running:
-                ok, bgr = self.cap.read()
-                if not ok:
-                    break
+                if not ring.wait_writable(n):
+                    continue
 
-                rgba = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
-                h, w = rgba.shape[:2]
-                img = QImage(rgba.data, w, h, QImage.Format_RGBA8888).copy()
+                if ring.buffers is not None and ring.late(n):
+                    if not self.cap.grab():
+                        break
+                    ring.skip(n)
+                    n += 1
+                    continue
 
-                produced_idx += 1
+                ok, bgr = self.cap.read(bgr)
+                if not ok:
+                    break
 
-                self.mtx.lock()
-                try:
-                    self._latest_img = img
-                    self._latest_idx = produced_idx
-                finally:
-                    self.mtx.unlock()
+                if ring.buffers is None:
+                    h, w = bgr.shape[:2]
+                    ring.allocate(h, w)
+                    self._images = [
+                        QImage(
+                            ring.buffers[i].data, w, h, 4 * w, QImage.Format_RGBA8888
+                        )
+                        for i in range(ring.capacity)
+                    ]
+                cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA, dst=ring.buffer(n))
+                ring.publish(n)
+                n += 1
 
         except Exception:
             try:
@@ -120,45 +133,43 @@ class VideoWorker(QObject):
     def get_latest_qimage(self) -> Optional[QImage]:
         """Returns the most appropriate video frame for the current time.
 
-        Calculates the target frame based on elapsed time since start.
+        The newest decoded frame that is due based on the elapsed time since
+        play(). The image is a view of a buffer of the ring, which is not
+        written until a newer frame is returned; use copy() to keep it longer.
 
         Returns:
             Optional[QImage]: The current video frame.
         """
-        if not self._started or self._frame_dt <= 0:
+        n = self.ring.select()
+        if n is None or not self._images:
             return None
+        return self._images[self.ring.slot(n)]
 
-        now = time.monotonic()
-        target_idx = int((now - self._play_start) / self._frame_dt)
+    def get_latest_frame(self) -> Optional[tuple[int, np.ndarray]]:
+        """Like get_latest_qimage, but returns the frame number and the RGBA
+        buffer of the frame, to upload it to a texture.
 
-        if self._served_idx == target_idx and self._served_img is not None:
-            return self._served_img
-
-        self.mtx.lock()
-        try:
-            latest_img = self._latest_img
-            latest_idx = self._latest_idx
-        finally:
-            self.mtx.unlock()
-
-        if latest_img is None or latest_idx < 0:
-            return self._served_img
-
-        if latest_idx >= target_idx:
-            self._served_idx = target_idx
-            self._served_img = latest_img
-            return self._served_img
-
-        return self._served_img
+        Returns:
+            Optional[tuple[int, np.ndarray]]: The frame number and buffer.
+        """
+        n = self.ring.select()
+        if n is None or self.ring.buffers is None:
+            return None
+        return n, self.ring.buffer(n)
 
     def play(self) -> None:
         """Sets the playback start time so get_latest_qimage starts serving frames."""
-        self._play_start = time.monotonic()
-        self._started = True
+        self.ring.play()
 
     def stop(self) -> None:
         """Stops the video decoding loop."""
         self._running = False
+        self.ring.close()
+
+    @property
+    def stats(self) -> VideoStats:
+        """Decoded, converted, shown and dropped frames and decode-ahead margin."""
+        return self.ring.stats()
 
 
 class Screen(QOpenGLWidget):
@@ -166,8 +177,22 @@ class Screen(QOpenGLWidget):
 
     This class handles the rendering loop, GPIO synchronization (for timestamps),
     and displaying images or video streams.
+
+    Images and videos can be drawn with QPainter (load_image, get_video_frame)
+    or streamed as OpenGL textures (draw_image_texture, draw_video_texture).
+    The textures are kept on the GPU: an image is uploaded once and a video
+    frame is uploaded into the same texture only when it changes, straight from
+    the buffer of the decoder, with no QImage conversion or copy. When a paint
+    uploads a new video frame the GPIO sync line stays active until the buffers
+    are swapped, so its falling edge marks when the frame is presented.
+
+    The images read from the media directory, and their textures, are kept in
+    a cache of the image_cache_size most recently used ones, keyed by filename
+    and modification time, so an edited file is read again.
     """
 
+    image_cache_size = 16
+
     def __init__(self, geometry: QRect) -> None:
         """Initializes the Screen.
 
@@ -211,6 +236,20 @@ class Screen(QOpenGLWidget):
         self.blend = False
         self.image: Optional[QPixmap] = None
 
+        # filename -> (modification time in ns, image)
+        self._image_cache: OrderedDict[str, tuple[int, QImage]] = OrderedDict()
+        self._textures: dict[str, QOpenGLTexture] = {}
+        self._stale_textures: list[QOpenGLTexture] = []
+        self._video_texture: Optional[QOpenGLTexture] = None
+        self._video_texture_frame = -1
+        self._blitter: Optional[QOpenGLTextureBlitter] = None
+        self._hold_sync = False
+
+        self._refresh_period = 1 / 60
+        self._last_swap: Optional[float] = None
+        self._swap_intervals: list[float] = []
+        self.frameSwapped.connect(self._on_frame_swapped)
+
         app = QApplication.instance()
         if app is not None:
             app.aboutToQuit.connect(self.stop_video)
@@ -259,6 +298,12 @@ class Screen(QOpenGLWidget):
             return
         self.active = True
         self._start_timing = time_utils.get_time_monotonic()
+        self._last_swap = None
+        self._swap_intervals = []
+        try:
+            self._refresh_period = 1 / self.screen().refreshRate()
+        except Exception:
+            pass
         if not self._swap_connected:
             self.frameSwapped.connect(self.update, Qt.ConnectionType.UniqueConnection)
             self._swap_connected = True
@@ -290,9 +335,181 @@ class Screen(QOpenGLWidget):
         Args:
             file (str): Filename of the image.
         """
-        media_directory = settings.get("MEDIA_DIRECTORY")
-        image_path = os.path.join(media_directory, file)
-        self.image = QPixmap(image_path)
+        self.image = QPixmap.fromImage(self._cached_image(file))
+
+    def preload_images(self, *files: str) -> None:
+        """Reads images from the media directory and keeps them in memory, so
+        load_image and draw_image_texture do not read the files again. Only
+        the last image_cache_size images are kept.
+
+        Args:
+            *files (str): Filenames of the images.
+        """
+        for file in files:
+            self._cached_image(file)
+
+    def clear_image_cache(self) -> None:
+        """Forgets the preloaded images and their textures."""
+        for file in list(self._image_cache):
+            self._forget_image(file)
+
+    def _cached_image(self, file: str) -> QImage:
+        path = os.path.join(settings.get("MEDIA_DIRECTORY"), file)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        cached = self._image_cache.get(file)
+        if cached is not None and cached[0] == mtime:
+            self._image_cache.move_to_end(file)
+            return cached[1]
+        self._forget_image(file)
+        image = QImage(path).convertToFormat(QImage.Format_RGBA8888)
+        # missing or unreadable files are not cached, they are tried again
+        if mtime is not None and not image.isNull():
+            self._image_cache[file] = (mtime, image)
+            while len(self._image_cache) > self.image_cache_size:
+                self._forget_image(next(iter(self._image_cache)))
+        return image
+
+    def _forget_image(self, file: str) -> None:
+        # textures can only be destroyed in paintGL, where the context is current
+        self._image_cache.pop(file, None)
+        texture = self._textures.pop(file, None)
+        if texture is not None:
+            self._stale_textures.append(texture)
+
+    def draw_image_texture(
+        self,
+        file: str,
+        x: int = 0,
+        y: int = 0,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> None:
+        """Draws an image from the media directory as an OpenGL texture.
+
+        The texture is created the first time the image is drawn, and again
+        when the file changes. Call it from the drawing function, before
+        opening a QPainter or between its beginNativePainting() and
+        endNativePainting().
+
+        Args:
+            file (str): Filename of the image.
+            x (int): Left of the image in the screen.
+            y (int): Top of the image in the screen.
+            width (Optional[int]): Width in the screen, that of the image if None.
+            height (Optional[int]): Height in the screen, that of the image if None.
+        """
+        image = self._cached_image(file)
+        if image.isNull():
+            return
+        texture = self._textures.get(file)
+        if texture is None:
+            texture = QOpenGLTexture(image, QOpenGLTexture.DontGenerateMipMaps)
+            texture.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
+            self._textures[file] = texture
+        self._blit(texture, x, y, width, height)
+
+    def draw_video_texture(
+        self,
+        x: int = 0,
+        y: int = 0,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+    ) -> bool:
+        """Draws the current video frame as an OpenGL texture.
+
+        The texture is allocated once per video and the frame is uploaded with
+        a sub-image upload from the buffer of the decoder, only when it is a
+        new frame. Call it from the drawing function like draw_image_texture.
+
+        Args:
+            x (int): Left of the video in the screen.
+            y (int): Top of the video in the screen.
+            width (Optional[int]): Width in the screen, that of the video if None.
+            height (Optional[int]): Height in the screen, that of the video if None.
+
+        Returns:
+            bool: True if a frame was drawn.
+        """
+        if not self._video_worker:
+            return False
+        latest = self._video_worker.get_latest_frame()
+        if latest is None:
+            return False
+        n, buffer = latest
+        h, w = buffer.shape[:2]
+        texture = self._video_texture
+        if texture is None or (texture.width(), texture.height()) != (w, h):
+            if texture is not None:
+                texture.destroy()
+            texture = QOpenGLTexture(QOpenGLTexture.Target2D)
+            texture.setFormat(QOpenGLTexture.RGBA8_UNorm)
+            texture.setSize(w, h)
+            texture.setMinMagFilters(QOpenGLTexture.Linear, QOpenGLTexture.Linear)
+            texture.allocateStorage(QOpenGLTexture.RGBA, QOpenGLTexture.UInt8)
+            self._video_texture = texture
+            self._video_texture_frame = -1
+        if n != self._video_texture_frame:
+            texture.setData(QOpenGLTexture.RGBA, QOpenGLTexture.UInt8, buffer)
+            self._video_texture_frame = n
+            self._hold_sync = True
+        self._blit(texture, x, y, width, height)
+        return True
+
+    def _blit(
+        self,
+        texture: QOpenGLTexture,
+        x: int,
+        y: int,
+        width: Optional[int],
+        height: Optional[int],
+    ) -> None:
+        if self._blitter is None:
+            self._blitter = QOpenGLTextureBlitter()
+            self._blitter.create()
+        target = QOpenGLTextureBlitter.targetTransform(
+            QRectF(
+                x,
+                y,
+                texture.width() if width is None else width,
+                texture.height() if height is None else height,
+            ),
+            QRect(0, 0, self.width_px, self.height_px),
+        )
+        self._blitter.bind()
+        self._blitter.blit(
+            texture.textureId(), target, QOpenGLTextureBlitter.OriginTopLeft
+        )
+        self._blitter.release()
+
+    def get_frame_timing(self) -> dict[str, float]:
+        """Timing of the buffer swaps since start_drawing().
+
+        Returns:
+            dict[str, float]: Number of swaps, mean and maximum interval in
+                seconds and swaps later than 1.5 refresh periods.
+        """
+        intervals = np.asarray(self._swap_intervals, dtype=np.float64)
+        if intervals.size == 0:
+            return {"swaps": 0, "mean": 0.0, "max": 0.0, "late": 0}
+        return {
+            "swaps": int(intervals.size + 1),
+            "mean": float(intervals.mean()),
+            "max": float(intervals.max()),
+            "late": int(np.count_nonzero(intervals > 1.5 * self._refresh_period)),
+        }
+
+    def _on_frame_swapped(self) -> None:
+        if self._hold_sync:
+            self._hold_sync = False
+            self._set_sync(Value.INACTIVE)
+        if self.active:
+            now = time_utils.get_time_monotonic()
+            if self._last_swap is not None:
+                self._swap_intervals.append(now - self._last_swap)
+            self._last_swap = now
 
     def _extract_audio(
         self, video_path: str
@@ -332,6 +549,7 @@ class Screen(QOpenGLWidget):
             file (str): Filename of the video.
         """
         self.stop_video()
+        self._video_texture_frame = -1
         media_directory = settings.get("MEDIA_DIRECTORY")
         video_path = os.path.join(media_directory, file)
         self._audio_left, self._audio_right = self._extract_audio(video_path)
@@ -374,6 +592,9 @@ class Screen(QOpenGLWidget):
     def get_video_frame(self) -> Optional[QImage]:
         """Retrieves current video frame if available.
 
+        The image shares its memory with the video decoder and is only valid
+        until a newer frame is returned, use copy() to keep it.
+
         Returns:
             Optional[QImage]: The current video frame or None.
         """
@@ -381,6 +602,17 @@ class Screen(QOpenGLWidget):
             return None
         return self._video_worker.get_latest_qimage()
 
+    def get_video_stats(self) -> Optional[VideoStats]:
+        """Retrieves the frame counters of the current video if available.
+
+        Returns:
+            Optional[VideoStats]: Decoded, converted, shown and dropped frames
+                and the decode-ahead margin, or None.
+        """
+        if not self._video_worker:
+            return None
+        return self._video_worker.stats
+
     def paintGL(self) -> None:
         """Main rendering loop called by OpenGL widget update."""
         if not self.active or self._draw_fn is None:
@@ -389,11 +621,11 @@ class Screen(QOpenGLWidget):
             self.elapsed_time = 0.0
             return
 
-        if self._gpio_request is not None:
-            try:
-                self._gpio_request.set_value(self._gpio_line_offset, Value.ACTIVE)
-            except Exception:
-                pass
+        for texture in self._stale_textures:
+            texture.destroy()
+        self._stale_textures = []
+
+        self._set_sync(Value.ACTIVE)
 
         now = time_utils.get_time_monotonic()
         self.elapsed_time = now - self._start_timing
@@ -404,9 +636,14 @@ class Screen(QOpenGLWidget):
         except Exception:
             pass
 
+        if not self._hold_sync:
+            self._set_sync(Value.INACTIVE)
+
+    def _set_sync(self, value: Value) -> None:
+        """Sets the GPIO sync line."""
         if self._gpio_request is not None:
             try:
-                self._gpio_request.set_value(self._gpio_line_offset, Value.INACTIVE)
+                self._gpio_request.set_value(self._gpio_line_offset, value)
             except Exception:
                 pass
 
@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
 
+from village.classes.alarm_queue import AlarmQueue
 from village.classes.null_classes import NullTelegramBot
 from village.devices.camera import cam_box, cam_corridor
 from village.manager import manager
@@ -30,8 +31,12 @@ class TelegramBot:
         error (str): Error message.
         thread (threading.Thread): Background thread for the bot loop.
         application (Application): The python-telegram-bot application instance.
+        alarm_queue (AlarmQueue): Pending alarms, sent from the bot loop.
     """
 
+    api_url = "https://api.telegram.org"
+    send_timeout = 10
+
     def __init__(self) -> None:
         """Initializes the TelegramBot and starts the background loop."""
         self.token = settings.get("TELEGRAM_TOKEN")
@@ -40,6 +45,7 @@ class TelegramBot:
         self.connected = False
         self.error_running = False
         self.error = ""
+        self.alarm_queue = AlarmQueue()
 
         self.thread = threading.Thread(target=self.botloop, daemon=True)
         self.thread.start()
@@ -55,17 +61,31 @@ class TelegramBot:
         await update.message.reply_text(text)
 
     def alarm(self, message: str) -> None:
-        """Sends an alarm message to the configured chat.
+        """Queues an alarm message for the configured chat.
+
+        Returns immediately; the message is sent from the bot loop.
 
         Args:
             message (str): The message content.
         """
-        try:
-            url = "https://api.telegram.org/bot%s/sendMessage" % self.token
-            data = parse.urlencode({"chat_id": self.chat, "text": message})
-            request.urlopen(url, data.encode("utf-8"))
-        except Exception:
-            log.error("Telegram error sending alarm", exception=traceback.format_exc())
+        self.alarm_queue.put(message)
+
+    def send_message(self, message: str) -> None:
+        """Sends a message to the configured chat, raising on failure.
+
+        Args:
+            message (str): The message content.
+        """
+        url = "%s/bot%s/sendMessage" % (self.api_url, self.token)
+        data = parse.urlencode({"chat_id": self.chat, "text": message})
+        with request.urlopen(
+            url, data.encode("utf-8"), timeout=self.send_timeout
+        ) as response:
+            response.read()
+
+    def alarm_failed(self, message: str) -> None:
+        """Logs an alarm that could not be sent after all retries."""
+        log.error("Telegram error sending alarm: " + message)
 
     async def report(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Generates and sends a report for the specified number of hours.
@@ -150,8 +170,7 @@ class TelegramBot:
         except TypeError:
             pass
         self.connected = True
-        while True:
-            await asyncio.sleep(1)
+        await self.alarm_queue.run(self.send_message, self.alarm_failed)
 
     async def botloop_starttask(self) -> None:
         """Starts the main bot task."""
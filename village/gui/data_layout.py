@@ -44,6 +44,7 @@ from PyQt5.QtWidgets import (
 )
 
 from village.classes.enums import DataTable, State
+from village.classes.session_store import read_subject_history
 from village.custom_classes.calibration_base import CalibrationBase
 from village.gui.layout import Layout
 from village.manager import manager
@@ -777,7 +778,7 @@ class DataLayout(Layout):
                     cast(pd.Series, self.page1Layout.get_selected_row_series())
                 )
                 try:
-                    df = pd.read_csv(path, sep=";")
+                    df = read_subject_history(path)
                     name = cast(pd.Series, self.page1Layout.get_selected_row_series())[
                         "name"
                     ]
@@ -2065,7 +2066,7 @@ class SubjectsLayout(Layout):
                 cast(pd.Series, self.page1Layout.get_selected_row_series())
             )
             try:
-                df = pd.read_csv(path, sep=";")
+                df = read_subject_history(path)
                 name = cast(pd.Series, self.page1Layout.get_selected_row_series())[
                     "name"
                 ]
@@ -5,6 +5,7 @@ from pathlib import Path
 from PyQt5.QtGui import QFont, QGuiApplication, QIcon
 from PyQt5.QtWidgets import QApplication
 
+from village.classes.collection import close_collections
 from village.devices.camera import cam_box, cam_corridor
 from village.devices.sound_device import sound_device
 from village.gui.gui_window import GuiWindow
@@ -48,7 +49,10 @@ class Gui:
         log.end("VILLAGE")
         cam_corridor.stop_recording()
         cam_box.stop_recording()
+        cam_corridor.stop_camera()
+        cam_box.stop_camera()
         sound_device.shutdown()
+        close_collections(timeout=10)
         self.q_app.quit()
         sys.exit()
 
@@ -64,7 +68,10 @@ class Gui:
             pass
         cam_corridor.stop_recording()
         cam_box.stop_recording()
+        cam_corridor.stop_camera()
+        cam_box.stop_camera()
         sound_device.shutdown()
+        close_collections(timeout=10)
         settings.sync()
         self.q_app.quit()
         python = sys.executable
@@ -6,7 +6,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Callable
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from PyQt5.QtCore import Qt, QTime
+from PyQt5.QtCore import Qt, QTime, QTimer
 from PyQt5.QtGui import QCloseEvent, QFont, QPixmap, QWheelEvent
 from PyQt5.QtWidgets import (
     QComboBox,
@@ -650,6 +650,7 @@ class Layout(QGridLayout):
                 log.info("Going to OPEN_DOOR2_STOP State")
         elif btn_text == "STOP SYNC":
             manager.after_session.cancel_event.set()
+            manager.sync_scheduler.cancel()
         elif btn_text == "CHANGE STATE":
             self._change_state_dialog()
             return
@@ -676,6 +677,9 @@ class Layout(QGridLayout):
         elif manager.state == State.WAIT:
             msg.setText("Select an action:")
             force_sync = msg.addButton("Force data sync", QMessageBox.AcceptRole)
+            stop_sync = None
+            if manager.sync_scheduler.pending:
+                stop_sync = msg.addButton("Stop data sync", QMessageBox.AcceptRole)
             subject_inside = msg.addButton(
                 "Subject is inside the box", QMessageBox.AcceptRole
             )
@@ -687,6 +691,10 @@ class Layout(QGridLayout):
                 manager.state = State.SYNC
                 log.info("Going to SYNC State")
                 self.update_gui()
+            elif stop_sync is not None and msg.clickedButton() == stop_sync:
+                log.info("Data sync stopped")
+                manager.sync_scheduler.cancel()
+                self.update_gui()
             elif msg.clickedButton() == subject_inside:
                 manager.state = State.WAIT_SUBJECT_EXIT
                 log.info("Going to WAIT_SUBJECT_EXIT State")
@@ -702,7 +710,7 @@ class Layout(QGridLayout):
     def online_button_clicked(self) -> None:
         """Handles the online plots button click to show or update the plot window."""
         try:
-            manager.online_plot.update_canvas(manager.task.session_df)
+            manager.online_plot.update_session(manager.task.session_table)
         except Exception:
             log.error(
                 "Error in online plot",
@@ -712,7 +720,7 @@ class Layout(QGridLayout):
 
         if not manager.online_plot.active:
             manager.online_plot.active = True
-            manager.online_plot.update_canvas(manager.task.session_df.copy())
+            manager.online_plot.update_session(manager.task.session_table)
             geom = (
                 self.column_width * 10,
                 self.row_height * 5,
@@ -1014,8 +1022,21 @@ class OnlinePlotDialog(QDialog):
                 self.canvas.draw_idle()
             except Exception:
                 pass
+        # the trials appended by incremental plots are drawn from the GUI thread
+        self.draw_timer = QTimer()
+        self.draw_timer.setInterval(100)
+        self.draw_timer.timeout.connect(self.draw_pending)
+        self.draw_timer.start()
+
+    def draw_pending(self) -> None:
+        """Draws the trials added to the plot since the last call."""
+        try:
+            manager.online_plot.draw_pending()
+        except Exception:
+            pass
 
     def closeEvent(self, event) -> None:
         """Handles the close event to ensure the plot is properly closed."""
+        self.draw_timer.stop()
         manager.online_plot.close()
         super().closeEvent(event)
@@ -22,6 +22,7 @@ from PyQt5.QtWidgets import (
 )
 
 from village.classes.enums import State
+from village.classes.session_store import read_subject_history
 from village.classes.subject import Subject
 from village.custom_classes.task_base import TaskBase
 from village.gui.layout import Layout
@@ -433,7 +434,7 @@ class TasksLayout(Layout):
                     subject_path = str(
                         Path(sessions_directory, subject, subject + ".csv")
                     )
-                    manager.task.training.df = pd.read_csv(subject_path, sep=";")
+                    manager.task.training.df = read_subject_history(subject_path)
                     manager.task.training.subject = manager.task.subject
                     last_task = manager.task.training.df["task"].iloc[-1]
                     manager.task.training.last_task = last_task
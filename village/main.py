@@ -222,7 +222,7 @@ def system_run() -> None:
             if manager.task.current_trial > trial and plot_timer.has_elapsed():
                 trial = manager.task.current_trial
                 try:
-                    manager.online_plot.update_canvas(manager.task.session_df.copy())
+                    manager.online_plot.update_session(manager.task.session_table)
                 except Exception:
                     pass
         else:
@@ -243,6 +243,11 @@ def system_run() -> None:
         if manager.state != State.DETECTION:
             id, multiple = rfid.get_id()
 
+        # the background sync only runs while nobody is trying to enter the box
+        manager.sync_scheduler.update(
+            idle=manager.state in (State.WAIT, State.SYNC) and id == ""
+        )
+
         match manager.state:
             case State.WAIT:
                 # All subjects are at home, waiting for RFID detection
@@ -569,7 +574,11 @@ def system_run() -> None:
                 time_utils.sync()
                 if manager.after_session_flag:
                     manager.after_session_flag = False
-                    manager.after_session.run()
+                    if settings.get("BACKGROUND_SYNC") == Active.ON:
+                        manager.sync_scheduler.request(manager.after_session)
+                    else:
+                        manager.after_session.cancel_event.clear()
+                        manager.after_session.run()
                 if manager.change_cycle_flag:
                     manager.change_cycle_flag = False
                     manager.change_cycle.run()
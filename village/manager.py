@@ -24,6 +24,7 @@ from village.classes.enums import (
 )
 from village.classes.null_classes import NullCamera, NullTouch
 from village.classes.subject import Subject
+from village.classes.sync_scheduler import SyncScheduler
 from village.controllers.arduino_controller import arduino
 from village.controllers.bpod_controller import bpod
 from village.custom_classes.after_session_base import AfterSessionBase
@@ -99,6 +100,7 @@ class Manager:
         self.online_plot: OnlinePlotBase = OnlinePlotBase()
         self.after_session: AfterSessionBase = AfterSessionBase()
         self.change_cycle: ChangeCycleBase = ChangeCycleBase()
+        self.sync_scheduler = SyncScheduler()
         self.camera_trigger: CameraTriggerBase = CameraTriggerBase()
         self.camera_draw: CameraDrawBase = CameraDrawBase()
         self.touch_trigger: TouchTriggerBase = TouchTriggerBase()
@@ -193,6 +195,7 @@ class Manager:
             ["date", "type", "subject", "description"],
             [str, str, str, str],
         )
+        self.events.index_by_date(["type", "description"])
         self.sessions_summary = Collection()
         self.sessions_summary.create_data_collection(
             "sessions_summary.csv",
@@ -209,6 +212,7 @@ class Manager:
             ],
             [str, str, str, float, str, float, int, float, str],
         )
+        self.sessions_summary.index_by_date()
         self.subjects = Collection()
         self.subjects.create_data_collection(
             "subjects.csv",
@@ -264,6 +268,8 @@ class Manager:
         task_name = self.task.name
         rfid_reader_name = self.rfid_reader.name
         cycle_text = self.cycle_change_detector.cycle_text
+        if self.sync_scheduler.running and self.sync_scheduler.progress is not None:
+            state_description += ", syncing: " + self.sync_scheduler.progress.text()
         try:
             project_text = settings.get("PROJECT_DIRECTORY")
             project_text = os.path.basename(project_text.rstrip("/"))
@@ -683,38 +689,29 @@ class Manager:
                    non-session subjects, low water subjects, and sync status boolean.
         """
         minimum_water = float(settings.get("MINIMUM_WATER_SUBJECT_24H"))
-        events = self.events.df.copy()
-        subjects = self.subjects.df.copy()
-        sessions_summary = self.sessions_summary.df.copy()
-
-        events["date"] = pd.to_datetime(events["date"])
-        sessions_summary["date"] = pd.to_datetime(sessions_summary["date"])
+        subjects = self.subjects.df
 
         time_hours_ago = time_utils.hours_ago(hours)
 
+        # only the entries of the last hours, type and description are categorical
+        # so the string comparisons are done once per distinct value
+        events = self.events.window(time_hours_ago)
+        sessions_summary = self.sessions_summary.window(time_hours_ago)
+
         detections = events[
-            (
-                events["description"].str.startswith(
-                    ("Subject not", "Detection in", "Large", "Multiple")
-                )
-                | (events["type"] == "START")
-            )
-            & (events["date"] >= time_hours_ago)
+            events["description"]
+            .str.startswith(("Subject not", "Detection in", "Large", "Multiple"))
+            .fillna(False)
+            .astype(bool)
+            | (events["type"] == "START")
         ]
 
-        sessions = events[
-            (events["type"] == "START") & (events["date"] >= time_hours_ago)
-        ]
-        syncs = events[
-            (events["description"] == "Sync completed successfully")
-            & (events["date"] >= time_hours_ago)
-        ]
+        sessions = events[events["type"] == "START"]
+        syncs = events[events["description"] == "Sync completed successfully"]
         sync = True
         if len(syncs) == 0 and len(sessions) > 0:
             sync = False
 
-        sessions_summary = sessions_summary[sessions_summary["date"] >= time_hours_ago]
-
         subject_detections = detections.groupby("subject").size().to_dict()
         subject_sessions = sessions.groupby("subject").size().to_dict()
         subject_water = sessions_summary.groupby("subject")["water"].sum().to_dict()
@@ -5,6 +5,7 @@
 
 import logging
 import math
+import select
 import socket
 import time
 
@@ -14,9 +15,10 @@ from village.controllers.trial_recorder import TrialRecorder
 from village.pybpodapi.bpod.trial import EventOccurrence, Trial
 from village.pybpodapi.hardware.channels import ChannelType
 from village.pybpodapi.hardware.hardware import Hardware
+from village.pybpodapi.state_machine.state_machine_builder import StateMachineCache
 from village.scripts.time_utils import time_utils
 
-from .non_blockingsocketreceive import NonBlockingSocketReceive
+from .non_blockingsocketreceive import NonBlockingSocketReceive, SelectSocketReceive
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,10 @@ class BpodBase(object):
     class ChannelTypes(ChannelType):
         pass
 
+    # maximum time the event-driven loop blocks waiting for serial or socket data,
+    # so loop_handler keeps being called while the state machine is idle
+    EVENT_WAIT_TIMEOUT = 0.05
+
     def __init__(
         self,
         serial_port,
@@ -49,6 +55,8 @@ class BpodBase(object):
         target_firmware,
         bnc_ports,
         behavior_ports,
+        event_driven=False,
+        reuse_state_machine=False,
     ):
         self.recorder = TrialRecorder()
         self._current_trial = None
@@ -62,11 +70,16 @@ class BpodBase(object):
         self.target_firmware = target_firmware
         self.bnc_ports = bnc_ports
         self.behavior_ports = behavior_ports
+        self.event_driven = event_driven
+        self.reuse_state_machine = reuse_state_machine
         self._hardware = Hardware()  # type: Hardware
         self.bpod_modules = None
         self.bpod_start_timestamp = None
         self.raspberry_trial_start = 0.0
         self._new_sma_sent = False  # type: bool
+        self._sma_cache = StateMachineCache()
+        # message of the state machine installed on the Bpod, None if unknown
+        self._installed_sma_message = None
         self._skip_all_trials = False
 
         self._hardware.sync_channel = (
@@ -116,6 +129,8 @@ class BpodBase(object):
 
         logger.info("Starting Bpod")
 
+        self._installed_sma_message = None
+
         self._bpodcom_connect(self.serial_port, self.baudrate)
 
         try:
@@ -163,7 +178,10 @@ class BpodBase(object):
         if self.net_port is not None:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.sock.bind(("0.0.0.0", self.net_port))
-            self.socketin = NonBlockingSocketReceive(self.sock)
+            if self.event_driven:
+                self.socketin = SelectSocketReceive(self.sock)
+            else:
+                self.socketin = NonBlockingSocketReceive(self.sock)
         else:
             self.sock = None
             self.socketin = None
@@ -218,20 +236,17 @@ class BpodBase(object):
         if self._skip_all_trials is True:
             return
 
-        logger.info("Sending state machine")
-
         sma.update_state_numbers()
+        message = self._sma_cache.build(sma, run_asap)
 
-        state_machine_body = (
-            sma.build_message()
-            + sma.build_message_global_timer()
-            + sma.build_message_32_bits()
-        )
-
-        self._bpodcom_send_state_machine(
-            sma.build_header(run_asap, len(state_machine_body)) + state_machine_body
-        )
+        # the Bpod runs the last installed state machine again if none is sent
+        if self.reuse_state_machine and message == self._installed_sma_message:
+            logger.info("State machine already installed")
+            return
 
+        logger.info("Sending state machine")
+        self._bpodcom_send_state_machine(message)
+        self._installed_sma_message = message
         self._new_sma_sent = True
 
     def run_state_machine(self, sma):
@@ -288,6 +303,7 @@ class BpodBase(object):
                     time.sleep(1)
                     self._arcom.serial_object.reset_input_buffer()
                     self._arcom.serial_object.reset_output_buffer()
+                    self._installed_sma_message = None
                     self.send_state_machine(sma)
                     self.trial_timestamps = []
                     self._bpodcom_run_state_machine()
@@ -301,6 +317,7 @@ class BpodBase(object):
                 time.sleep(1)
                 self._arcom.serial_object.reset_input_buffer()
                 self._arcom.serial_object.reset_output_buffer()
+                self._installed_sma_message = None
                 self.send_state_machine(sma)
                 self.trial_timestamps = []
                 self._bpodcom_run_state_machine()
@@ -308,6 +325,8 @@ class BpodBase(object):
                 status = self._bpodcom_state_machine_installation_status()
                 self._new_sma_sent = False
                 bpod_trial_start = self._bpodcom_get_trial_timestamp_start()
+        else:
+            bpod_trial_start = self._bpodcom_get_trial_timestamp_start()
 
         if self.bpod_start_timestamp is None:
             self.bpod_start_timestamp = bpod_trial_start
@@ -315,6 +334,7 @@ class BpodBase(object):
         self.recorder.start_trial(
             controller_timestamp=0.0, raspberry_timestamp=self.raspberry_trial_start
         )
+        self.recorder.declare_states(sma.state_names)
         self.recorder.enter_state(sma.state_names[0], 0.0)
         # create a list of executed states
         state_change_indexes = []
@@ -326,7 +346,10 @@ class BpodBase(object):
         sma.is_running = True
         while sma.is_running:
 
-            time.sleep(0.001)
+            if self.event_driven:
+                self._wait_for_input(self.EVENT_WAIT_TIMEOUT)
+            else:
+                time.sleep(0.001)
 
             # read commands from a net socket
             if self.socketin is not None:
@@ -472,6 +495,28 @@ class BpodBase(object):
 
     # PRIVATE METHODS
 
+    def _wait_for_input(self, timeout):
+        """
+        Block until the Bpod serial port or the softcode socket has data to read,
+        or until timeout (in seconds) expires.
+
+        Used instead of sleep-polling when event_driven is enabled, so opcodes are
+        dispatched as soon as they arrive without keeping a core busy.
+
+        :param float timeout: maximum time to wait in seconds
+        :return: True if any input is ready, False on timeout
+        :rtype: bool
+        """
+        fds = [self._arcom.fileno()]
+        if self.socketin is not None:
+            fds.append(self.socketin.fileno())
+        try:
+            ready, _, _ = select.select(fds, [], [], timeout)
+        except (OSError, ValueError):
+            # the port was closed under us; let data_available raise the error
+            return True
+        return len(ready) > 0
+
     def __process_opcode(self, sma, opcode, data, state_change_indexes):
         """
         Process data from bpod board given an opcode
@@ -497,105 +542,41 @@ class BpodBase(object):
             else:
                 event_timestamp = None
 
+            transition_table = sma.transition_table
             for event_id in current_events:
                 if event_id == 255:
                     sma.is_running = False
+                    continue
+
+                event_name = sma.event_names[event_id]
+                current_trial.add_event(
+                    EventOccurrence(event_id, event_name, event_timestamp)
+                )
+                self.recorder.add_controller_event(event_name, event_timestamp)
+                self.trial_timestamps.append(event_timestamp)
+
+                # only the first transition of a batch of events changes the state
+                if transition_event_found or math.isnan(sma.current_state):
+                    continue
+
+                next_state = int(transition_table[sma.current_state, event_id])
+                if next_state == sma.NO_TRANSITION:
+                    continue
+                if next_state == sma.EXIT:
+                    sma.current_state = float("NaN")
+                elif sma.use_255_back_signal and next_state == 255:
+                    sma.current_state = current_trial.states[-2]
                 else:
-                    event_name = sma.hardware.channels.get_event_name(event_id)
-                    current_trial.add_event(
-                        EventOccurrence(event_id, event_name, event_timestamp)
+                    sma.current_state = next_state
+
+                if not math.isnan(sma.current_state):
+                    current_trial.states.append(sma.current_state)
+                    state_change_indexes.append(
+                        len(current_trial.events_occurrences) - 1
                     )
-                    self.recorder.add_controller_event(event_name, event_timestamp)
-                    self.trial_timestamps.append(event_timestamp)
-
-                    # input matrix
-                    if not transition_event_found:
-                        logger.debug("transition event not found")
-                        logger.debug("Current state: %s", sma.current_state)
-                        for transition in sma.input_matrix[sma.current_state]:
-                            logger.debug("Transition: %s", transition)
-                            if transition[0] == event_id:
-                                if sma.use_255_back_signal and transition[1] == 255:
-                                    sma.current_state = current_trial.states[-2]
-                                else:
-                                    sma.current_state = transition[1]
-
-                                if not math.isnan(sma.current_state):
-                                    logger.debug("adding states input matrix")
-                                    current_trial.states.append(sma.current_state)
-                                    state_change_indexes.append(
-                                        len(current_trial.events_occurrences) - 1
-                                    )
-
-                                transition_event_found = True
-
-                    # state timer matrix
-                    if not transition_event_found:
-                        this_state_timer_transition = sma.state_timer_matrix[
-                            sma.current_state
-                        ]
-                        if event_id == sma.hardware.channels.events_positions.Tup:
-                            if not (this_state_timer_transition == sma.current_state):
-                                if (
-                                    sma.use_255_back_signal
-                                    and this_state_timer_transition == 255
-                                ):
-                                    sma.current_state = current_trial.states[-2]
-                                else:
-                                    sma.current_state = this_state_timer_transition
-
-                                if not math.isnan(sma.current_state):
-                                    logger.debug("adding states state timer matrix")
-                                    current_trial.states.append(sma.current_state)
-                                    state_change_indexes.append(
-                                        len(current_trial.events_occurrences) - 1
-                                    )
-                                transition_event_found = True
-
-                    # global timers start matrix
-                    if not transition_event_found:
-                        for transition in sma.global_timers.start_matrix[
-                            sma.current_state
-                        ]:
-                            if transition[0] == event_id:
-                                if sma.use_255_back_signal and transition[1] == 255:
-                                    sma.current_state = current_trial.states[-2]
-                                else:
-                                    sma.current_state = transition[1]
-
-                                if not math.isnan(sma.current_state):
-                                    logger.debug(
-                                        "adding states global timers start matrix"
-                                    )
-                                    current_trial.states.append(sma.current_state)
-                                    state_change_indexes.append(
-                                        len(current_trial.events_occurrences) - 1
-                                    )
-                                transition_event_found = True
-
-                    # global timers end matrix
-                    if not transition_event_found:
-                        for transition in sma.global_timers.end_matrix[
-                            sma.current_state
-                        ]:
-                            if transition[0] == event_id:
-
-                                if sma.use_255_back_signal and transition[1] == 255:
-                                    sma.current_state = current_trial.states[-2]
-                                else:
-                                    sma.current_state = transition[1]
-
-                                if not math.isnan(sma.current_state):
-                                    logger.debug(
-                                        "adding states global timers end matrix"
-                                    )
-                                    current_trial.states.append(sma.current_state)
-                                    state_change_indexes.append(
-                                        len(current_trial.events_occurrences) - 1
-                                    )
-                                transition_event_found = True
-
-                logger.debug("States indexes: %s", current_trial.states)
+                transition_event_found = True
+
+            logger.debug("States indexes: %s", current_trial.states)
 
             if transition_event_found and not math.isnan(sma.current_state):
                 state_name = sma.state_names[sma.current_state]
@@ -623,9 +604,7 @@ class BpodBase(object):
             timestamps = self.trial_timestamps
         else:
             timestamps = self._bpodcom_read_alltimestamps()
-            timestamps = [
-                float(t) * self._hardware.times_scale_factor for t in timestamps
-            ]
+            timestamps = (timestamps * self._hardware.times_scale_factor).tolist()
 
             # update the timestamps of the events
             for event, timestamp in zip(current_trial.events_occurrences, timestamps):
@@ -639,30 +618,16 @@ class BpodBase(object):
         """
         Finalizes the trial in the TrialRecorder.
         States and events are already recorded in real-time during the trial loop.
-        Here we close the last state, mark trial end, and register unvisited states.
+        Here we close the last state and mark trial end. The unvisited states
+        were declared to the recorder at trial start and get NaN entries.
         """
         current_trial = self._current_trial
 
-        # Track which states were visited (for unvisited NaN entries)
-        visited_states = [0] * sma.total_states_added
-        for state_idx in current_trial.states:
-            visited_states[state_idx] = 1
-
         # Close last state and mark trial end
         if len(current_trial.state_timestamps) > 1:
             self.recorder.end_trial(current_trial.state_timestamps[-1])
 
-        # Add unvisited states with NaN
-        for i in range(sma.total_states_added):
-            if not visited_states[i]:
-                state_name = sma.state_names[i]
-                key_start = f"STATE_{state_name}_START"
-                key_end = f"STATE_{state_name}_END"
-                if key_start not in self.recorder._states_start:
-                    self.recorder._states_start[key_start] = [float("nan")]
-                    self.recorder._states_end[key_end] = [float("nan")]
-
-        logger.debug("Trial recorded: %s event types", len(self.recorder._events))
+        logger.debug("Trial recorded: %s events", self.recorder.n_events)
 
     def find_module_by_name(self, name):
         """
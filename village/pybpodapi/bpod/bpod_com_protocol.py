@@ -37,6 +37,8 @@ class BpodCOMProtocol(BpodBase):
         target_firmware,
         bnc_ports,
         behavior_ports,
+        event_driven=False,
+        reuse_state_machine=False,
     ):
         super(BpodCOMProtocol, self).__init__(
             serial_port,
@@ -47,6 +49,8 @@ class BpodCOMProtocol(BpodBase):
             target_firmware,
             bnc_ports,
             behavior_ports,
+            event_driven,
+            reuse_state_machine,
         )
 
         self._arcom = None  # type: ArCOM
@@ -510,12 +514,12 @@ class BpodCOMProtocol(BpodBase):
         A new incoming timestamps message is available.
         Read number of timestamps to be sent and then read timestamps array.
 
-        :return: timestamps array
-        :rtype: list(float)
+        :return: timestamps array, in hardware cycles
+        :rtype: numpy.ndarray
         """
         n_timestamps = self._arcom.read_uint16()  # type: int
 
-        timestamps = self._arcom.read_uint32_array(array_len=n_timestamps)
+        timestamps = self._arcom.read_array(n_timestamps, "<u4")
 
         logger.debug("Received timestamps: %s", timestamps)
 
@@ -0,0 +1,575 @@
+import heapq
+import logging
+import os
+import select
+import struct
+import threading
+import time
+import tty
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+
+from village.pybpodapi.com.recv_msg_headers import ReceiveMessageHeader
+from village.pybpodapi.com.send_msg_headers import SendMessageHeader
+from village.pybpodapi.hardware.hardware import Hardware
+
+logger = logging.getLogger(__name__)
+
+
+class BpodEmulator(object):
+    """
+    Software Bpod state machine that speaks the ArCOM protocol over a pty pair,
+    so BpodCOMProtocol, BpodController and the tasks can run without hardware.
+
+    It answers the handshake, firmware and hardware description requests,
+    installs the state machines sent by the host and runs them: state timers,
+    input, global timer, global counter and condition transitions, softcode
+    outputs, opcode 1 event messages (with live timestamps or the end of trial
+    download) and opcode 2 softcode messages.
+
+    Input events are scripted with pokes, a function that receives the trial
+    number (starting at 1) and returns a list of (time, event name) tuples, in
+    seconds from the start of the trial. Events can also be injected while a
+    trial runs with poke(). The clock of the emulator runs speed times faster
+    than the wall clock, so long tasks can be run in a few seconds; all the
+    timestamps sent to the host are in emulated time.
+
+    Example:
+
+    .. code-block:: python
+
+        with BpodEmulator(speed=100, pokes=lambda trial: [(0.5, "Port1In")]) as em:
+            bpod = Bpod(serial_port=em.port, ...)
+
+    :ivar str port: path of the serial port to open from the host
+    :ivar Hardware hardware: hardware description sent to the host
+    :ivar float speed: emulated seconds per wall-clock second
+    :ivar int trials: number of trials completed
+    :ivar int events: number of events sent to the host
+    :ivar dict outputs: last value written to each output channel
+    """
+
+    FIRMWARE_VERSION = 23
+    MACHINE_TYPE = 3
+    SERIAL_MESSAGE_MAX_BYTES = 3
+
+    def __init__(
+        self,
+        inputs="UUUXBBWWPPPPPPPP",
+        outputs="UUUXBBWWPPPPPPPPVVVVVVVV",
+        max_states=256,
+        cycle_period=100,
+        max_serial_events=60,
+        n_global_timers=16,
+        n_global_counters=8,
+        n_conditions=16,
+        live_timestamps=True,
+        speed=1.0,
+        pokes=None,
+    ):
+        hardware = Hardware()
+        hardware.inputs = list(inputs)
+        hardware.outputs = list(outputs)
+        hardware.max_states = max_states
+        hardware.cycle_period = cycle_period
+        hardware.max_serial_events = max_serial_events
+        hardware.n_global_timers = n_global_timers
+        hardware.n_global_counters = n_global_counters
+        hardware.n_conditions = n_conditions
+        hardware.inputs_enabled = [1] * len(inputs)
+        hardware.live_timestamps = live_timestamps
+        self.hardware = hardware
+        self._setup_channels([])
+
+        self.speed = speed
+        self.pokes = pokes
+        self.trials = 0
+        self.events = 0
+        self.outputs = {}
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._wake_r, self._wake_w = os.pipe()
+        self._injected = deque()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._t0 = time.monotonic()
+        self._sma = None
+        self._new_sma = None
+        self._running = False
+
+    # PUBLIC METHODS
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        os.write(self._wake_w, b"\0")
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave, self._wake_r, self._wake_w):
+            os.close(fd)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def poke(self, event_name):
+        """
+        Injects an input event at the current time of the running trial
+
+        :param str event_name: name of the event, e.g. 'Port1In'
+        """
+        self._injected.append(self.hardware.channels.event_names.index(event_name))
+        os.write(self._wake_w, b"\0")
+
+    def now(self):
+        """
+        :return: emulated seconds since the session clock was reset
+        :rtype: float
+        """
+        return (time.monotonic() - self._t0) * self.speed
+
+    # HARDWARE
+
+    def _setup_channels(self, n_serial_events):
+        modules = [
+            SimpleNamespace(
+                connected=False,
+                event_names=[],
+                n_serial_events=(
+                    n_serial_events[i]
+                    if i < len(n_serial_events)
+                    else self._default_serial_events()
+                ),
+            )
+            for i in range(self.hardware.inputs.count("U"))
+        ]
+        self.hardware.setup(modules)
+        channels = self.hardware.channels
+
+        # input channel and value changed by each event, for the conditions
+        self._event_channel = {}
+        for channel, name in enumerate(channels.input_channel_names):
+            for suffix, value in (("In", 1), ("Out", 0), ("High", 1), ("Low", 0)):
+                if name + suffix in channels.event_names:
+                    event_id = channels.event_names.index(name + suffix)
+                    self._event_channel[event_id] = (channel, value)
+
+    def _default_serial_events(self):
+        return int(
+            self.hardware.max_serial_events / (self.hardware.inputs.count("U") + 1)
+        )
+
+    # SERIAL
+
+    def _write(self, data):
+        os.write(self._master, bytes(data))
+
+    def _read(self, n):
+        data = b""
+        while len(data) < n:
+            ready, _, _ = select.select([self._master], [], [], 1)
+            if not ready:
+                raise IOError("Bpod emulator: incomplete message from the host")
+            data += os.read(self._master, n - len(data))
+        return data
+
+    def _run(self):
+        while not self._stop.is_set():
+            due = self._next_due()
+            timeout = None if due is None else max(0.0, (due - self.now()) / self.speed)
+            try:
+                ready, _, _ = select.select(
+                    [self._master, self._wake_r], [], [], timeout
+                )
+            except (OSError, ValueError):
+                return
+            if self._wake_r in ready:
+                os.read(self._wake_r, 1024)
+            if self._master in ready:
+                try:
+                    command = os.read(self._master, 1)
+                except OSError:
+                    return
+                if command:
+                    try:
+                        self._handle_command(chr(command[0]))
+                    except IOError:
+                        logger.warning("Bpod emulator: %s", command, exc_info=True)
+            while self._injected:
+                event_id = self._injected.popleft()
+                if self._running:
+                    self._schedule(self.now(), ("event", event_id))
+            self._process_due()
+
+    def _handle_command(self, command):
+        if command == SendMessageHeader.HANDSHAKE:
+            self._write(ReceiveMessageHeader.HANDSHAKE_OK.encode())
+        elif command == SendMessageHeader.FIRMWARE_VERSION:
+            self._write(struct.pack("<HH", self.FIRMWARE_VERSION, self.MACHINE_TYPE))
+        elif command == SendMessageHeader.HARDWARE_DESCRIPTION:
+            hw = self.hardware
+            self._write(
+                struct.pack(
+                    "<HHBBBBBB",
+                    hw.max_states,
+                    hw.cycle_period,
+                    hw.max_serial_events,
+                    self.SERIAL_MESSAGE_MAX_BYTES,
+                    hw.n_global_timers,
+                    hw.n_global_counters,
+                    hw.n_conditions,
+                    len(hw.inputs),
+                )
+                + "".join(hw.inputs).encode()
+                + bytes([len(hw.outputs)])
+                + "".join(hw.outputs).encode()
+            )
+        elif command == SendMessageHeader.GET_TIMESTAMP_TRANSMISSION:
+            self._write([1 if self.hardware.live_timestamps else 0])
+        elif command == SendMessageHeader.ENABLE_PORTS:
+            self.hardware.inputs_enabled = list(self._read(len(self.hardware.inputs)))
+            self._write([ReceiveMessageHeader.ENABLE_PORTS_OK])
+        elif command == SendMessageHeader.SYNC_CHANNEL_MODE:
+            self._read(2)
+            self._write([ReceiveMessageHeader.SYNC_CHANNEL_MODE_OK])
+        elif command == SendMessageHeader.GET_MODULES:
+            # no module connected on any serial channel
+            self._write([0] * self.hardware.inputs.count("U"))
+        elif command == "%":
+            n_serial_events = list(self._read(self.hardware.inputs.count("U") + 1))
+            self._setup_channels(n_serial_events[:-1])
+            self._write([1])
+        elif command == SendMessageHeader.RESET_CLOCK:
+            self._t0 = time.monotonic()
+            self._write(bytes(1))
+        elif command == SendMessageHeader.NEW_STATE_MATRIX:
+            _, use_255_back_signal, size = struct.unpack("<BBH", self._read(4))
+            self._new_sma = self._parse_state_machine(
+                self._read(size), use_255_back_signal
+            )
+        elif command == SendMessageHeader.RUN_STATE_MACHINE:
+            self._start_trial()
+        elif command == SendMessageHeader.EXIT_AND_RETURN:
+            if self._running:
+                self._exit(self.now())
+        elif command == SendMessageHeader.ECHO_SOFTCODE:
+            self._write([2, self._read(1)[0]])
+        elif command == SendMessageHeader.TRIGGER_SOFTCODE:
+            softcode = self._read(1)[0]
+            if self._running:
+                event_id = self.hardware.channels.events_positions.Event_USB
+                self._schedule(self.now(), ("event", event_id + softcode - 1))
+        elif command == SendMessageHeader.MANUAL_OVERRIDE_EXEC_EVENT:
+            channel, value = self._read(2)
+            for event_id, channel_value in self._event_channel.items():
+                if channel_value == (channel, 1 if value else 0) and self._running:
+                    self._schedule(self.now(), ("event", event_id))
+        elif command == SendMessageHeader.OVERRIDE_DIGITAL_HW_STATE:
+            channel, value = self._read(2)
+            self.outputs[channel] = value
+        elif command in (
+            SendMessageHeader.SEND_TO_HW_SERIAL,
+            SendMessageHeader.SET_MODULE_RELAY,
+        ):
+            self._read(2)
+        elif command == SendMessageHeader.PAUSE_TRIAL:
+            self._read(1)
+        elif command == SendMessageHeader.WRITE_TO_MODULE:
+            _, size = self._read(2)
+            self._read(size)
+        elif command == SendMessageHeader.LOAD_SERIAL_MESSAGE:
+            _, n_messages = self._read(2)
+            for _ in range(n_messages):
+                _, size = self._read(2)
+                self._read(size)
+            self._write([ReceiveMessageHeader.LOAD_SERIAL_MESSAGE_OK])
+        elif command == SendMessageHeader.RESET_SERIAL_MESSAGES:
+            self._write([ReceiveMessageHeader.RESET_SERIAL_MESSAGES])
+        elif command == SendMessageHeader.DISCONNECT:
+            self._write(b"1")
+        else:
+            logger.warning("Bpod emulator: unknown command %r", command)
+
+    def _parse_state_machine(self, body, use_255_back_signal):
+        """
+        Decodes the message built by StateMachineBuilder (build_message,
+        build_message_global_timer and build_message_32_bits)
+        """
+        hw = self.hardware
+        position = 0
+
+        def take(n, dtype="<u1"):
+            nonlocal position
+            size = n * np.dtype(dtype).itemsize
+            values = np.frombuffer(body, dtype=dtype, count=n, offset=position)
+            position += size
+            return values.tolist()
+
+        def transitions(n_states):
+            matrix = []
+            for _ in range(n_states):
+                (n,) = take(1)
+                pairs = take(2 * n)
+                matrix.append(dict(zip(pairs[0::2], pairs[1::2])))
+            return matrix
+
+        n_states, n_timers, n_counters, n_conditions = take(4)
+        sma = SimpleNamespace(
+            n_states=n_states, use_255_back_signal=use_255_back_signal
+        )
+        sma.state_timer_matrix = take(n_states)
+        sma.input_matrix = transitions(n_states)
+        sma.output_matrix = []
+        for _ in range(n_states):
+            (n,) = take(1)
+            pairs = take(2 * n)
+            sma.output_matrix.append(list(zip(pairs[0::2], pairs[1::2])))
+        sma.timer_start_matrix = transitions(n_states)
+        sma.timer_end_matrix = transitions(n_states)
+        sma.counter_matrix = transitions(n_states)
+        sma.condition_matrix = transitions(n_states)
+        sma.timer_channels = take(n_timers)
+        sma.timer_on_messages = take(n_timers)
+        sma.timer_off_messages = take(n_timers)
+        sma.timer_loop_mode = take(n_timers)
+        sma.timer_send_events = take(n_timers)
+        sma.counter_events = take(n_counters)
+        sma.condition_channels = take(n_conditions)
+        sma.condition_values = take(n_conditions)
+        sma.counter_resets = take(n_states)
+
+        if hw.n_global_timers > 16:
+            timer_bits = "<u4"
+        elif hw.n_global_timers > 8:
+            timer_bits = "<u2"
+        else:
+            timer_bits = "<u1"
+        sma.timer_triggers = take(n_states, timer_bits)
+        sma.timer_cancels = take(n_states, timer_bits)
+        sma.timer_onset_triggers = take(n_timers, timer_bits)
+
+        cycle = 1.0 / hw.cycle_frequency
+        sma.state_timers = [t * cycle for t in take(n_states, "<u4")]
+        sma.timer_durations = [t * cycle for t in take(n_timers, "<u4")]
+        sma.timer_onset_delays = [t * cycle for t in take(n_timers, "<u4")]
+        sma.timer_loop_intervals = [t * cycle for t in take(n_timers, "<u4")]
+        sma.counter_thresholds = take(n_counters, "<u4")
+        return sma
+
+    # TRIAL
+
+    def _start_trial(self):
+        if self._new_sma is not None:
+            self._sma = self._new_sma
+            self._new_sma = None
+            self._write([ReceiveMessageHeader.STATE_MACHINE_INSTALLATION_STATUS])
+        if self._sma is None:
+            logger.warning("Bpod emulator: no state machine installed")
+            return
+
+        sma = self._sma
+        self._trial_start = self.now()
+        self._write(struct.pack("<Q", int(self._trial_start * 1e6)))
+        self._running = True
+        self._queue = []
+        self._sequence = 0
+        self._timestamps = []
+        self._channel_values = [0] * len(self.hardware.channels.input_channel_names)
+        self._counter_values = [0] * len(sma.counter_thresholds)
+        self._timer_generation = [0] * len(sma.timer_durations)
+        self._state = None
+        self._previous_state = None
+        self._tup_time = None
+
+        if self.pokes is not None:
+            names = self.hardware.channels.event_names
+            for t, event_name in self.pokes(self.trials + 1):
+                self._schedule(
+                    self._trial_start + t, ("event", names.index(event_name))
+                )
+        self._enter_state(0, self._trial_start)
+
+    def _schedule(self, t, action):
+        self._sequence += 1
+        heapq.heappush(self._queue, (t, self._sequence, action))
+
+    def _next_due(self):
+        if not self._running:
+            return None
+        due = [self._queue[0][0]] if self._queue else []
+        if self._tup_time is not None:
+            due.append(self._tup_time)
+        return min(due) if due else None
+
+    def _process_due(self):
+        while self._running:
+            due = self._next_due()
+            if due is None or due > self.now():
+                return
+            if self._queue and self._queue[0][0] <= due:
+                t, _, action = heapq.heappop(self._queue)
+                self._do(t, action)
+            else:
+                self._tup_time = None
+                self._event(due, self.hardware.channels.events_positions.Tup)
+
+    def _do(self, t, action):
+        kind = action[0]
+        if kind == "event":
+            self._event(t, action[1])
+        elif kind == "timer_start":
+            _, timer, generation = action
+            if generation == self._timer_generation[timer]:
+                self._timer_start(t, timer)
+        elif kind == "timer_end":
+            _, timer, generation = action
+            if generation == self._timer_generation[timer]:
+                self._timer_end(t, timer)
+
+    def _send_event(self, t, event_id):
+        message = bytes([1, 1, event_id])
+        if self.hardware.live_timestamps:
+            message += struct.pack("<L", self._cycles(t))
+        self._write(message)
+
+    def _cycles(self, t):
+        return int(round((t - self._trial_start) * self.hardware.cycle_frequency))
+
+    def _event(self, t, event_id):
+        sma = self._sma
+        positions = self.hardware.channels.events_positions
+        state = self._state
+
+        if event_id in self._event_channel:
+            channel, value = self._event_channel[event_id]
+            self._channel_values[channel] = value
+        for counter, counter_event in enumerate(sma.counter_events):
+            if counter_event == event_id:
+                self._counter_values[counter] += 1
+                if self._counter_values[counter] == sma.counter_thresholds[counter]:
+                    self._schedule(t, ("event", positions.globalCounter + counter))
+
+        self._send_event(t, event_id)
+        self._timestamps.append(self._cycles(t))
+        self.events += 1
+
+        if event_id == positions.Tup:
+            next_state = sma.state_timer_matrix[state]
+        elif positions.globalTimerStart <= event_id < positions.globalTimerEnd:
+            next_state = sma.timer_start_matrix[state].get(
+                event_id - positions.globalTimerStart
+            )
+        elif positions.globalTimerEnd <= event_id < positions.globalCounter:
+            next_state = sma.timer_end_matrix[state].get(
+                event_id - positions.globalTimerEnd
+            )
+        elif positions.globalCounter <= event_id < positions.condition:
+            next_state = sma.counter_matrix[state].get(
+                event_id - positions.globalCounter
+            )
+        elif positions.condition <= event_id < positions.Tup:
+            next_state = sma.condition_matrix[state].get(event_id - positions.condition)
+        else:
+            next_state = sma.input_matrix[state].get(event_id)
+
+        if next_state is None:
+            if event_id in self._event_channel:
+                self._check_conditions(t)
+            return
+        if next_state == sma.n_states:
+            self._exit(t)
+        elif sma.use_255_back_signal and next_state == 255:
+            self._enter_state(self._previous_state, t)
+        else:
+            self._enter_state(next_state, t)
+
+    def _enter_state(self, state, t):
+        sma = self._sma
+        self._previous_state = self._state
+        self._state = state
+
+        if sma.state_timer_matrix[state] != state:
+            self._tup_time = t + sma.state_timers[state]
+        else:
+            self._tup_time = None
+
+        usb = self.hardware.channels.events_positions.output_USB
+        for channel, value in sma.output_matrix[state]:
+            if channel == usb:
+                self._write([2, value])
+            else:
+                self.outputs[channel] = value
+
+        if sma.counter_resets[state]:
+            counter = sma.counter_resets[state] - 1
+            if counter < len(self._counter_values):
+                self._counter_values[counter] = 0
+        for timer in self._bits(sma.timer_cancels[state]):
+            self._timer_generation[timer] += 1
+        for timer in self._bits(sma.timer_triggers[state]):
+            self._trigger_timer(t, timer)
+        self._check_conditions(t)
+
+    def _check_conditions(self, t):
+        sma = self._sma
+        condition_position = self.hardware.channels.events_positions.condition
+        for condition in sma.condition_matrix[self._state]:
+            channel = sma.condition_channels[condition]
+            if self._channel_values[channel] == sma.condition_values[condition]:
+                self._schedule(t, ("event", condition_position + condition))
+
+    def _bits(self, value):
+        return [i for i in range(len(self._timer_generation)) if value >> i & 1]
+
+    def _trigger_timer(self, t, timer):
+        self._timer_generation[timer] += 1
+        self._schedule(
+            t + self._sma.timer_onset_delays[timer],
+            ("timer_start", timer, self._timer_generation[timer]),
+        )
+
+    def _timer_start(self, t, timer):
+        sma = self._sma
+        generation = self._timer_generation[timer]
+        if sma.timer_send_events[timer]:
+            position = self.hardware.channels.events_positions.globalTimerStart
+            self._event(t, position + timer)
+        for onset_timer in self._bits(sma.timer_onset_triggers[timer]):
+            self._trigger_timer(t, onset_timer)
+        self._schedule(t + sma.timer_durations[timer], ("timer_end", timer, generation))
+
+    def _timer_end(self, t, timer):
+        sma = self._sma
+        if sma.timer_loop_mode[timer]:
+            self._schedule(
+                t + sma.timer_loop_intervals[timer],
+                ("timer_start", timer, self._timer_generation[timer]),
+            )
+        if sma.timer_send_events[timer]:
+            position = self.hardware.channels.events_positions.globalTimerEnd
+            self._event(t, position + timer)
+
+    def _exit(self, t):
+        self._running = False
+        self._queue = []
+        self._tup_time = None
+        self._send_event(t, 255)
+        message = struct.pack("<LQ", self._cycles(t), int(t * 1e6))
+        if not self.hardware.live_timestamps:
+            message += struct.pack("<H", len(self._timestamps))
+            message += np.array(self._timestamps, dtype="<u4").tobytes()
+        self._write(message)
+        self.trials += 1
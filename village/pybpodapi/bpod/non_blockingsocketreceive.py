@@ -61,6 +61,39 @@ class NonBlockingSocketReceive:
     def is_alive(self):
         return self._t.is_alive()
 
+    def fileno(self):
+        return self._s.fileno()
+
+
+class SelectSocketReceive:
+    def __init__(self, sck):
+        """
+        Threadless alternative to NonBlockingSocketReceive. The socket is read
+        directly by the caller once select reports it as readable, so the Bpod
+        loop can wait on the serial port and the socket at the same time.
+        """
+        self._s = sck
+        self._s.setblocking(False)
+        self._closed = False
+
+    def readline(self, timeout=None):
+        if self._closed:
+            return None
+        try:
+            data = self._s.recv(64)
+        except (BlockingIOError, OSError):
+            return None
+        return data if data else None
+
+    def close(self):
+        self._closed = True
+
+    def is_alive(self):
+        return not self._closed
+
+    def fileno(self):
+        return self._s.fileno()
+
 
 class UnexpectedEndOfStream(Exception):
     pass
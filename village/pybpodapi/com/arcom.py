@@ -98,6 +98,12 @@ class ArCOM(object):
         """
         self.serial_object.close()
 
+    def fileno(self):
+        """
+        File descriptor of the serial port, used to wait for data with select
+        """
+        return self.serial_object.fileno()
+
     def bytes_available(self):
         """
 
@@ -153,50 +159,55 @@ class ArCOM(object):
     ## READ ARRAY ################################################
     ##############################################################
 
+    def read_exact(self, n_bytes):
+        """
+        Read exactly n_bytes in a single call to the serial port. A short read
+        (timeout or disconnection) raises serial.SerialException, like the
+        other serial errors.
+
+        :param int n_bytes: number of bytes to read
+        :return: the bytes read
+        :rtype: bytes
+        """
+        data = self.serial_object.read(n_bytes)
+        if len(data) != n_bytes:
+            raise serial.SerialException(
+                f"read_exact: expected {n_bytes} bytes, got {len(data)}"
+            )
+        return data
+
+    def read_array(self, array_len, dtype):
+        """
+        Read array_len little-endian values of a numpy dtype with one read of
+        array_len * itemsize bytes. The array is a read-only view of the bytes
+        received, no copy is made.
+
+        :param int array_len: number of values to read
+        :param str dtype: numpy dtype of the values, e.g. "<u4"
+        :rtype: numpy.ndarray
+        """
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self.read_exact(array_len * dtype.itemsize), dtype=dtype)
+
     def read_bytes_array(self, array_len=1):
         data = self.serial_object.read(array_len)
         if len(data) != array_len:
-            raise IOError(
+            raise serial.SerialException(
                 f"read_bytes_array: expected {array_len} bytes, got {len(data)}"
             )
         return [bytes([b]) for b in data]
 
     def read_char_array(self, array_len=1):
-        message_array = []
-        for pos in range(0, array_len):
-            message_bytes = self.read_char()
-            message_array.append(message_bytes)
-
-        return message_array
+        return list(self.read_exact(array_len).decode("utf-8"))
 
     def read_uint8_array(self, array_len=1):
-        message_array = []
-        for pos in range(0, array_len):
-            message_bytes = self.read_uint8()
-            message_array.append(message_bytes)
-
-        return message_array
+        return list(self.read_exact(array_len))
 
     def read_uint16_array(self, array_len=1):
-        message_array = []
-        for pos in range(0, array_len):
-            message_bytes = self.read_uint16()
-            message_array.append(message_bytes)
-
-        return message_array
+        return self.read_array(array_len, "<u2").tolist()
 
     def read_uint32_array(self, array_len=1):
-        message_array = []
-        for pos in range(0, array_len):
-            message_bytes = self.read_uint32()
-            message_array.append(message_bytes)
-
-        return message_array
+        return self.read_array(array_len, "<u4").tolist()
 
     def read_float32_array(self, array_len=1):
-        message_array = []
-        for pos in range(0, array_len):
-            message_bytes = self.read_float32()
-            message_array.append(message_bytes)
-
-        return message_array
+        return self.read_array(array_len, "<f4").tolist()
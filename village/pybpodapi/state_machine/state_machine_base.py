@@ -42,6 +42,10 @@ class StateMachineBase(object):
     :ivar tuple(str) meta_output_names: :
     :ivar list(tuple(int)) output_matrix: :
     :ivar bool is_running: whether this state machine is being run on bpod box
+    :ivar numpy.ndarray transition_table: state entered for each [state, event],
+    compiled when the state machine is sent
+    :ivar list(str) event_names: event name of each event id, compiled when the
+    state machine is sent
 
     """
 
@@ -94,6 +98,10 @@ class StateMachineBase(object):
 
         self.is_running = False
 
+        # host-side lookup tables, see StateMachineBuilder.compile_transitions
+        self.transition_table = None
+        self.event_names = None
+
     def add_state(
         self,
         state_name,
@@ -1,5 +1,8 @@
 import logging
 import math
+from collections import OrderedDict
+
+import numpy as np
 
 from village.pybpodapi.com.arcom import ArduinoTypes
 from village.pybpodapi.com.send_msg_headers import SendMessageHeader
@@ -18,6 +21,12 @@ class StateMachineBuilder(StateMachineBase):
     will affect the whole pybpodapi library.
     """
 
+    #: transition_table value of the events that do not change the state
+    NO_TRANSITION = -1
+
+    #: transition_table value of the transitions to 'exit'
+    EXIT = -2
+
     def _replace_in_matrix(self, matrix, j, old_state, new_state):
         transitions = matrix[j]
         matrix[j] = [(t[0], new_state) if t[1] == old_state else t for t in transitions]
@@ -53,6 +62,98 @@ class StateMachineBuilder(StateMachineBase):
                 "Error: some states were referenced by name, but not declared."
             )
 
+    def compile_transitions(self):
+        """
+        Compile the host-side lookup tables used to follow the state machine
+        while it runs, so each incoming event is resolved with a single index
+        instead of walking the transition matrices.
+
+        transition_table[state, event_id] holds the state entered when event_id
+        occurs in state, or NO_TRANSITION / EXIT. It merges the input matrix, the
+        state timer matrix and the global timer start and end matrices, with the
+        input matrix taking precedence over the others in that order.
+        event_names[event_id] holds the name of each event. Both cover the 256
+        possible event ids of the Bpod.
+        """
+        n_events = 256
+        table = np.full(
+            (max(self.total_states_added, 1), n_events),
+            self.NO_TRANSITION,
+            dtype=np.int16,
+        )
+
+        def encode(state):
+            return self.EXIT if math.isnan(state) else state
+
+        tup = self.hardware.channels.events_positions.Tup
+        for i in range(self.total_states_added):
+            # lowest precedence first, so the matrices checked first overwrite
+            for matrix in [
+                self.global_timers.end_matrix,
+                self.global_timers.start_matrix,
+            ]:
+                if isinstance(matrix[i], list):
+                    for event_code, dest_state in matrix[i]:
+                        table[i, event_code] = encode(dest_state)
+            if self.state_timer_matrix[i] != i:
+                table[i, tup] = encode(self.state_timer_matrix[i])
+            for event_code, dest_state in self.input_matrix[i]:
+                table[i, event_code] = encode(dest_state)
+        self.transition_table = table
+
+        event_names = list(self.hardware.channels.event_names[:n_events])
+        self.event_names = event_names + ["unknown event name"] * (
+            n_events - len(event_names)
+        )
+
+    def structure_key(self):
+        """
+        Key of everything build_message() and build_message_global_timer() send
+        to the Bpod. State machines with the same key only differ in the timer
+        values packed by build_message_32_bits().
+
+        :rtype: str
+        """
+        n = self.total_states_added
+        timers = self.global_timers
+        counters = self.global_counters
+        conditions = self.conditions
+        # number of global timers, counters and conditions used, as in build_message
+        n_timers, n_counters, n_conditions = (
+            0 if i is None else i + 1
+            for i in (
+                timers.get_max_index_used(),
+                counters.get_max_index_used(),
+                conditions.get_max_index_used(),
+            )
+        )
+        # repr keeps NaN (exit) transitions comparable between state machines
+        return repr(
+            (
+                n,
+                self.use_255_back_signal,
+                self.state_timer_matrix[:n],
+                self.input_matrix[:n],
+                self.output_matrix[:n],
+                timers.start_matrix[:n],
+                timers.end_matrix[:n],
+                counters.matrix[:n],
+                conditions.matrix[:n],
+                timers.channels[:n_timers],
+                timers.on_messages[:n_timers],
+                timers.off_messages[:n_timers],
+                timers.loop_mode[:n_timers],
+                timers.send_events[:n_timers],
+                timers.onset_matrix[:n_timers],
+                timers.triggers_matrix[:n],
+                timers.cancels_matrix[:n],
+                counters.attached_events[:n_counters],
+                counters.reset_matrix[:n],
+                conditions.channels[:n_conditions],
+                conditions.values[:n_conditions],
+            )
+        )
+
     def build_header(self, run_asap=None, statemachine_body_size=0):
         message = [ord(SendMessageHeader.NEW_STATE_MATRIX)]
         message += [0 if run_asap is None else 1]
@@ -344,5 +445,74 @@ class StateMachineBuilder(StateMachineBase):
         return ArduinoTypes.get_uint32_array(thirty_two_bit_message)
 
 
+class StateMachineCache(object):
+    """
+    Cache of compiled state machines keyed by their structure_key(), so
+    trials with the structure of a recent trial skip build_message(),
+    build_message_global_timer() and compile_transitions(). Only the timer
+    values are packed again.
+
+    :ivar int max_size: number of structures kept, the least recently used is
+    dropped first
+    :ivar int hits: messages built from the cache
+    :ivar int misses: messages built from scratch
+    """
+
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def build(self, sma, run_asap=None):
+        """
+        Builds the full message (header and body) of a state machine whose
+        state numbers have already been updated, and compiles its transition
+        table.
+
+        :param StateMachineBuilder sma: state machine to send
+        :param run_asap: see StateMachineBuilder.build_header
+        :rtype: bytes
+        """
+        key = sma.structure_key()
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            body = sma.build_message() + sma.build_message_global_timer()
+            sma.compile_transitions()
+            entry = (
+                body,
+                sma.highest_used_global_timer,
+                sma.highest_used_global_counter,
+                sma.highest_used_global_condition,
+                sma.transition_table,
+                sma.event_names,
+            )
+            self._entries[key] = entry
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            (
+                body,
+                sma.highest_used_global_timer,
+                sma.highest_used_global_counter,
+                sma.highest_used_global_condition,
+                sma.transition_table,
+                sma.event_names,
+            ) = entry
+            sma.state_timers = sma.state_timers[: sma.total_states_added]
+
+        body += sma.build_message_32_bits()
+        return sma.build_header(run_asap, len(body)) + body
+
+
 class StateMachineBuilderError(Exception):
     pass
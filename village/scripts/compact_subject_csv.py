@@ -0,0 +1,20 @@
+import os
+
+import fire
+
+from village.classes.subject_store import SubjectStore
+
+
+def main(subject: str, sessions_directory: str) -> None:
+    """Rebuilds the flat CSV of a subject from its appended segments.
+
+    Args:
+        subject (str): The name of the subject.
+        sessions_directory (str): The directory containing session data.
+    """
+    path = os.path.join(sessions_directory, subject, subject + ".csv")
+    SubjectStore(path).compact()
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
@@ -3,6 +3,9 @@ import os
 import fire
 import pandas as pd
 
+from village.classes.session_store import SessionStore
+from village.classes.subject_store import SubjectStore
+
 
 def main(
     subject: str, sessions_directory: str, deleted_sessions: list[str] = []
@@ -24,7 +27,7 @@ def main(
             continue
         if file.endswith("_RAW.csv"):
             continue
-        if file == final_name:
+        if file == final_name or file.startswith(subject + ".part"):
             continue
         elif file.endswith(".csv"):
             sessions.append(file)
@@ -68,20 +71,11 @@ def main(
 
     final_df = pd.concat(dfs)
 
-    priority_columns = [
-        "session",
-        "date",
-        "trial",
-        "subject",
-        "task",
-        "system_name",
-    ]
-    reordered_columns = priority_columns + [
-        col for col in final_df.columns if col not in priority_columns
-    ]
-    final_df = final_df[reordered_columns]
+    SubjectStore(final_path).write(final_df)
 
-    final_df.to_csv(final_path, header=True, index=False, sep=";")
+    columnar_store = SessionStore(subject_directory)
+    if columnar_store.directory.exists():
+        columnar_store.rebuild(final_df)
 
 
 if __name__ == "__main__":
@@ -2,17 +2,26 @@ import logging
 import os
 import signal
 import subprocess
+import sys
 import threading
 import time
+from typing import Callable
 
 import fire
 
 from village.scripts.log import log
 from village.scripts.time_utils import time_utils
-from village.scripts.utils import setup_logging
+from village.scripts.utils import setup_logging, write_files_from
 
 
-def run_rsync_local(source, destination, maximum_sync_time, cancel_event=None) -> bool:
+def run_rsync_local(
+    source,
+    destination,
+    maximum_sync_time,
+    cancel_event=None,
+    progress: Callable[[str], None] | None = None,
+    files_from: list[str] | None = None,
+) -> bool:
     """
     Run rsync to sync to a local destination (e.g., external HDD).
 
@@ -21,6 +30,10 @@ def run_rsync_local(source, destination, maximum_sync_time, cancel_event=None) -
         destination (str): Local destination path (e.g., /media/pi/mydisk/backup/).
         maximum_sync_time (int): Maximum sync time in seconds.
         cancel_event (threading.Event | None): Event to signal cancellation.
+        progress (Callable[[str], None] | None): Called with every line of
+            the rsync output.
+        files_from (list[str] | None): Sync only these paths, relative to
+            source. Directories are synced with all their contents.
 
     Returns:
         bool: True if sync succeeded, False otherwise.
@@ -56,9 +69,13 @@ def run_rsync_local(source, destination, maximum_sync_time, cancel_event=None) -
         "rsync_logs/",  # exclude logs
         "--exclude",
         "data_removal_logs/",  # exclude logs
-        source,
-        destination,
     ]
+    files_from_path = None
+    if files_from is not None:
+        # only the listed files (and the contents of the listed directories)
+        files_from_path = write_files_from(files_from)
+        rsync_cmd += ["-r", "--files-from=" + files_from_path]
+    rsync_cmd += [source, destination]
 
     logging.info(f"Starting local rsync with command: {' '.join(rsync_cmd)}")
 
@@ -116,6 +133,8 @@ def run_rsync_local(source, destination, maximum_sync_time, cancel_event=None) -
                         break
                     if output:
                         logging.info(output.strip())
+                        if progress is not None:
+                            progress(output)
                         last_progress_time = time_utils.get_time_monotonic()
                 except Exception:
                     pass
@@ -187,6 +206,8 @@ def run_rsync_local(source, destination, maximum_sync_time, cancel_event=None) -
                     process.stderr.close()
         except Exception:
             pass
+        if files_from_path is not None:
+            os.remove(files_from_path)
 
 
 def main(
@@ -194,7 +215,9 @@ def main(
     destination: str,
     maximum_sync_time: int = 1800,
     cancel_event: threading.Event | None = None,
-) -> None:
+    progress: Callable[[str], None] | None = None,
+    files_from: list[str] | None = None,
+) -> bool:
     """Main function to sync data to local disk using rsync.
 
     Args:
@@ -204,6 +227,14 @@ def main(
             Defaults to 1800.
         cancel_event (threading.Event | None): Event to signal cancellation.
             Defaults to None.
+        progress (Callable[[str], None] | None): Called with every line of
+            the rsync output. Defaults to None.
+        files_from (list[str] | None): Sync only these paths, relative to
+            source. Defaults to None (the whole source directory).
+
+    Returns:
+        bool: True if the sync succeeded.
+
     Parameters:
     - source: Source directory path
     - destination: Destination path (on remote system)
@@ -215,11 +246,16 @@ def main(
 
     logging.info(f"Starting local sync from {source} to {destination}")
 
-    success = run_rsync_local(source, destination, maximum_sync_time, cancel_event)
+    success = run_rsync_local(
+        source, destination, maximum_sync_time, cancel_event, progress, files_from
+    )
 
     if success:
         logging.info(f"Sync completed successfully. Log file: {log_file}")
         log.info("Sync completed successfully")
+    elif cancel_event is not None and cancel_event.is_set():
+        logging.info(f"Sync stopped before finishing. Log file: {log_file}")
+        log.info("Sync stopped before finishing")
     else:
         logging.error(f"Sync failed. Check log file for details: {log_file}")
         log.error(f"Sync failed. Check log file for details: {log_file}")
@@ -227,7 +263,22 @@ def main(
     logging.getLogger().removeHandler(file_handler)
     file_handler.close()
     logging.shutdown()
+    return success
+
+
+def cli(source: str, destination: str, maximum_sync_time: int = 1800) -> None:
+    """Command line entry point. Exits with status 1 if the sync failed.
+
+    Args:
+        source (str): Source directory path.
+        destination (str): Destination path.
+        maximum_sync_time (int): Maximum sync time duration in seconds.
+            Defaults to 1800.
+    """
+    if not main(source, destination, maximum_sync_time):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    fire.Fire(main)
+    # main returns the result, which fire would print
+    fire.Fire(cli)
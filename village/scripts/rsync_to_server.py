@@ -3,14 +3,20 @@ import os
 import select
 import signal
 import subprocess
+import sys
+import tempfile
 import threading
 import time
+from typing import Callable
 
 import fire
 
 from village.scripts.log import log
 from village.scripts.time_utils import time_utils
-from village.scripts.utils import setup_logging
+from village.scripts.utils import setup_logging, write_files_from
+
+# socket of the shared SSH connection, %C is a hash of the host, port and user
+CONTROL_PATH = os.path.join(tempfile.gettempdir(), "village-ssh-%C")
 
 
 def run_rsync(
@@ -21,6 +27,9 @@ def run_rsync(
     port: int | None,
     maximum_sync_time: int,
     cancel_event: threading.Event | None = None,
+    progress: Callable[[str], None] | None = None,
+    files_from: list[str] | None = None,
+    persistent_connection: bool = False,
 ) -> bool:
     """Run rsync command with specified parameters.
 
@@ -32,6 +41,12 @@ def run_rsync(
         port (int | None): SSH port.
         maximum_sync_time (int): Maximum sync time in seconds.
         cancel_event (threading.Event | None): Event to signal cancellation.
+        progress (Callable[[str], None] | None): Called with every line of
+            the rsync output.
+        files_from (list[str] | None): Sync only these paths, relative to
+            source. Directories are synced with all their contents.
+        persistent_connection (bool): Share one SSH connection between the
+            mkdir, the transfer and the next syncs (ControlMaster).
 
     Returns:
         bool: True if sync succeeded, False otherwise.
@@ -44,33 +59,29 @@ def run_rsync(
     source = os.path.join(source, "")
     destination_dir = os.path.dirname(destination)
 
+    port_options = [] if port is None else ["-p", str(port)]
+    shared_options: list[str] = []
+    if persistent_connection:
+        # the mkdir, the transfer and the next syncs share one SSH connection
+        shared_options = [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            "ControlPath=" + CONTROL_PATH,
+            "-o",
+            "ControlPersist=600",
+        ]
+
     try:
-        if port is None:
-            subprocess.run(
-                [
-                    "ssh",
-                    "-o",
-                    "ConnectTimeout=10",
-                    f"{remote_user}@{remote_host}",
-                    f"mkdir -p {destination_dir}",
-                ],
-                timeout=30,
-                check=True,
-            )
-        else:
-            subprocess.run(
-                [
-                    "ssh",
-                    "-p",
-                    str(port),
-                    "-o",
-                    "ConnectTimeout=10",
-                    f"{remote_user}@{remote_host}",
-                    f"mkdir -p {destination_dir}",
-                ],
-                timeout=30,
-                check=True,
-            )
+        subprocess.run(
+            ["ssh"]
+            + port_options
+            + ["-o", "ConnectTimeout=10"]
+            + shared_options
+            + [f"{remote_user}@{remote_host}", f"mkdir -p {destination_dir}"],
+            timeout=30,
+            check=True,
+        )
     except subprocess.TimeoutExpired:
         logging.error(
             "SSH connection timed out (mkdir). Remote host may be unreachable."
@@ -81,48 +92,32 @@ def run_rsync(
         return False
 
     # Construct the rsync command with safe options
-    if port is None:
-        rsync_cmd = [
-            "rsync",
-            "-avP",  # archive, verbose, compress, show progress
-            "--update",  # skip files that are newer on receiver
-            "--safe-links",  # ignore symlinks that point outside the tree
-            "--timeout=30",  # I/O timeout for rsync
-            "--exclude",
-            "*.tmp",  # exclude temporary files
-            "--exclude",
-            "CORRIDOR*",  # exclude CORRIDOR videos and data
-            "--exclude",
-            ".git/",  # exclude git directory
-            "--exclude",
-            "rsync_logs/",  # exclude logs
-            "--exclude",
-            "data_removal_logs/",  # exclude logs
-            source,
-            f"{remote_user}@{remote_host}:{destination}",
-        ]
-    else:
-        rsync_cmd = [
-            "rsync",
-            "-avP",  # archive, verbose, compress, show progress
-            "--update",  # skip files that are newer on receiver
-            "--safe-links",  # ignore symlinks that point outside the tree
-            "--timeout=30",  # I/O timeout for rsync
-            "--exclude",
-            "*.tmp",  # exclude temporary files
-            "--exclude",
-            "CORRIDOR*",  # exclude CORRIDOR videos and data
-            "--exclude",
-            ".git/",  # exclude git directory
-            "--exclude",
-            "rsync_logs/",  # exclude logs
-            "--exclude",
-            "data_removal_logs/",  # exclude logs
-            "-e",
-            f"ssh -p {port}",  # specify ssh port
-            source,
-            f"{remote_user}@{remote_host}:{destination}",
-        ]
+    rsync_cmd = [
+        "rsync",
+        "-avP",  # archive, verbose, compress, show progress
+        "--update",  # skip files that are newer on receiver
+        "--safe-links",  # ignore symlinks that point outside the tree
+        "--timeout=30",  # I/O timeout for rsync
+        "--exclude",
+        "*.tmp",  # exclude temporary files
+        "--exclude",
+        "CORRIDOR*",  # exclude CORRIDOR videos and data
+        "--exclude",
+        ".git/",  # exclude git directory
+        "--exclude",
+        "rsync_logs/",  # exclude logs
+        "--exclude",
+        "data_removal_logs/",  # exclude logs
+    ]
+    if port_options or shared_options:
+        # specify ssh port and connection sharing
+        rsync_cmd += ["-e", " ".join(["ssh"] + port_options + shared_options)]
+    files_from_path = None
+    if files_from is not None:
+        # only the listed files (and the contents of the listed directories)
+        files_from_path = write_files_from(files_from)
+        rsync_cmd += ["-r", "--files-from=" + files_from_path]
+    rsync_cmd += [source, f"{remote_user}@{remote_host}:{destination}"]
 
     logging.info(f"Starting rsync with command: {' '.join(rsync_cmd)}")
 
@@ -184,6 +179,8 @@ def run_rsync(
                         line = process.stdout.readline()
                         if line:
                             logging.info(line.strip())
+                            if progress is not None:
+                                progress(line)
                             last_progress_time = time_utils.get_time_monotonic()
                 except Exception:
                     pass
@@ -266,6 +263,8 @@ def run_rsync(
                     process.stderr.close()
         except Exception:
             pass
+        if files_from_path is not None:
+            os.remove(files_from_path)
 
 
 def main(
@@ -276,7 +275,10 @@ def main(
     port: int | None = None,
     maximum_sync_time: int = 1200,
     cancel_event: threading.Event | None = None,
-) -> None:
+    progress: Callable[[str], None] | None = None,
+    files_from: list[str] | None = None,
+    persistent_connection: bool = False,
+) -> bool:
     """Main function to sync data to remote server using rsync.
 
     Args:
@@ -289,6 +291,15 @@ def main(
             Defaults to 1200.
         cancel_event (threading.Event | None): Event to signal cancellation.
             Defaults to None.
+        progress (Callable[[str], None] | None): Called with every line of
+            the rsync output. Defaults to None.
+        files_from (list[str] | None): Sync only these paths, relative to
+            source. Defaults to None (the whole source directory).
+        persistent_connection (bool): Share one SSH connection between syncs.
+            Defaults to False.
+
+    Returns:
+        bool: True if the sync succeeded.
     """
     # Setup logging
     log_file, file_handler = setup_logging(logs_subdirectory="rsync_logs")
@@ -306,12 +317,18 @@ def main(
         port,
         maximum_sync_time,
         cancel_event,
+        progress,
+        files_from,
+        persistent_connection,
     )
 
     # Log completion
     if success:
         logging.info(f"Sync completed successfully. Log file: {log_file}")
         log.info("Sync completed successfully")
+    elif cancel_event is not None and cancel_event.is_set():
+        logging.info(f"Sync stopped before finishing. Log file: {log_file}")
+        log.info("Sync stopped before finishing")
     else:
         logging.error(f"Sync failed. Check log file for details: {log_file}")
         log.error(f"Sync failed. Check log file for details: {log_file}")
@@ -320,7 +337,32 @@ def main(
     logging.getLogger().removeHandler(file_handler)
     file_handler.close()
     logging.shutdown()
+    return success
+
+
+def cli(
+    source: str,
+    destination: str,
+    remote_user: str,
+    remote_host: str,
+    port: int | None = None,
+    maximum_sync_time: int = 1200,
+) -> None:
+    """Command line entry point. Exits with status 1 if the sync failed.
+
+    Args:
+        source (str): Source directory path.
+        destination (str): Destination path on remote system.
+        remote_user (str): Username on remote system.
+        remote_host (str): Remote hostname or IP.
+        port (int | None): SSH port (default: None).
+        maximum_sync_time (int): Maximum sync time duration in seconds.
+            Defaults to 1200.
+    """
+    if not main(source, destination, remote_user, remote_host, port, maximum_sync_time):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    fire.Fire(main)
+    # main returns the result, which fire would print
+    fire.Fire(cli)
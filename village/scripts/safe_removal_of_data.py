@@ -1,10 +1,10 @@
 import logging
 import os
-import subprocess
 from datetime import datetime
 
 import fire
 
+from village.classes.backup_verifier import BackupVerifier
 from village.scripts.time_utils import time_utils
 from village.scripts.utils import setup_logging
 
@@ -16,9 +16,14 @@ def check_files_for_backup_remote(
     remote_user: str,
     remote_host: str,
     port: int | None,
+    index_path: str | None = None,
 ) -> list[str]:
     """Checks which files have been backed up on a remote server.
 
+    The files are streamed in chunks through a single SSH connection and every
+    remote copy must have the same size and fast_hash as the local file. If the
+    server has no python3 only the sizes are compared, with an error in the log.
+
     Args:
         files (list[str]): List of filenames to check.
         directory (str): The local directory containing the files.
@@ -26,70 +31,33 @@ def check_files_for_backup_remote(
         remote_user (str): Username on remote system.
         remote_host (str): Remote hostname or IP.
         port (int | None): SSH port.
+        index_path (str | None): JSON file that caches the local hashes.
 
     Returns:
         list[str]: List of full paths of files that can be safe to remove locally.
     """
-    files_to_remove = []
-    # Create a single SSH connection to the remote server
-    import os
-
-    if port is None:
-        ssh_command = (
-            f"ssh {remote_user}@{remote_host} "
-            f"'for file in {' '.join([os.path.join(backup_dir, f) for f in files])}; do"
-            f" if [ -e $file ]; then echo $file; fi; done'"
-        )
-    else:
-        ssh_command = (
-            f"ssh -p {port} {remote_user}@{remote_host} "
-            f"'for file in {' '.join([os.path.join(backup_dir, f) for f in files])}; do"
-            f" if [ -e $file ]; then echo $file; fi; done'"
-        )
-
-    try:
-        result = subprocess.run(
-            ssh_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=120,
-        )
-    except Exception:
-        return []
-
-    backed_up_files = result.stdout.decode().strip().split("\n")
-
-    for file in files:
-        backup_path = os.path.join(backup_dir, file)
-        if backup_path in backed_up_files:
-            files_to_remove.append(os.path.join(directory, file))
-
-    return files_to_remove
+    verifier = BackupVerifier(directory, backup_dir, index_path)
+    return verifier.verify_remote(files, remote_user, remote_host, port)
 
 
 def check_files_for_backup_local(
-    files: list[str], directory: str, backup_dir: str
+    files: list[str], directory: str, backup_dir: str, index_path: str | None = None
 ) -> list[str]:
     """Checks which files have been backed up locally (e.g., external drive).
 
+    Every copy must have the same size and fast_hash as the local file.
+
     Args:
         files (list[str]): List of filenames to check.
         directory (str): The local directory containing the source files.
         backup_dir (str): The local backup directory.
+        index_path (str | None): JSON file that caches the local hashes.
 
     Returns:
         list[str]: List of full paths of files that can be safe to remove.
     """
-    files_to_remove = []
-    for file in files:
-        try:
-            backup_path = os.path.join(backup_dir, file)
-            if os.path.exists(backup_path):
-                files_to_remove.append(os.path.join(directory, file))
-        except Exception:
-            pass
-    return files_to_remove
+    verifier = BackupVerifier(directory, backup_dir, index_path)
+    return verifier.verify_local(files)
 
 
 def parse_timestamp_from_filename(filename: str) -> datetime | None:
@@ -118,6 +86,7 @@ def remove_old_data(
     remote_user: str | None = None,
     remote_host: str | None = None,
     port: int | None = None,
+    index_path: str | None = None,
 ) -> None:
     """Core logic to identify and remove old data files.
 
@@ -130,6 +99,7 @@ def remove_old_data(
         remote_user (str | None): Remote username.
         remote_host (str | None): Remote host.
         port (int | None): SSH port.
+        index_path (str | None): JSON file that caches the hashes of the files.
     """
     removed_count = 0
     files_to_check = []
@@ -161,12 +131,21 @@ def remove_old_data(
             ), "Remote host must be provided for remote backup check"
 
             files_to_remove = check_files_for_backup_remote(
-                files_to_check, directory, backup_dir, remote_user, remote_host, port
+                files_to_check,
+                directory,
+                backup_dir,
+                remote_user,
+                remote_host,
+                port,
+                index_path,
             )
         else:
             files_to_remove = check_files_for_backup_local(
-                files_to_check, directory, backup_dir
+                files_to_check, directory, backup_dir, index_path
             )
+        logging.info(
+            f"{len(files_to_remove)} of {len(files_to_check)} files are backed up"
+        )
     else:
         logging.info("Safe mode is off, skipping backup check")
         files_to_remove = files_to_check
@@ -222,9 +201,18 @@ def main(
 
     log_file, file_handler = setup_logging(logs_subdirectory="data_removal_logs")
     logging.info(f"Logging to file: {log_file}")
+    index_path = os.path.join(os.path.dirname(log_file), "backup_index.json")
     try:
         remove_old_data(
-            directory, days, safe, backup_dir, remote, remote_user, remote_host, port
+            directory,
+            days,
+            safe,
+            backup_dir,
+            remote,
+            remote_user,
+            remote_host,
+            port,
+            index_path,
         )
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}")
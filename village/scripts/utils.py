@@ -4,6 +4,7 @@ import os
 import re
 import shutil
 import subprocess
+import tempfile
 import traceback
 from datetime import datetime, timedelta
 from io import BytesIO
@@ -536,6 +537,22 @@ def setup_logging(logs_subdirectory: str) -> tuple[str, logging.FileHandler]:
     return log_filename, file_handler
 
 
+def write_files_from(paths: list[str]) -> str:
+    """Writes a list of paths to a temporary file for rsync --files-from.
+
+    Args:
+        paths (list[str]): Paths relative to the rsync source directory.
+
+    Returns:
+        str: Path of the file. The caller removes it.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", suffix=".txt", prefix="rsync_files_", delete=False
+    ) as f:
+        f.write("".join(path + "\n" for path in paths))
+    return f.name
+
+
 def has_low_disk_space(threshold_gb=10) -> bool:
     """Checks if the root partition has low disk space.
 
@@ -205,6 +205,23 @@ no backup is found.""",
         """Maximum time allowed (in seconds) to sync data. If synchronization is
 not completed within this time, the process will stop to allow other animals to access
 the operant box.""",
+    ),
+    Setting(
+        "BACKGROUND_SYNC",
+        "OFF",
+        Active,
+        """When ON, the data sync runs in the background while the system waits for
+the next animal, instead of blocking the SYNC state. It is paused as soon as a tag is
+detected and resumed when the box is idle again.""",
+    ),
+    Setting(
+        "INCREMENTAL_SYNC",
+        "OFF",
+        Active,
+        """When ON, the files of every session and video are recorded in a manifest
+when they are saved, and the sync only sends these files and the system files instead
+of scanning the whole data directory. A full sync is still done once a day. Syncs to a
+server reuse one SSH connection.""",
     ),
     Setting(
         "SYNC_DESTINATION",
@@ -557,6 +574,42 @@ preventing unnecessary processing.""",
         int,
         "Number of days to store video data before deleting it.",
     ),
+    Setting(
+        "COLUMNAR_STORE",
+        "OFF",
+        Active,
+        """Also keep the trials of every subject in a columnar (Parquet) store, one
+dataset per subject, next to the CSV files. Loading the full history of a subject
+for the plots and the training protocol is then much faster. The CSV files are
+still written and remain the export format.""",
+    ),
+    Setting(
+        "BUFFERED_RECORDER",
+        "OFF",
+        Active,
+        """When ON, the raw session.csv rows (events, states and values) are kept in
+memory and written by a background thread every half second, instead of writing
+and flushing the file after every row. The file is synced to disk at the end of
+every trial, so a crash can only lose rows of the trial that was running.""",
+    ),
+    Setting(
+        "BUFFERED_COLLECTIONS",
+        "OFF",
+        Active,
+        """When ON, the system csv files (events, sessions_summary, subjects...) are
+written by a background thread, so logging an event or saving a session does not
+wait for the disk. New rows are first written to a journal that is synced to disk,
+and moved to the csv files every few seconds.""",
+    ),
+    Setting(
+        "CAMERA_DETECTION_THREAD",
+        "OFF",
+        Active,
+        """When ON, the camera callback only converts the detection areas to grayscale
+and the detection, triggers, csv rows and area alarms run in a separate thread. A slow
+detection then cannot delay the video encoder. The area checks use the latest
+completed detection.""",
+    ),
     Setting(
         "MATPLOTLIB_DPI",
         100,
@@ -624,6 +677,22 @@ a different version, please update it by following the instructions at sanworks.
     Setting("BPOD_BAUDRATE", 256000, int, "Bpod baudrate."),
     Setting("BPOD_SYNC_CHANNEL", 255, int, "Bpod sync channel."),
     Setting("BPOD_SYNC_MODE", 1, int, "Bpod sync mode."),
+    Setting(
+        "BPOD_EVENT_DRIVEN",
+        "OFF",
+        Active,
+        """When ON, the trial loop blocks on the Bpod serial port and the softcode
+socket and processes each message as soon as it arrives, instead of polling every
+millisecond. This reduces CPU usage and the jitter of host-side event timestamps.""",
+    ),
+    Setting(
+        "BPOD_REUSE_STATE_MACHINE",
+        "OFF",
+        Active,
+        """When ON, a trial whose state machine is identical to the one already
+installed on the Bpod does not upload it again, the Bpod runs the installed one. This
+shortens the time between trials.""",
+    ),
 ]
 
 